@@ -38,10 +38,13 @@ Options:
 """
 
 
+import os
+import gzip
+import json
+import hashlib
 import yaml
 import time
 
-import boto3
 import botocore
 from botocore.exceptions import ClientError
 from docopt import docopt
@@ -52,80 +55,218 @@ from awsorgs.spec import *
 
 S3_ACCOUNT_BUCKET = 'jjhsu-awsorgs-bucket'
 
+# Object metadata key holding the sha256 of the published content
+S3_HASH_METADATA = 'content-sha256'
+
+# Account creations Organizations will process at once
+MAX_ACCOUNT_CREATIONS = 5
+
+# Seconds to wait on pending account creations before moving on
+ACCOUNT_CREATION_TIMEOUT = 300
+
+
+def pending_accounts_path(args):
+    return os.path.join(args['--cache-dir'], PENDING_ACCOUNTS_FILE)
+
+
+def load_pending_accounts(args):
+    """
+    Return dict mapping account name to CreateAccountRequestId for account
+    creations submitted by earlier runs and not yet seen to complete.
+    """
+    data = read_cache_file(pending_accounts_path(args))
+    return dict(data.get(args['--master-account-id'], dict()))
+
+
+def save_pending_account(args, account_name, request_id=None):
+    """
+    Record a pending account creation request in the cache dir, or forget
+    it if 'request_id' is None.
+    """
+    with locked_cache_file(pending_accounts_path(args)) as data:
+        pending = data.setdefault(args['--master-account-id'], dict())
+        if request_id:
+            pending[account_name] = request_id
+        else:
+            pending.pop(account_name, None)
+        if not pending:
+            del data[args['--master-account-id']]
+
+
+def submit_account_creation(a_spec, org_client, args, log, account_spec):
+    """
+    Request creation of a new account.  Return the CreateAccountRequestId
+    or None if no request was made.
+    """
+    if 'Email' in a_spec and a_spec['Email']:
+        email_addr = a_spec['Email']
+    else:
+        email_addr = '%s@%s' % (a_spec['Name'], account_spec['default_domain'])
+    log.info("Creating account '%s'" % (a_spec['Name']))
+    log.debug('account email: %s' % email_addr)
+    if not args['--exec']:
+        return None
+    try:
+        creation = org_client.create_account(
+                AccountName=a_spec['Name'],
+                Email=email_addr)['CreateAccountStatus']
+    except ClientError as e:
+        log.error("Account creation failed for '%s': %s" % (a_spec['Name'], e))
+        return None
+    log.info("CreateAccountStatus Id: %s" % (creation['Id']))
+    save_pending_account(args, a_spec['Name'], creation['Id'])
+    return creation['Id']
+
+
+def poll_account_creations(org_client, args, log, pending):
+    """
+    Query status of all account creation requests in 'pending', a dict
+    mapping account name to CreateAccountRequestId.  Remove completed
+    requests from 'pending' and from the pending accounts file.  Requests
+    whose status can not be queried stay pending.
+    """
+    def describe(request_id):
+        try:
+            return org_client.describe_create_account_status(
+                    CreateAccountRequestId=request_id)['CreateAccountStatus']
+        except ClientError as e:
+            log.error("Can not query CreateAccountStatus Id %s: %s" % (request_id, e))
+            return dict(State='UNKNOWN')
+
+    names = sorted(pending)
+    statuses = run_tasks(log, [pending[name] for name in names], describe)
+    for name, creation in zip(names, statuses):
+        # IN_PROGRESS, or UNKNOWN after a failed query:  poll again later
+        if creation['State'] == 'SUCCEEDED':
+            log.info("Account creation succeeded for '%s'" % name)
+        elif creation['State'] == 'FAILED':
+            log.error("Account creation failed for '%s': %s" %
+                    (name, creation['FailureReason']))
+        else:
+            continue
+        del pending[name]
+        save_pending_account(args, name)
+
+
 def create_accounts(org_client, args, log, deployed_accounts, account_spec):
     """
     Compare deployed_accounts to list of accounts in the accounts spec.
     Create accounts not found in deployed_accounts.
+
+    Creation history is scanned once.  New accounts are requested
+    concurrently, keeping at most MAX_ACCOUNT_CREATIONS in progress, and
+    all pending requests are polled together with exponential backoff.
+    Requests still pending when we give up are kept in the cache dir, so
+    the next run resumes waiting on them instead of creating them again.
     """
-    for a_spec in account_spec['accounts']:
-        if not lookup(deployed_accounts, 'Name', a_spec['Name']):
-            # check if it is still being provisioned
-            created_accounts = scan_created_accounts(log, org_client)
-            if lookup(created_accounts, 'AccountName', a_spec['Name']):
-                log.warn("New account '%s' is not yet available" % a_spec['Name'])
-                break
-            # create a new account
-            if 'Email' in a_spec and a_spec['Email']:
-                email_addr = a_spec['Email']
-            else:
-                email_addr = '%s@%s' % (a_spec['Name'], account_spec['default_domain'])
-            log.info("Creating account '%s'" % (a_spec['Name']))
-            log.debug('account email: %s' % email_addr)
+    pending_file = load_pending_accounts(args)
+    missing = [a_spec for a_spec in account_spec['accounts']
+            if not lookup(deployed_accounts, 'Name', a_spec['Name'])]
+
+    # accounts still being provisioned, by an earlier run or by hand
+    created_accounts = scan_created_accounts(log, org_client,
+            states=('IN_PROGRESS', 'SUCCEEDED')) if missing else LookupTable()
+    in_progress = set(c['Id'] for c in created_accounts.find('State', 'IN_PROGRESS'))
+
+    # forget requests recorded by earlier runs which have since completed,
+    # which Organizations no longer reports, or for accounts now deployed
+    missing_names = set(a_spec['Name'] for a_spec in missing)
+    for name, request_id in sorted(pending_file.items()):
+        if name not in missing_names or request_id not in in_progress:
+            del pending_file[name]
             if args['--exec']:
-                new_account = org_client.create_account(
-                        AccountName=a_spec['Name'],
-                        Email=email_addr)
-                create_id = new_account['CreateAccountStatus']['Id']
-                log.info("CreateAccountStatus Id: %s" % (create_id))
-                # validate creation status
-                counter = 0
-                maxtries = 5
-                while counter < maxtries:
-                    creation = org_client.describe_create_account_status(
-                            CreateAccountRequestId=create_id
-                            )['CreateAccountStatus']
-                    if creation['State'] == 'IN_PROGRESS':
-                        time.sleep(5)
-                        log.info("Account creation in progress for '%s'" %
-                                a_spec['Name'])
-                    elif creation['State'] == 'SUCCEEDED':
-                        log.info("Account creation succeeded")
-                        break
-                    elif creation['State'] == 'FAILED':
-                        log.error("Account creation failed: %s" %
-                                creation['FailureReason'])
-                        break
-                    counter += 1
-                if counter == maxtries and creation['State'] == 'IN_PROGRESS':
-                     log.warn("Account creation still pending. Moving on!")
+                save_pending_account(args, name)
+    if not missing:
+        return
+
+    pending = dict()
+    queue = []
+    for a_spec in missing:
+        name = a_spec['Name']
+        created = [c for c in created_accounts.find('AccountName', name)
+                if c['State'] == 'IN_PROGRESS']
+        if name in pending_file:
+            pending[name] = pending_file[name]
+        elif created:
+            pending[name] = created[0]['Id']
+        elif created_accounts.find('AccountName', name):
+            # creation succeeded, but the account has since left the org,
+            # or list_accounts has not caught up yet
+            log.warn("Account '%s' was created but is not in the "
+                    "Organization.  Not creating it again." % name)
+            continue
+        else:
+            queue.append(a_spec)
+            continue
+        log.warn("New account '%s' is not yet available" % name)
+
+    if not args['--exec']:
+        run_tasks(log, queue, submit_account_creation,
+                f_args=(org_client, args, log, account_spec))
+        return
+
+    deadline = time.time() + ACCOUNT_CREATION_TIMEOUT
+    delay = 5
+    while queue or pending:
+        free = max(MAX_ACCOUNT_CREATIONS - len(pending), 0)
+        batch, queue = queue[:free], queue[free:]
+        request_ids = run_tasks(log, batch, submit_account_creation,
+                f_args=(org_client, args, log, account_spec))
+        for a_spec, request_id in zip(batch, request_ids):
+            if request_id:
+                pending[a_spec['Name']] = request_id
+        if batch:
+            delay = 5
+        if pending:
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+            poll_account_creations(org_client, args, log, pending)
+        if (queue or pending) and time.time() > deadline:
+            if pending:
+                log.warn("Account creation still pending for %s. Moving on!" %
+                        ', '.join(sorted(pending)))
+            if queue:
+                log.warn("Account creation not yet requested for %s. "
+                        "Run again to continue." %
+                        ', '.join(a['Name'] for a in queue))
+            break
+
+
+def get_proposed_alias(account, account_spec):
+    """
+    Return the alias an account should have.  Use 'Alias' attribute from
+    account spec if provided.  Otherwise use the account name.
+    """
+    a_spec = lookup(account_spec['accounts'], 'Name', account['Name'])
+    if a_spec and 'Alias' in a_spec:
+        return a_spec['Alias']
+    return account['Name'].lower()
 
 
 def set_account_alias(account, log, args, account_spec, role):
     """
-    Set an alias on an account.  Use 'Alias' attribute from account spec
-    if provided.  Otherwise set the alias to the account name.
+    Set an alias on an account per get_proposed_alias().  Record the
+    resulting alias in the alias store.
     """
     if account['Status'] == 'ACTIVE':
-        a_spec = lookup(account_spec['accounts'], 'Name', account['Name'])
-        if a_spec and 'Alias' in a_spec:
-            proposed_alias = a_spec['Alias']
-        else:
-            proposed_alias = account['Name'].lower()
+        proposed_alias = get_proposed_alias(account, account_spec)
         credentials = get_assume_role_credentials(
                 account['Id'], args['--org-access-role'])
         if isinstance(credentials, RuntimeError):
             log.error(credentials)
             return
         else:
-            iam_client = boto3.client('iam', **credentials)
+            iam_client = get_client('iam', credentials)
         aliases = iam_client.list_account_aliases()['AccountAliases']
         log.debug('account_name: %s; aliases: %s' % (account['Name'], aliases))
+        current_alias = aliases[0] if aliases else ''
         if not aliases:
             log.info("setting account alias to '%s' for account '%s'" %
                     (proposed_alias, account['Name']))
             if args['--exec']:
                 try:
                     iam_client.create_account_alias(AccountAlias=proposed_alias)
+                    current_alias = proposed_alias
                 except Exception as e:
                     log.error(e)
         elif aliases[0] != proposed_alias:
@@ -134,10 +275,13 @@ def set_account_alias(account, log, args, account_spec, role):
                     (account['Name'], proposed_alias, aliases[0]))
             if args['--exec']:
                 iam_client.delete_account_alias(AccountAlias=aliases[0])
+                current_alias = ''
                 try:
                     iam_client.create_account_alias(AccountAlias=proposed_alias)
+                    current_alias = proposed_alias
                 except Exception as e:
                     log.error(e)
+        update_alias_store({account['Id']: current_alias})
 
 
 def scan_invited_accounts(log, org_client):
@@ -236,23 +380,76 @@ def unmanaged_accounts(log, deployed_accounts, account_spec):
     return [a for a in deployed_account_names if a not in spec_account_names]
 
 
-def s3_object_for_accounts(s3_account_bucket, object_key, deployed_accounts):
+def s3_content_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def ensure_s3_bucket(log, s3_client, s3_bucket):
     """
-    Post the deployed_accounts list to s3 bucket
+    Create private bucket 's3_bucket' in the region of s3_client unless
+    it already exists.
     """
-    s3_client = boto3.client('s3')
-    list_buckets_response = s3_client.list_buckets()
-    bucket_list = [a['Name'] for a in list_buckets_response['Buckets']]
-    if s3_account_bucket not in bucket_list:
-        s3_client.create_bucket(
-            ACL = 'private',
-            Bucket = s3_account_bucket,
-            CreateBucketConfiguration = {'LocationConstraint':'us-west-2'})
-    s3_client.put_object(
-	Bucket = s3_account_bucket,
-	Key = object_key,
-	Body = yamlfmt(deployed_accounts))
-    return
+    try:
+        s3_client.head_bucket(Bucket=s3_bucket)
+        return
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('404', 'NoSuchBucket'):
+            raise
+    log.info("Creating s3 bucket '%s'" % s3_bucket)
+    kwargs = dict(ACL='private', Bucket=s3_bucket)
+    region = s3_client.meta.region_name
+    if region and region != 'us-east-1':
+        kwargs['CreateBucketConfiguration'] = {'LocationConstraint': region}
+    s3_client.create_bucket(**kwargs)
+
+
+def s3_object_unchanged(s3_client, s3_bucket, object_key, body):
+    """
+    Return True if 'object_key' already holds 'body'.  Compare the content
+    hash stored in object metadata, else the ETag (md5 of a plain upload).
+    """
+    try:
+        head = s3_client.head_object(Bucket=s3_bucket, Key=object_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+            return False
+        raise
+    content_hash = head.get('Metadata', dict()).get(S3_HASH_METADATA)
+    if content_hash:
+        return content_hash == s3_content_hash(body)
+    return head['ETag'].strip('"') == hashlib.md5(body).hexdigest()
+
+
+def s3_object_for_accounts(log, s3_account_bucket, object_key, deployed_accounts):
+    """
+    Post the deployed_accounts list to s3 bucket as yaml, with a gzip'd
+    json copy alongside.  Objects are only written when their content has
+    changed.  Return True if anything was written.
+    """
+    s3_client = get_client('s3')
+    ensure_s3_bucket(log, s3_client, s3_account_bucket)
+    yaml_body = yamlfmt(deployed_accounts).encode()
+    json_body = gzip.compress(json.dumps(deployed_accounts,
+            default=str, sort_keys=True, separators=(',', ':')).encode(), mtime=0)
+    objects = [
+        (object_key, yaml_body, dict(ContentType='text/yaml')),
+        (os.path.splitext(object_key)[0] + '.json.gz', json_body,
+                dict(ContentType='application/json', ContentEncoding='gzip')),
+    ]
+    published = False
+    for key, body, kwargs in objects:
+        if s3_object_unchanged(s3_client, s3_account_bucket, key, body):
+            log.debug("s3 object '%s' is unchanged" % key)
+            continue
+        log.debug("publishing s3 object '%s'" % key)
+        s3_client.put_object(
+                Bucket=s3_account_bucket,
+                Key=key,
+                Body=body,
+                Metadata={S3_HASH_METADATA: s3_content_hash(body)},
+                **kwargs)
+        published = True
+    return published
 
 
 def main():
@@ -266,7 +463,7 @@ def main():
     if isinstance(credentials, RuntimeError):
         log.critical(credentials)
         sys.exit(1)
-    org_client = boto3.client('organizations', **credentials)
+    org_client = get_client('organizations', credentials)
     root_id = get_root_id(org_client)
     deployed_accounts = scan_deployed_accounts(log, org_client)
 
@@ -277,7 +474,8 @@ def main():
         display_provisioned_accounts(log, deployed_accounts, 'SUSPENDED')
         display_invited_accounts(log, org_client)
         s3_bucket = get_s3_bucket_name()
-        s3_object_for_accounts(s3_bucket, S3_OBJECT_KEY, deployed_accounts)
+        s3_object_for_accounts(log, s3_bucket, S3_OBJECT_KEY, deployed_accounts)
+        log_run_stats(log)
         return
 
     account_spec = validate_spec(log, args)
@@ -290,13 +488,20 @@ def main():
             log.warn("Unmanaged accounts in Org: %s" % (', '.join(unmanaged)))
 
     if args['alias']:
-        queue_threads(log, deployed_accounts, set_account_alias,
+        # only visit accounts whose stored alias is stale or wrong
+        cached = load_alias_store()
+        accounts = [a for a in deployed_accounts
+                if cached.get(a['Id']) != get_proposed_alias(a, account_spec)]
+        log.debug('accounts with alias per spec in alias store: %s' %
+                (len(deployed_accounts) - len(accounts)))
+        run_tasks(log, accounts, set_account_alias,
                 f_args=(log, args, account_spec, args['--org-access-role']),
-                thread_count=10)
+                limit=10, log_errors=True)
 
     if args['invite']:
         invite_account(log, args, org_client, deployed_accounts)
-        
+
+    log_run_stats(log)
 
 if __name__ == "__main__":
     main()
@@ -50,12 +50,10 @@ Options:
 
 """
 
-import os
 import sys
-import yaml
 import json
+import datetime
 
-import boto3
 from botocore.exceptions import ClientError
 from docopt import docopt
 
@@ -66,19 +64,47 @@ from awsorgs.loginprofile import *
 from awsorgs.reports import *
 
 
+def expire_login_profile(user_name, log, args, iam_client, ttl, last_changed):
+    """
+    Delete login profile of 'user_name' if it still requires a password
+    reset and its password was set more than 'ttl' (timedelta) ago.
+    'last_changed' maps user name to the credential report's
+    'password_last_changed' time.  The login profile's CreateDate is not
+    used, as resetting a password does not change it.
+    """
+    try:
+        login_profile = iam_client.get_login_profile(
+                UserName=user_name)['LoginProfile']
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchEntity':
+            return
+        raise
+    if (login_profile['PasswordResetRequired']
+            and utcnow() - last_changed[user_name] > ttl):
+        log.info('deleting login profile for user %s' % user_name)
+        if args['--exec']:
+            iam_client.delete_login_profile(UserName=user_name)
+
+
 def expire_users(log, args, deployed, auth_spec, credentials):
     """
-    Delete login profile for any users whose one-time-password has expired
+    Delete login profile for any users whose one-time-password has expired.
+
+    Candidates come from a freshly generated IAM credential report: users
+    whose password was set more than --opt-ttl hours ago and not used
+    since.  Each candidate's login profile is checked with
+    get_login_profile, and deleted only if it still requires a password
+    reset.  Candidates are handled concurrently.
     """
-    for name in [u['UserName'] for u in deployed['users']]:
-        user = validate_user(name, credentials)
-        if user:
-            login_profile = validate_login_profile(user)
-            if login_profile and onetime_passwd_expired(log, user, login_profile,
-                    int(args['--opt-ttl'])):
-                log.info('deleting login profile for user %s' % user.name)
-                if args['--exec']:
-                    login_profile.delete()
+    iam_client = get_client('iam', credentials)
+    ttl = datetime.timedelta(hours=int(args['--opt-ttl']))
+    user_names = set(u['UserName'] for u in deployed['users'])
+    last_changed = find_expired_onetime_passwords(
+            get_credential_report(iam_client, max_age=0), ttl)
+    candidates = [name for name in last_changed if name in user_names]
+    log.debug('users with unused password older than ttl: %s' % candidates)
+    run_tasks(log, candidates, expire_login_profile,
+            f_args=(log, args, iam_client, ttl, last_changed))
 
 
 def delete_user(user):
@@ -133,205 +159,328 @@ def delete_policy(policy):
     policy.delete()
 
 
+def run_spec_tasks(log, specs, func, f_args=()):
+    """
+    Run func(spec, spec_log, *f_args) concurrently for each spec in
+    'specs'.  Each task logs to its own LogBuffer, replayed in spec order.
+    """
+    def task(spec):
+        spec_log = LogBuffer(log)
+        func(spec, spec_log, *f_args)
+        return spec_log
+    for spec, spec_log in iter_tasks_ordered(log, specs, task):
+        spec_log.flush()
+
+
+def tags_differ(current_tags, tags):
+    """Compare two IAM tag lists, ignoring order"""
+    return (dict((t['Key'], t['Value']) for t in current_tags or [])
+            != dict((t['Key'], t['Value']) for t in tags))
+
+
+def reconcile_user(u_spec, log, credentials, args, deployed, auth_spec):
+    """
+    Create, update or delete one IAM user based on user specification.
+    Current path and tags are read from the deployed user entry.
+    """
+    iam_client = get_client('iam', credentials)
+    tags = [
+        {'Key': 'team',  'Value': u_spec['Team']},
+        {'Key': 'email', 'Value': u_spec['Email']},
+    ]
+    path = munge_path(auth_spec['default_path'], u_spec)
+    deployed_user = lookup(deployed['users'], 'UserName', u_spec['Name'])
+    if deployed_user:
+        # delete user
+        if ensure_absent(u_spec):
+            log.info("Deleting user '%s'" % u_spec['Name'])
+            if args['--exec']:
+                delete_user(get_resource('iam', credentials).User(u_spec['Name']))
+                deployed['users'].remove(deployed_user)
+            return
+        # update user
+        if deployed_user['Path'] != path:
+            log.info("Updating path for user '%s'" % u_spec['Name'])
+            if args['--exec']:
+                iam_client.update_user(UserName=u_spec['Name'], NewPath=path)
+                deployed_user['Path'] = path
+        if tags_differ(deployed_user.get('Tags'), tags):
+            log.info("Updating tags for user '%s'" % u_spec['Name'])
+            if args['--exec']:
+                iam_client.tag_user(UserName=u_spec['Name'], Tags=tags)
+                deployed_user['Tags'] = tags
+    # create new user
+    elif not ensure_absent(u_spec):
+        log.info("Creating user '%s'" % u_spec['Name'])
+        if args['--exec']:
+            response = iam_client.create_user(
+                UserName=u_spec['Name'],
+                Path=path,
+                Tags=tags,
+            )
+            log.info(response['User']['Arn'])
+            user = response['User']
+            user['GroupList'] = []
+            user['Tags'] = tags
+            deployed['users'].append(user)
+
+
 def create_users(credentials, args, log, deployed, auth_spec):
     """
-    Manage IAM users based on user specification
-    """
-    iam_client = boto3.client('iam', **credentials)
-    iam_resource = boto3.resource('iam', **credentials)
-    for u_spec in auth_spec['users']:
-        tags = [
-            {'Key': 'team',  'Value': u_spec['Team']},
-            {'Key': 'email', 'Value': u_spec['Email']},
-        ]
-        path = munge_path(auth_spec['default_path'], u_spec)
-        deployed_user = lookup(deployed['users'], 'UserName', u_spec['Name'])
-        if deployed_user:
-            user = iam_resource.User(u_spec['Name'])
-            # delete user
-            if ensure_absent(u_spec):
-                log.info("Deleting user '%s'" % user.name)
-                if args['--exec']:
-                    delete_user(user)
-            # update user
-            elif user.path != path:
-                log.info("Updating path for user '%s'" % u_spec['Name'])
-                if args['--exec']:
-                    user.update(NewPath=path)
-            elif user.tags != tags:
-                log.info("Updating tags for user '%s'" % u_spec['Name'])
+    Manage IAM users based on user specification.  Users are handled
+    concurrently.
+    """
+    run_spec_tasks(log, auth_spec['users'], reconcile_user,
+            f_args=(credentials, args, deployed, auth_spec))
+
+
+def reconcile_group(g_spec, log, credentials, args, deployed, auth_spec):
+    """
+    Create, update or delete one IAM group based on group specification.
+    Current path, members and policies are read from deployed entries.
+    """
+    iam_client = get_client('iam', credentials)
+    path = munge_path(auth_spec['default_path'], g_spec)
+    deployed_group = lookup(deployed['groups'], 'GroupName', g_spec['Name'])
+    if deployed_group:
+        # delete group?
+        if ensure_absent(g_spec):
+            # check if group has users
+            if [u for u in deployed['users']
+                    if g_spec['Name'] in u.get('GroupList', [])]:
+                log.error("Can not delete group '%s'. Still contains users"
+                         % g_spec['Name'])
+            else:
+                log.info("Deleting group '%s'" % g_spec['Name'])
                 if args['--exec']:
-                    iam_client.tag_user(
-                        UserName=user.name,
-                        Tags=tags,
-                    )
-        # create new user
-        elif not ensure_absent(u_spec):
-            log.info("Creating user '%s'" % u_spec['Name'])
+                    for policy in deployed_group.get('GroupPolicyList', []):
+                        iam_client.delete_group_policy(GroupName=g_spec['Name'],
+                                PolicyName=policy['PolicyName'])
+                    for policy_arn in attached_policy_arns(deployed_group).values():
+                        iam_client.detach_group_policy(GroupName=g_spec['Name'],
+                                PolicyArn=policy_arn)
+                    iam_client.delete_group(GroupName=g_spec['Name'])
+                    deployed['groups'].remove(deployed_group)
+        # update group?
+        elif deployed_group['Path'] != path:
+            log.info("Updating path on group '%s'" % g_spec['Name'])
             if args['--exec']:
-                response = iam_client.create_user(
-                    UserName=u_spec['Name'],
-                    Path=path,
-                    Tags=tags,
-                )
-                log.info(response['User']['Arn'])
-                deployed['users'].append(response['User'])
+                iam_client.update_group(GroupName=g_spec['Name'], NewPath=path)
+                deployed_group['Path'] = path
+    # create group
+    elif not ensure_absent(g_spec):
+        log.info("Creating group '%s'" % g_spec['Name'])
+        if args['--exec']:
+            response = iam_client.create_group(
+                    GroupName=g_spec['Name'], Path=path)
+            log.info(response['Group']['Arn'])
+            group = response['Group']
+            group['GroupPolicyList'] = []
+            group['AttachedManagedPolicies'] = []
+            deployed['groups'].append(group)
 
 
 def create_groups(credentials, args, log, deployed, auth_spec):
     """
-    Manage IAM groups based on group specification
+    Manage IAM groups based on group specification.  Groups are handled
+    concurrently.
     """
-    iam_client = boto3.client('iam', **credentials)
-    iam_resource = boto3.resource('iam', **credentials)
-    for g_spec in auth_spec['groups']:
-        path = munge_path(auth_spec['default_path'], g_spec)
-        deployed_group = lookup(deployed['groups'], 'GroupName', g_spec['Name'])
-        if deployed_group:
-            group = iam_resource.Group(g_spec['Name'])
-            # delete group?
-            if ensure_absent(g_spec):
-                # check if group has users
-                if list(group.users.all()):
-                    log.error("Can not delete group '%s'. Still contains users"
-                             % g_spec['Name'])
+    run_spec_tasks(log, auth_spec['groups'], reconcile_group,
+            f_args=(credentials, args, deployed, auth_spec))
+
+
+def spec_group_members(log, g_spec, auth_spec):
+    """Return list of user names specified as members of a group"""
+    spec_members = []
+    if 'Members' in g_spec and g_spec['Members']:
+        if g_spec['Members'] == 'ALL':
+            # all managed users except when user ensure: absent
+            spec_members = [user['Name'] for user in auth_spec['users']
+                    if not ensure_absent(user)]
+            if 'ExcludeMembers' in g_spec and g_spec['ExcludeMembers']:
+                spec_members = [user for user in spec_members
+                        if user not in g_spec['ExcludeMembers']]
+        else:
+            # just specified members
+            for username in g_spec['Members']:
+                u_spec = lookup(auth_spec['users'], 'Name', username)
+                # not a managed user?
+                if not u_spec:
+                    log.error("User '%s' not in auth_spec['users']. "
+                            "Can not add user to group '%s'" %
+                            (username, g_spec['Name']))
+                # managed but absent?
+                elif ensure_absent(u_spec):
+                    log.error("User '%s' is specified 'absent' in "
+                            "auth_spec['users']. Can not add user "
+                            "to group '%s'" % 
+                            (username, g_spec['Name']))
                 else:
-                    log.info("Deleting group '%s'" % g_spec['Name'])
-                    if args['--exec']:
-                        for policy in group.policies.all():
-                            policy.delete()
-                        for policy in group.attached_policies.all():
-                            policy.detach_group(GroupName=g_spec['Name'])
-                        group.delete()
-                        deployed['groups'].remove(deployed_group)
-            # update group?
-            elif group.path != path:
-                log.info("Updating path on group '%s'" % g_spec['Name'])
+                    spec_members.append(username)
+    return spec_members
+
+
+def reconcile_group_members(g_spec, log, iam_client, args, auth_spec,
+        group_members):
+    """
+    Add and remove users from one group based on group specification.
+    'group_members' maps group names to current member user names.
+    """
+    current_members = group_members.get(g_spec['Name'], [])
+    spec_members = spec_group_members(log, g_spec, auth_spec)
+    # ensure all specified members are in group
+    if not ensure_absent(g_spec):
+        for username in spec_members:
+            if username not in current_members:
+                log.info("Adding user '%s' to group '%s'" %
+                        (username, g_spec['Name']))
                 if args['--exec']:
-                    group.update(NewPath=path)
-        # create group
-        elif not ensure_absent(g_spec):
-            log.info("Creating group '%s'" % g_spec['Name'])
+                    iam_client.add_user_to_group(
+                            GroupName=g_spec['Name'], UserName=username)
+    # ensure no unspecified members are in group
+    for username in current_members:
+        if username not in spec_members:
+            log.info("Removing user '%s' from group '%s'" %
+                    (username, g_spec['Name']))
             if args['--exec']:
-                response = iam_client.create_group(
-                        GroupName=g_spec['Name'], Path=path)
-                log.info(response['Group']['Arn'])
-                deployed['groups'].append(response['Group'])
+                iam_client.remove_user_from_group(
+                        GroupName=g_spec['Name'], UserName=username)
 
 
 def manage_group_members(credentials, args, log, deployed, auth_spec):
     """
-    Populate users into groups based on group specification.
+    Populate users into groups based on group specification.  Current
+    group membership is read from the 'GroupList' of deployed users.
+    Groups are handled concurrently.
     """
-    iam_resource = boto3.resource('iam', **credentials)
-    for g_spec in auth_spec['groups']:
-        if lookup(deployed['groups'], 'GroupName', g_spec['Name']):
-            group = iam_resource.Group(g_spec['Name'])
-            current_members = [user.name for user in group.users.all()] 
-            # build list of specified group members
-            spec_members = []
-            if 'Members' in g_spec and g_spec['Members']:
-                if g_spec['Members'] == 'ALL':
-                    # all managed users except when user ensure: absent
-                    spec_members = [user['Name'] for user in auth_spec['users']
-                            if not ensure_absent(user)]
-                    if 'ExcludeMembers' in g_spec and g_spec['ExcludeMembers']:
-                        spec_members = [user for user in spec_members
-                                if user not in g_spec['ExcludeMembers']]
-                else:
-                    # just specified members
-                    for username in g_spec['Members']:
-                        u_spec = lookup(auth_spec['users'], 'Name', username)
-                        # not a managed user?
-                        if not u_spec:
-                            log.error("User '%s' not in auth_spec['users']. "
-                                    "Can not add user to group '%s'" %
-                                    (username, g_spec['Name']))
-                        # managed but absent?
-                        elif ensure_absent(u_spec):
-                            log.error("User '%s' is specified 'absent' in "
-                                    "auth_spec['users']. Can not add user "
-                                    "to group '%s'" % 
-                                    (username, g_spec['Name']))
-                        else:
-                            spec_members.append(username)
-            # ensure all specified members are in group
-            if not ensure_absent(g_spec):
-                for username in spec_members:
-                    if username not in current_members:
-                        log.info("Adding user '%s' to group '%s'" %
-                                (username, g_spec['Name']))
-                        if args['--exec']:
-                            group.add_user(UserName=username)
-            # ensure no unspecified members are in group
-            for username in current_members:
-                if username not in spec_members:
-                    log.info("Removing user '%s' from group '%s'" %
-                            (username, g_spec['Name']))
-                    if args['--exec']:
-                        group.remove_user(UserName=username)
+    iam_client = get_client('iam', credentials)
+    group_members = dict()
+    for user in deployed['users']:
+        for group_name in user.get('GroupList', []):
+            group_members.setdefault(group_name, []).append(user['UserName'])
+    g_specs = [g_spec for g_spec in auth_spec['groups']
+            if lookup(deployed['groups'], 'GroupName', g_spec['Name'])]
+    run_spec_tasks(log, g_specs, reconcile_group_members,
+            f_args=(iam_client, args, auth_spec, group_members))
+
+
+def resolve_group_policy(policy_name, log, iam_client, args, auth_spec,
+        snapshot, auth_account, policy_arns):
+    """
+    Find the arn of a policy named in a group specification and record it
+    in 'policy_arns'.  Custom policies are created or updated first.
+    """
+    if lookup(auth_spec['custom_policies'], 'PolicyName', policy_name):
+        policy_arn = manage_custom_policy(iam_client, auth_account,
+                policy_name, args, log, auth_spec, snapshot)
+    else:
+        policy_arn = get_policy_arn(iam_client, policy_name, snapshot)
+    log.debug("policy Arn for '%s': %s" % (policy_name, policy_arn))
+    policy_arns[policy_name] = policy_arn
+
+
+def reconcile_group_policies(g_spec, log, iam_client, args, deployed,
+        auth_account, policy_arns):
+    """
+    Attach and detach managed policies for one group based on group
+    specification.  'policy_arns' maps specified policy names to arns.
+    """
+    group = lookup(deployed['groups'], 'GroupName', g_spec['Name'])
+    log.debug("processing group spec for '%s':\n%s" % (g_spec['Name'], g_spec))
+    attached_policies = attached_policy_arns(group)
+    log.debug("attached policies: '%s'" % list(attached_policies))
+    log.debug("specified policies: '%s'" % g_spec['Policies'])
+    # attach missing policies
+    for policy_name in g_spec['Policies']:
+        if not policy_name in attached_policies:
+            policy_arn = policy_arns.get(policy_name)
+            log.info("Attaching policy '%s' to group '%s' in "
+                    "account '%s'" % (policy_name, g_spec['Name'],
+                    auth_account))
+            if args['--exec']:
+                if policy_arn is None:
+                    log.error("No arn found for policy '%s'. Can not attach "
+                            "to group '%s'" % (policy_name, g_spec['Name']))
+                    continue
+                iam_client.attach_group_policy(
+                        GroupName=g_spec['Name'], PolicyArn=policy_arn)
+    # datach obsolete policies
+    for policy_name, policy_arn in attached_policies.items():
+        if not policy_name in g_spec['Policies']:
+            log.info("Detaching policy '%s' from group '%s' in "
+                    "account '%s'" % (policy_name, g_spec['Name'],
+                    auth_account))
+            if args['--exec']:
+                iam_client.detach_group_policy(
+                        GroupName=g_spec['Name'], PolicyArn=policy_arn)
 
 
 def manage_group_policies(credentials, args, log, deployed, auth_spec):
     """
-    Attach managed policies to groups based on group specification
+    Attach managed policies to groups based on group specification.
+    Policies are resolved once each, and only if a group needs them:
+    custom policies named by any managed group, which are created or
+    updated, and other policies not yet attached to a group which names
+    them.  Then groups are handled concurrently.
     """
-    iam_client = boto3.client('iam', **credentials)
-    iam_resource = boto3.resource('iam', **credentials)
+    iam_client = get_client('iam', credentials)
     auth_account = lookup(deployed['accounts'], 'Id',
             auth_spec['auth_account_id'], 'Name')
     log.debug("auth account: '%s'" % auth_account)
+    g_specs = []
     for g_spec in auth_spec['groups']:
         if (lookup(deployed['groups'], 'GroupName', g_spec['Name'])
                 and not ensure_absent(g_spec)):
-            log.debug("processing group spec for '%s':\n%s" % (g_spec['Name'], g_spec))
-            group = iam_resource.Group(g_spec['Name'])
-            attached_policies = [p.policy_name for p in list(group.attached_policies.all())]
-            log.debug("attached policies: '%s'" % attached_policies)
             if not 'Policies' in g_spec or g_spec['Policies'] is None:
                 g_spec['Policies'] = []
-            if g_spec['Policies']:
-                log.debug("specified policies: '%s'" % g_spec['Policies'])
-                # attach missing policies
-                for policy_name in g_spec['Policies']:
-                    if not policy_name in attached_policies:
-                        policy_arn = get_policy_arn(iam_client, policy_name)
-                        if policy_arn is None:
-                            policy_arn = manage_custom_policy(iam_client, auth_account,
-                                    policy_name, args, log, auth_spec)
-                        log.debug("policy Arn for '%s': %s" % (policy_name, policy_arn))
-                        log.info("Attaching policy '%s' to group '%s' in "
-                                "account '%s'" % (policy_name, g_spec['Name'],
-                                auth_account))
-                        if args['--exec']:
-                            group.attach_policy(PolicyArn=policy_arn)
-                    # update custom policy
-                    elif lookup(auth_spec['custom_policies'], 'PolicyName', policy_name):
-                        manage_custom_policy(iam_client, auth_account, policy_name,
-                                args, log, auth_spec)
-            # datach obsolete policies
-            for policy_name in attached_policies:
-                if not policy_name in g_spec['Policies']:
-                    policy_arn = get_policy_arn(iam_client, policy_name)
-                    log.info("Detaching policy '%s' from group '%s' in "
-                            "account '%s'" % (policy_name, g_spec['Name'],
-                            auth_account))
-                    if args['--exec']:
-                        group.detach_policy(PolicyArn=policy_arn)
-
-
-def get_policy_arn(iam_client, policy_name):
-    """
-    Return the policy arn of the named IAM policy in an account.
-    """
-    aws_policies = get_iam_objects(iam_client.list_policies, 'Policies')
-    return lookup(aws_policies, 'PolicyName', policy_name, 'Arn')
-
-
-def manage_custom_policy(iam_client, account_name, policy_name, args, log, auth_spec):
+            g_specs.append(g_spec)
+    policy_names = []
+    for g_spec in g_specs:
+        attached = attached_policy_arns(
+                lookup(deployed['groups'], 'GroupName', g_spec['Name']))
+        policy_names += [p for p in g_spec['Policies']
+                if p not in policy_names and (p not in attached
+                    or lookup(auth_spec['custom_policies'], 'PolicyName', p))]
+    policy_arns = dict()
+    run_spec_tasks(log, policy_names, resolve_group_policy,
+            f_args=(iam_client, args, auth_spec, deployed['auth'],
+                    auth_account, policy_arns))
+    run_spec_tasks(log, g_specs, reconcile_group_policies,
+            f_args=(iam_client, args, deployed, auth_account, policy_arns))
+
+
+def manage_users_and_groups(credentials, args, log, deployed, auth_spec):
+    """
+    Reconcile IAM users and groups in the auth account.  Users, then
+    groups, then group memberships, then group policies, each phase
+    running concurrently over the specs and reading current state from
+    the prefetched snapshot in deployed['auth'].
+    """
+    create_users(credentials, args, log, deployed, auth_spec)
+    create_groups(credentials, args, log, deployed, auth_spec)
+    manage_group_members(credentials, args, log, deployed, auth_spec)
+    manage_group_policies(credentials, args, log, deployed, auth_spec)
+
+
+def get_policy_arn(iam_client, policy_name, snapshot):
+    """
+    Return the policy arn of the named IAM policy in an account.  Custom
+    policies are resolved from the account 'snapshot'.  Otherwise look in
+    the process-wide map of AWS managed policies.
+    """
+    policy_arn = lookup(snapshot['policies'], 'PolicyName', policy_name, 'Arn')
+    if policy_arn is None:
+        policy_arn = get_aws_managed_policies(iam_client).get(policy_name)
+    return policy_arn
+
+
+def manage_custom_policy(iam_client, account_name, policy_name, args, log,
+            auth_spec, snapshot):
     """
     Create or update a custom IAM policy in an account based on a 
-    policy specification.  Returns the policy arn.
+    policy specification.  Returns the policy arn.  Existing custom
+    policies are looked up in the account 'snapshot', which is updated
+    in place with any changes made.
     """
     log.debug("account: '{}', policy_name: '{}'".format(account_name, policy_name))
     p_spec = lookup(auth_spec['custom_policies'], 'PolicyName', policy_name)
@@ -342,8 +491,7 @@ def manage_custom_policy(iam_client, account_name, policy_name, args, log, auth_
     policy_doc = dict(Version='2012-10-17', Statement=p_spec['Statement'])
 
     # check if custom policy exists
-    custom_policies = get_iam_objects(
-            iam_client.list_policies, 'Policies', dict(Scope='Local'))
+    custom_policies = snapshot['policies']
     log.debug("account: '%s', custom policies: '%s'" % (
             account_name,
             [p['Arn'] for p in custom_policies]))
@@ -352,20 +500,24 @@ def manage_custom_policy(iam_client, account_name, policy_name, args, log, auth_
         log.info("Creating custom policy '%s' in account '%s':\n%s" %
                 (policy_name, account_name, yamlfmt(policy_doc)))
         if args['--exec']:
-            return iam_client.create_policy(
+            policy = iam_client.create_policy(
                 PolicyName=policy_name,
                 Path=munge_path(auth_spec['default_path'], p_spec),
                 Description=p_spec['Description'],
                 PolicyDocument=json.dumps(policy_doc),
-            )['Policy']['Arn']
+            )['Policy']
+            policy['Document'] = policy_doc
+            policy['PolicyVersionList'] = [dict(
+                    VersionId=policy['DefaultVersionId'],
+                    IsDefaultVersion=True,
+                    Document=policy_doc)]
+            snapshot['policies'].append(policy)
+            return policy['Arn']
         return None
 
     # check if custom policy needs updating
     else:
-        current_doc = iam_client.get_policy_version(
-                PolicyArn=policy['Arn'],
-                VersionId=policy['DefaultVersionId']
-                )['PolicyVersion']['Document']
+        current_doc = policy['Document']
         log.debug("account: '%s', policy_doc: %s" % (account_name, policy_doc))
         log.debug("account: '%s', current_doc: %s" % (account_name, current_doc))
 
@@ -384,8 +536,7 @@ def manage_custom_policy(iam_client, account_name, policy_name, args, log, auth_
                     string_differ(yamlfmt(current_doc), yamlfmt(policy_doc))))
             if args['--exec']:
                 log.debug("check for non-default policy versions for '%s'" % policy_name)
-                for v in iam_client.list_policy_versions(
-                        PolicyArn=policy['Arn'])['Versions']:
+                for v in policy.get('PolicyVersionList', []):
                     if not v['IsDefaultVersion']:
                         log.info("Deleting non-default policy version '%s' for "
                                 "policy '%s' in account '%s'" %
@@ -393,10 +544,13 @@ def manage_custom_policy(iam_client, account_name, policy_name, args, log, auth_
                         iam_client.delete_policy_version(
                                 PolicyArn=policy['Arn'],
                                 VersionId=v['VersionId'])
-                iam_client.create_policy_version(
+                version = iam_client.create_policy_version(
                         PolicyArn=policy['Arn'],
                         PolicyDocument=json.dumps(policy_doc),
-                        SetAsDefault=True)
+                        SetAsDefault=True)['PolicyVersion']
+                version['Document'] = policy_doc
+                policy['Document'] = policy_doc
+                policy['PolicyVersionList'] = [version]
         return policy['Arn']
 
 
@@ -428,79 +582,93 @@ def assemble_assume_role_policy_document(resource, effect):
     return dict(Version='2012-10-17', Statement=[statement])
 
 
-def create_group_policy(args, log, group, account, policy_name, policy_doc):
+def create_group_policy(args, log, iam_client, group, account, policy_name, policy_doc):
     log.info("Creating assume role policy '{}' for group '{}' in account '{}':\n{}".format(
         policy_name, 
-        group.name,
+        group['GroupName'],
         account, 
         yamlfmt(policy_doc),
     ))
     if args['--exec']:
-        group.create_policy(
+        iam_client.put_group_policy(
+            GroupName=group['GroupName'],
             PolicyName=policy_name,
             PolicyDocument=json.dumps(policy_doc),
         )
 
 
-def update_group_policy(args, log, group, account, policy_name, policy_doc):
+def update_group_policy(args, log, iam_client, group, account, policy_name,
+            policy_doc, current_doc):
     log.info("Updating policy '{}' for group '{}' in account '{}':\n{}".format(
         policy_name, 
-        group.name,
+        group['GroupName'],
         account,
         string_differ(
-            yamlfmt(group.Policy(policy_name).policy_document), 
+            yamlfmt(current_doc), 
             yamlfmt(policy_doc),
         ),
     ))
     if args['--exec']:
-        group.Policy(policy_name).put(PolicyDocument=json.dumps(policy_doc))
+        iam_client.put_group_policy(
+            GroupName=group['GroupName'],
+            PolicyName=policy_name,
+            PolicyDocument=json.dumps(policy_doc),
+        )
 
 
-def manage_group_policy(args, log, group, account, policy_name, policy_doc, group_policies):
+def manage_group_policy(args, log, iam_client, group, account, policy_name,
+            policy_doc, group_policies):
     if not policy_name in group_policies:
-        create_group_policy(args, log, group, account, policy_name, policy_doc)
-    elif group.Policy(policy_name).policy_document != policy_doc:
-        update_group_policy(args, log, group, account, policy_name, policy_doc)
+        create_group_policy(args, log, iam_client, group, account, policy_name, policy_doc)
+    elif group_policies[policy_name] != policy_doc:
+        update_group_policy(args, log, iam_client, group, account, policy_name,
+                policy_doc, group_policies[policy_name])
 
 
-def delete_group_policy(args, log, group, account, policy_name):
+def delete_group_policy(args, log, iam_client, group, account, policy_name):
     log.info("Deleting assume role group policy '{}' from group '{}' in account '{}'".format(
         policy_name,
-        group.name,
+        group['GroupName'],
         account,
     ))
     if args['--exec']:
-        group.Policy(policy_name).delete()
+        iam_client.delete_group_policy(
+            GroupName=group['GroupName'],
+            PolicyName=policy_name,
+        )
 
 
-def delete_obsolete_group_policy(args, log, group, account, policy_name, managed_policies):
+def delete_obsolete_group_policy(args, log, iam_client, group, account,
+            policy_name, managed_policies):
     if policy_name not in managed_policies:
         log.info("Deleting obsolete policy '{}' from group '{}' in account '{}'".format(
             policy_name,
-            group.name,
+            group['GroupName'],
             account,
         ))
         if args['--exec']:
-            group.Policy(policy_name).delete()
+            iam_client.delete_group_policy(
+                GroupName=group['GroupName'],
+                PolicyName=policy_name,
+            )
 
 
 def set_group_assume_role_policies(args, log, deployed, auth_spec, d_spec):
     """
     Assign and manage assume role trust policies on IAM groups in
-    Auth account.
+    Auth account.  Current group policies are read from the deployed
+    group entry in the Auth account snapshot.
     """
     log.debug('role: %s' % d_spec['RoleName'])
     credentials = get_assume_role_credentials(
         args['--auth-account-id'],
         args['--org-access-role'],
     )
-    iam_resource = boto3.resource('iam', **credentials)
+    iam_client = get_client('iam', credentials)
     auth_account = lookup(deployed['accounts'], 'Id', auth_spec['auth_account_id'], 'Name')
     managed_policies = []
-    if lookup(deployed['groups'], 'GroupName', d_spec['TrustedGroup']):
-        group = iam_resource.Group(d_spec['TrustedGroup'])
-        group.load()
-    else:
+    group = lookup(deployed['groups'], 'GroupName', d_spec['TrustedGroup'])
+    if not group:
         log.error(
             "Can not manage assume role policy for delegation role '{}' in group '{}'. "
             "Group not found in auth account '{}'".format(
@@ -511,16 +679,17 @@ def set_group_assume_role_policies(args, log, deployed, auth_spec, d_spec):
         )
         return
 
-    # make list of existing group policies which match this role name
-    group_policies = [
-        p.policy_name for p in list(group.policies.all())
-        if d_spec['RoleName'] in p.policy_name.split('-')
-    ]
+    # make dict of existing group policies which match this role name
+    group_policies = dict(
+        (p['PolicyName'], p['PolicyDocument'])
+        for p in group.get('GroupPolicyList', [])
+        if d_spec['RoleName'] in p['PolicyName'].split('-')
+    )
 
     # test if delegation should be deleted
     if ensure_absent(d_spec): 
         for policy_name in group_policies:
-            delete_group_policy(args, log, group, auth_account, policy_name)
+            delete_group_policy(args, log, iam_client, group, auth_account, policy_name)
         return
 
     # handle trusting accounts
@@ -533,7 +702,8 @@ def set_group_assume_role_policies(args, log, deployed, auth_spec, d_spec):
     policy_doc = assemble_assume_role_policy_document(resource, 'Allow')
     policy_name = "AllowAssumeRole-{}".format(d_spec['RoleName'])
     manage_group_policy(
-        args, log, group, auth_account, policy_name, policy_doc, group_policies
+        args, log, iam_client, group, auth_account, policy_name, policy_doc,
+        group_policies
     )
     managed_policies.append(policy_name)
 
@@ -545,136 +715,126 @@ def set_group_assume_role_policies(args, log, deployed, auth_spec, d_spec):
         policy_doc = assemble_assume_role_policy_document(resource, 'Deny')
         policy_name = "DenyAssumeRole-{}".format(d_spec['RoleName'])
         manage_group_policy(
-            args, log, group, auth_account, policy_name, policy_doc, group_policies
+            args, log, iam_client, group, auth_account, policy_name, policy_doc,
+            group_policies
         )
         managed_policies.append(policy_name)
 
     # purge any policies for this role that are no longer being managed
     for policy_name in group_policies:
-        delete_obsolete_group_policy(args, log, group, auth_account, policy_name, managed_policies)
+        delete_obsolete_group_policy(args, log, iam_client, group, auth_account,
+                policy_name, managed_policies)
 
 
-def manage_local_user_in_accounts(
-            account, args, log, auth_spec, deployed, accounts, lu_spec):
+def manage_local_user_in_account(account, args, log, auth_spec, deployed,
+            accounts, lu_spec, iam_client, iam_resource, snapshot):
     """
     Create and manage a local user in an account per user specification.
+    Current user state is read from the account IAM 'snapshot'.
     """
-
     account_name = account['Name']
-    log.debug('account: %s, local user: %s' % (account_name, lu_spec['Name']))
+    user_name = lu_spec['Name']
+    log.debug('account: %s, local user: %s' % (account_name, user_name))
     path_spec = munge_path(auth_spec['default_path'], lu_spec)
-    credentials = get_assume_role_credentials(account['Id'], args['--org-access-role'])
-    if isinstance(credentials, RuntimeError):
-        log.error(credentials)
-        return
-    iam_client = boto3.client('iam', **credentials)
-    iam_resource = boto3.resource('iam', **credentials)
 
-    # get iam user object.
-    user = iam_resource.User(lu_spec['Name'])
-    try:
-        user.load()
-    except user.meta.client.exceptions.NoSuchEntityException:
-        user_exists = False
-    else:
-        user_exists = True
-        log.debug('account: %s, local user exists: %s' % (account_name, user.arn))
+    deployed_user = lookup(snapshot['users'], 'UserName', user_name)
+    if deployed_user:
+        log.debug('account: %s, local user exists: %s' %
+                (account_name, deployed_user['Arn']))
 
-    # check for unmanaged user in account
-    if user_exists:
-        if not user.path.startswith('/' + auth_spec['default_path']):
+        # check for unmanaged user in account
+        if not deployed_user['Path'].startswith('/' + auth_spec['default_path']):
             log.error(
                     "Can not manage local user '%s' in account '%s'. "
                     " Unmanaged user with the same name already exists: %s" % 
-                    (user.name, account_name, user.arn))
+                    (user_name, account_name, deployed_user['Arn']))
             return
 
     # check if local user should not exist
     if account_name not in accounts or ensure_absent(lu_spec):
-        if user_exists:
+        if deployed_user:
             log.info("Deleting local user '%s' from account '%s'" %
-                    (user.name, account_name))
+                    (user_name, account_name))
             if args['--exec']:
-                delete_user(user)
+                delete_user(iam_resource.User(user_name))
         return
 
     # create local user and attach policies
-    if not user_exists:
+    if not deployed_user:
         log.info("Creating local user '%s' in account '%s'" %
-                (lu_spec['Name'], account_name))
+                (user_name, account_name))
         if args['--exec']:
-            user.create(Path=path_spec)
+            iam_client.create_user(UserName=user_name, Path=path_spec)
             if 'Policies' in lu_spec and lu_spec['Policies']:
-                user.load()
                 for policy_name in lu_spec['Policies']:
-                    policy_arn = get_policy_arn(iam_client, policy_name)
+                    policy_arn = get_policy_arn(iam_client, policy_name, snapshot)
                     if policy_arn is None:
                         policy_arn = manage_custom_policy(iam_client, account_name,
-                                policy_name, args, log, auth_spec)
+                                policy_name, args, log, auth_spec, snapshot)
                     log.info("Attaching policy '%s' to local user '%s' "
                             "in account '%s'" %
-                            (policy_name, user.name, account_name))
+                            (policy_name, user_name, account_name))
                     if args['--exec'] and policy_arn:
-                        user.attach_policy(PolicyArn=policy_arn)
+                        iam_client.attach_user_policy(
+                                UserName=user_name, PolicyArn=policy_arn)
     else:
         # validate path
-        if user.path != path_spec:
-            log.info("Updating path for local user '%s'" % user.arn)
+        if deployed_user['Path'] != path_spec:
+            log.info("Updating path for local user '%s'" % deployed_user['Arn'])
             if args['--exec']:
-                # hack around bug in boto3
-                try:
-                    user.update(NewPath=path_spec)
-                except AttributeError as e:
-                    log.debug('boto3 error when calling user.update(): %s' % e)
+                iam_client.update_user(UserName=user_name, NewPath=path_spec)
 
         # manage policy attachments
-        attached_policies = [p.policy_name for p in list(user.attached_policies.all())]
+        attached_policies = attached_policy_arns(deployed_user)
         for policy_name in lu_spec['Policies']:
             if not policy_name in attached_policies:
-                policy_arn = get_policy_arn(iam_client, policy_name)
+                policy_arn = get_policy_arn(iam_client, policy_name, snapshot)
                 if policy_arn is None:
                     policy_arn = manage_custom_policy(iam_client, account_name,
-                            policy_name, args, log, auth_spec)
+                            policy_name, args, log, auth_spec, snapshot)
                 log.info("Attaching policy '%s' to local user '%s' in account '%s'" %
-                        (policy_name, user.name, account_name))
+                        (policy_name, user_name, account_name))
                 if args['--exec'] and policy_arn:
-                    user.attach_policy(PolicyArn=policy_arn)
+                    iam_client.attach_user_policy(
+                            UserName=user_name, PolicyArn=policy_arn)
             elif lookup(auth_spec['custom_policies'], 'PolicyName',policy_name):
                 manage_custom_policy(iam_client, account_name, policy_name, args,
-                        log, auth_spec)
+                        log, auth_spec, snapshot)
         # datach obsolete policies
-        for policy_name in attached_policies:
+        for policy_name, policy_arn in attached_policies.items():
             if not policy_name in lu_spec['Policies']:
-                policy_arn = get_policy_arn(iam_client, policy_name)
                 log.info("Detaching policy '%s' from local user '%s' in account '%s'" %
-                        (policy_name, user.name, account_name))
-                if args['--exec'] and policy_arn:
-                    user.detach_policy(PolicyArn=policy_arn)
+                        (policy_name, user_name, account_name))
+                if args['--exec']:
+                    iam_client.detach_user_policy(
+                            UserName=user_name, PolicyArn=policy_arn)
 
 
-def manage_local_users(lu_spec, args, log, deployed, auth_spec):
+def prep_local_users(log, deployed, auth_spec):
     """
-    Create and manage local IAM users in specified accounts and 
-    attach policies to users based on local_user specifications.
+    Resolve the list of accounts for each local_user specification.
+    Returns a list of tuples (lu_spec, accounts).
     """
-    log.debug('considering %s' % lu_spec['Name'])
-    # munge accounts list
-    if lu_spec['Account'] == 'ALL':
-        accounts = [a['Name'] for a in deployed['accounts']]
-        if 'ExcludeAccounts' in lu_spec and lu_spec['ExcludeAccounts']:
-            accounts = [a for a in accounts
-                    if a not in lu_spec['ExcludeAccounts']]
-    else:
-        accounts = lu_spec['Account']
-    for account_name in accounts:
-        if not lookup(deployed['accounts'], 'Name', account_name):
-            log.error("Can not manage local user '%s' in account "
-                    "'%s'.  Account '%s' not found in Organization" %
-                    (lu_spec['Name'], account_name, account_name))
-            accounts.remove(account_name)
-    # run manage_local_user_in_accounts() task in thread pool
-    queue_threads(log, deployed['accounts'], manage_local_user_in_accounts,
-            f_args=(args, log, auth_spec, deployed, accounts, lu_spec))
+    local_users = []
+    for lu_spec in auth_spec['local_users']:
+        log.debug('considering %s' % lu_spec['Name'])
+        # munge accounts list
+        if lu_spec['Account'] == 'ALL':
+            accounts = [a['Name'] for a in deployed['accounts']]
+            if 'ExcludeAccounts' in lu_spec and lu_spec['ExcludeAccounts']:
+                accounts = [a for a in accounts
+                        if a not in lu_spec['ExcludeAccounts']]
+        else:
+            accounts = list(lu_spec['Account'])
+        for account_name in accounts:
+            if not lookup(deployed['accounts'], 'Name', account_name):
+                log.error("Can not manage local user '%s' in account "
+                        "'%s'.  Account '%s' not found in Organization" %
+                        (lu_spec['Name'], account_name, account_name))
+        accounts = [a for a in accounts
+                if lookup(deployed['accounts'], 'Name', a)]
+        local_users.append((lu_spec, accounts))
+    return local_users
 
 
 def get_policies_from_spec(log, auth_spec, d_spec):
@@ -705,65 +865,54 @@ def update_role_tags(log, args, iam_client, account_name, role, tags):
     '''
     Compare existing role tags to what is in spec and adjust as needed
     '''
+    role_tags = role.get('Tags') or None
     log.debug("role: '{}', account: '{}', role tags: {}; spec tags: {}".format(
-            role.name, account_name, role.tags, tags))
-    if tags is not None and role.tags != tags:
+            role['RoleName'], account_name, role_tags, tags))
+    if tags is not None and role_tags != tags:
         log.info("Updating tags in role '{}' in account '{}'".format(
-                role.name, account_name))
+                role['RoleName'], account_name))
         if args['--exec']:
             iam_client.tag_role(
-                RoleName=role.role_name,
+                RoleName=role['RoleName'],
                 Tags=tags,
             )
-    if tags is None and role.tags:
-        tag_keys = [tag['Key'] for tag in role.tags]
+    if tags is None and role_tags:
+        tag_keys = [tag['Key'] for tag in role_tags]
         log.info("Removing tags {} from role '{}' in account '{}'".format(
-                tag_keys, role.name, account_name))
+                tag_keys, role['RoleName'], account_name))
         if args['--exec']:
             iam_client.untag_role(
-                RoleName=role.role_name,
+                RoleName=role['RoleName'],
                 TagKeys=tag_keys,
             )
 
 
 def manage_delegation_role(account, args, log, auth_spec, deployed,
-            trusting_accounts, d_spec):
+            trusting_accounts, d_spec, iam_client, snapshot):
     """
     Create and manage a cross account access delegetion role in an
-    account based on delegetion specification.
+    account based on delegetion specification.  Current role state
+    is read from the account IAM 'snapshot'.
     """
     account_name = account['Name']
+    role_name = d_spec['RoleName']
     policy_list = get_policies_from_spec(log, auth_spec, d_spec)
     tags = get_tags_from_policy_set(auth_spec, d_spec)
-    log.debug('account: %s, role: %s, policies: %s' % (account_name, d_spec['RoleName'], policy_list))
-    credentials = get_assume_role_credentials(
-            account['Id'],
-            args['--org-access-role'])
-    if isinstance(credentials, RuntimeError):
-        log.error(credentials)
-        return
-    iam_client = boto3.client('iam', **credentials)
-    iam_resource = boto3.resource('iam', **credentials)
-    role = iam_resource.Role(d_spec['RoleName'])
+    log.debug('account: %s, role: %s, policies: %s' % (account_name, role_name, policy_list))
+    role = lookup(snapshot['roles'], 'RoleName', role_name)
 
     # check if role should not exist
     if account_name not in trusting_accounts or ensure_absent(d_spec):
-        try:
-            role.load()
-        except ClientError as e:
-            if e.response['Error']['Code'] == 'NoSuchEntity':
-                return
-            else:
-                raise e
-        except:
-            raise
+        if not role:
+            return
         # delete delegation role
         log.info("Deleting role '%s' from account '%s'" %
-                (d_spec['RoleName'], account_name))
+                (role_name, account_name))
         if args['--exec']:
-            for p in list(role.attached_policies.all()):
-                role.detach_policy(PolicyArn=p.arn)
-            role.delete()
+            for policy_arn in attached_policy_arns(role).values():
+                iam_client.detach_role_policy(
+                        RoleName=role_name, PolicyArn=policy_arn)
+            iam_client.delete_role(RoleName=role_name)
         return
 
     # else: assemble assume role policy document for delegation role
@@ -789,139 +938,171 @@ def manage_delegation_role(account, args, log, auth_spec, deployed,
     if not 'Duration' in d_spec:
         d_spec['Duration'] = 3600
 
-    # get iam role object.  create role if it does not exist (i.e. won't load)
-    try:
-        role.load()
-    except ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchEntity':
-            log.info("Creating role '%s' in account '%s'" %
-                    (d_spec['RoleName'], account_name))
-            if args['--exec']:
-                create_role_attributes=dict(
-                    Description=d_spec['Description'],
-                    Path=munge_path(auth_spec['default_path'], d_spec),
-                    RoleName=d_spec['RoleName'],
-                    MaxSessionDuration=d_spec['Duration'],
-                    AssumeRolePolicyDocument=json.dumps(policy_doc),
-                )
-                if tags is not None:
-                    create_role_attributes['Tags']=tags
-                iam_client.create_role(**create_role_attributes)
-                role.load()
-                for policy_name in policy_list:
-                    policy_arn = get_policy_arn(iam_client, policy_name)
-                    if policy_arn is None:
-                        policy_arn = manage_custom_policy(iam_client, account_name,
-                                policy_name, args, log, auth_spec)
-                    log.info("Attaching policy '%s' to role '%s' "
-                            "in account '%s':\n%s" % (
-                                    policy_name, 
-                                    d_spec['RoleName'], 
-                                    account_name,
-                                    yamlfmt(policy_doc)))
-                    if args['--exec'] and policy_arn:
-                        role.attach_policy(PolicyArn=policy_arn)
-            return
+    # create role if it does not exist
+    if not role:
+        log.info("Creating role '%s' in account '%s'" %
+                (role_name, account_name))
+        if args['--exec']:
+            create_role_attributes=dict(
+                Description=d_spec['Description'],
+                Path=munge_path(auth_spec['default_path'], d_spec),
+                RoleName=role_name,
+                MaxSessionDuration=d_spec['Duration'],
+                AssumeRolePolicyDocument=json.dumps(policy_doc),
+            )
+            if tags is not None:
+                create_role_attributes['Tags']=tags
+            iam_client.create_role(**create_role_attributes)
+            for policy_name in policy_list:
+                policy_arn = get_policy_arn(iam_client, policy_name, snapshot)
+                if policy_arn is None:
+                    policy_arn = manage_custom_policy(iam_client, account_name,
+                            policy_name, args, log, auth_spec, snapshot)
+                log.info("Attaching policy '%s' to role '%s' "
+                        "in account '%s':\n%s" % (
+                                policy_name, 
+                                role_name, 
+                                account_name,
+                                yamlfmt(policy_doc)))
+                if args['--exec'] and policy_arn:
+                    iam_client.attach_role_policy(
+                            RoleName=role_name, PolicyArn=policy_arn)
+        return
 
     # update delegation role if needed
-    if role.assume_role_policy_document != policy_doc:
+    if role['AssumeRolePolicyDocument'] != policy_doc:
         log.info("Updating policy document in role '%s' in account '%s':\n%s" % (
-                d_spec['RoleName'], 
+                role_name, 
                 account_name,
                 string_differ(
-                        yamlfmt(role.assume_role_policy_document),
+                        yamlfmt(role['AssumeRolePolicyDocument']),
                         yamlfmt(policy_doc))))
         if args['--exec']:
             iam_client.update_assume_role_policy(
-                RoleName=role.role_name,
+                RoleName=role_name,
                 PolicyDocument=json.dumps(policy_doc))
-    if role.description != d_spec['Description']:
+    if role.get('Description') != d_spec['Description']:
         log.info("Updating description in role '%s' in account '%s'" %
-                (d_spec['RoleName'], account_name))
+                (role_name, account_name))
         if args['--exec']:
             iam_client.update_role_description(
-                RoleName=role.role_name,
+                RoleName=role_name,
                 Description=d_spec['Description'])
-    if role.max_session_duration != d_spec['Duration']:
+    if role.get('MaxSessionDuration') != d_spec['Duration']:
         log.info("Updating max session duration in role '%s' in account '%s'" %
-                (d_spec['RoleName'], account_name))
+                (role_name, account_name))
         if args['--exec']:
             iam_client.update_role(
-                RoleName=role.role_name,
+                RoleName=role_name,
                 MaxSessionDuration=d_spec['Duration'])
     update_role_tags(log, args, iam_client, account_name, role, tags)
 
     # manage policy attachments
-    attached_policies = [p.policy_name for p in list(role.attached_policies.all())]
+    attached_policies = attached_policy_arns(role)
     for policy_name in policy_list:
         # attach missing policies
         if not policy_name in attached_policies:
-            policy_arn = get_policy_arn(iam_client, policy_name)
+            policy_arn = get_policy_arn(iam_client, policy_name, snapshot)
             if policy_arn is None:
                 policy_arn = manage_custom_policy(iam_client, account_name, policy_name,
-                        args, log, auth_spec)
+                        args, log, auth_spec, snapshot)
             log.info("Attaching policy '%s' to role '%s' in account '%s'" %
-                    (policy_name, d_spec['RoleName'], account_name))
+                    (policy_name, role_name, account_name))
             if args['--exec'] and policy_arn:
-                role.attach_policy(PolicyArn=policy_arn)
+                iam_client.attach_role_policy(
+                        RoleName=role_name, PolicyArn=policy_arn)
         elif lookup(auth_spec['custom_policies'], 'PolicyName',policy_name):
             manage_custom_policy(iam_client, account_name, policy_name,
-                    args, log, auth_spec)
-    for policy_name in attached_policies:
+                    args, log, auth_spec, snapshot)
+    for policy_name, policy_arn in attached_policies.items():
         # datach obsolete policies
         if not policy_name in policy_list:
-            policy_arn = get_policy_arn(iam_client, policy_name)
             log.info("Detaching policy '%s' from role '%s' in account '%s'" %
-                    (policy_name, d_spec['RoleName'], account_name))
-            if args['--exec'] and policy_arn:
-                role.detach_policy(PolicyArn=policy_arn)
+                    (policy_name, role_name, account_name))
+            if args['--exec']:
+                iam_client.detach_role_policy(
+                        RoleName=role_name, PolicyArn=policy_arn)
 
 
-def manage_delegations(d_spec, args, log, deployed, auth_spec):
+def prep_delegations(args, log, deployed, auth_spec):
     """
-    Create and manage cross account access delegations based on 
-    delegation specifications.  Manages delegation roles in 
-    trusting accounts and group policies in Auth (trusted) account.
+    Validate delegation specifications, resolve the trusting accounts for
+    each, and manage group policies in Auth (trusted) account for user
+    roles.  Returns a list of tuples (d_spec, trusting_accounts).
     """
-    log.debug('considering %s' % d_spec['RoleName'])
-    if d_spec['RoleName'] == args['--org-access-role']:
-        log.error("Refusing to manage delegation '%s'" % d_spec['RoleName'])
-        return
+    delegations = []
+    user_roles = []
+    for d_spec in auth_spec['delegations']:
+        log.debug('considering %s' % d_spec['RoleName'])
+        if d_spec['RoleName'] == args['--org-access-role']:
+            log.error("Refusing to manage delegation '%s'" % d_spec['RoleName'])
+            continue
+
+        # munge trusting_accounts list
+        if d_spec['TrustingAccount'] == 'ALL':
+            trusting_accounts = [a['Name'] for a in deployed['accounts']]
+            if 'ExcludeAccounts' in d_spec and d_spec['ExcludeAccounts']:
+                trusting_accounts = [a for a in trusting_accounts
+                        if a not in d_spec['ExcludeAccounts']]
+        else:
+            trusting_accounts = list(d_spec['TrustingAccount'])
+        for account_name in trusting_accounts:
+            if not lookup(deployed['accounts'], 'Name', account_name):
+                log.error("Can not manage delegation role '%s' in account "
+                        "'%s'.  Account '%s' not found in Organization" %
+                        (d_spec['RoleName'], account_name, account_name))
+        trusting_accounts = [a for a in trusting_accounts
+                if lookup(deployed['accounts'], 'Name', a)]
+
+        # is this a service role or a user role?
+        if 'TrustedGroup' in d_spec and 'TrustedAccount' in d_spec:
+            log.error("can not declare both 'TrustedGroup' or 'TrustedAccount' in "
+                    "delegation spec for role '%s'" % d_spec['RoleName'])
+            continue
+        elif 'TrustedGroup' not in d_spec and 'TrustedAccount' not in d_spec:
+            log.error("neither 'TrustedGroup' or 'TrustedAccount' declared in "
+                    "delegation spec for role '%s'" % d_spec['RoleName'])
+            continue
+        elif 'TrustedAccount' in d_spec and d_spec['TrustedAccount']:
+            # this is a service role. skip setting group policy
+            pass
+        else:
+            # this is a user role. set group policies in Auth account
+            user_roles.append(d_spec)
+        delegations.append((d_spec, trusting_accounts))
 
-    # munge trusting_accounts list
-    if d_spec['TrustingAccount'] == 'ALL':
-        trusting_accounts = [a['Name'] for a in deployed['accounts']]
-        if 'ExcludeAccounts' in d_spec and d_spec['ExcludeAccounts']:
-            trusting_accounts = [a for a in trusting_accounts
-                    if a not in d_spec['ExcludeAccounts']]
-    else:
-        trusting_accounts = d_spec['TrustingAccount']
-    for account_name in trusting_accounts:
-        if not lookup(deployed['accounts'], 'Name', account_name):
-            log.error("Can not manage delegation role '%s' in account "
-                    "'%s'.  Account '%s' not found in Organization" %
-                    (d_spec['RoleName'], account_name, account_name))
-            trusting_accounts.remove(account_name)
-
-    # is this a service role or a user role?
-    if 'TrustedGroup' in d_spec and 'TrustedAccount' in d_spec:
-        log.error("can not declare both 'TrustedGroup' or 'TrustedAccount' in "
-                "delegation spec for role '%s'" % d_spec['RoleName'])
-        return
-    elif 'TrustedGroup' not in d_spec and 'TrustedAccount' not in d_spec:
-        log.error("neither 'TrustedGroup' or 'TrustedAccount' declared in "
-                "delegation spec for role '%s'" % d_spec['RoleName'])
-        return
-    elif 'TrustedAccount' in d_spec and d_spec['TrustedAccount']:
-        # this is a service role. skip setting group policy
-        pass
-    else:
-        # this is a user role. set group policies in Auth account
-        set_group_assume_role_policies(args, log, deployed, auth_spec, d_spec)
+    run_tasks(log, user_roles,
+            lambda d_spec: set_group_assume_role_policies(
+                    args, log, deployed, auth_spec, d_spec))
+    return delegations
 
-    # run manage_delegation_role() task in thread pool
-    queue_threads(log, deployed['accounts'], manage_delegation_role,
-            f_args=(args, log, auth_spec, deployed, trusting_accounts, d_spec))
+
+def manage_account_authorization(account, args, log, deployed, auth_spec,
+            delegations, local_users):
+    """
+    Reconcile all delegation roles and local users in a single account.
+    Assumes the org access role and snapshots account IAM state once
+    (see scan_account_authorization), no matter how many delegations or
+    local users are specified.
+
+    delegations:    list of tuples (d_spec, trusting_accounts)
+    local_users:    list of tuples (lu_spec, accounts)
+    """
+    credentials = get_assume_role_credentials(
+            account['Id'],
+            args['--org-access-role'])
+    if isinstance(credentials, RuntimeError):
+        log.error(credentials)
+        return
+    iam_client = get_client('iam', credentials)
+    iam_resource = get_resource('iam', credentials)
+    snapshot = scan_account_authorization(iam_client)
+    for d_spec, trusting_accounts in delegations:
+        manage_delegation_role(account, args, log, auth_spec, deployed,
+                trusting_accounts, d_spec, iam_client, snapshot)
+    for lu_spec, accounts in local_users:
+        manage_local_user_in_account(account, args, log, auth_spec, deployed,
+                accounts, lu_spec, iam_client, iam_resource, snapshot)
 
 
 def main():
@@ -937,7 +1118,7 @@ def main():
     if isinstance(org_credentials, RuntimeError):
         log.critical(org_credentials)
         sys.exit(1)
-    org_client = boto3.client('organizations', **org_credentials)
+    org_client = get_client('organizations', org_credentials)
     validate_master_id(org_client, auth_spec)
 
     auth_credentials = get_assume_role_credentials(
@@ -946,12 +1127,18 @@ def main():
     if isinstance(auth_credentials, RuntimeError):
         log.critical(auth_credentials)
         sys.exit(1)
-    iam_client = boto3.client('iam', **auth_credentials)
     deployed = dict(
-            users = get_iam_objects(iam_client.list_users, 'Users'),
-            groups = get_iam_objects(iam_client.list_groups, 'Groups'),
-            accounts = [a for a in scan_deployed_accounts(log, org_client)
-                    if a['Status'] == 'ACTIVE'])
+            accounts = LookupTable(a for a in scan_deployed_accounts(log, org_client)
+                    if a['Status'] == 'ACTIVE'))
+    # users and groups in the auth account are only needed to manage them
+    # and to set group policies for delegations
+    if args['users'] or args['delegations']:
+        auth_snapshot = scan_account_authorization(
+                get_client('iam', auth_credentials))
+        deployed.update(
+                auth = auth_snapshot,
+                users = auth_snapshot['users'],
+                groups = auth_snapshot['groups'])
 
     if args['report']:
         if args['--account']:
@@ -969,8 +1156,9 @@ def main():
                 verbose=args['--full'],
             )
         if args['--credentials']:
-            report_maker(log, deployed['accounts'], args['--org-access-role'], 
-                credentials_report, "IAM Credentials Report in all Org Accounts:"
+            org_credentials_report(log, deployed['accounts'],
+                args['--org-access-role'],
+                "IAM Credentials Report in all Org Accounts:",
             )
         if not (args['--users'] or args['--credentials'] or args['--roles']):
             report_maker(log, deployed['accounts'], args['--org-access-role'], 
@@ -980,20 +1168,24 @@ def main():
 
     if args['users']:
         if args['--disable-expired']:
-            expire_users(log, args, deployed, auth_spec, credentials)
+            expire_users(log, args, deployed, auth_spec, auth_credentials)
         else:
-            create_users(auth_credentials, args, log, deployed, auth_spec)
-            create_groups(auth_credentials, args, log, deployed, auth_spec)
-            manage_group_members(auth_credentials, args, log, deployed, auth_spec)
-            manage_group_policies(auth_credentials, args, log, deployed, auth_spec)
+            manage_users_and_groups(auth_credentials, args, log, deployed,
+                    auth_spec)
 
     if args['delegations']:
-        queue_threads(log, auth_spec['delegations'], manage_delegations,
-            f_args=(args, log, deployed, auth_spec))
+        delegations = prep_delegations(args, log, deployed, auth_spec)
+        run_tasks(log, deployed['accounts'], manage_account_authorization,
+            f_args=(args, log, deployed, auth_spec, delegations, []),
+            log_errors=True)
 
     if args['local-users']:
-        queue_threads(log, auth_spec['local_users'], manage_local_users,
-            f_args=(args, log, deployed, auth_spec))
+        local_users = prep_local_users(log, deployed, auth_spec)
+        run_tasks(log, deployed['accounts'], manage_account_authorization,
+            f_args=(args, log, deployed, auth_spec, [], local_users),
+            log_errors=True)
+
+    log_run_stats(log)
 
 if __name__ == "__main__":
     main()
@@ -2,7 +2,8 @@
 """Manage AWS IAM user login profile.
 
 Usage:
-  awsloginprofile USER [--config FILE]
+  awsloginprofile [USER...] [--team TEAM]
+                       [--config FILE]
                        [--master-account-id ID]
                        [--auth-account-id ID]
                        [--org-access-role ROLE]
@@ -17,7 +18,8 @@ Usage:
   awsloginprofile (--help|--version)
 
 Options:
-  USER                      Name of IAM user.
+  USER                      Name of IAM user.  Several may be given.
+  --team TEAM               Select all users in the users spec with this Team.
   -h, --help                Show this help message and exit.
   -V, --version             Display version info and exit.
   --config FILE             AWS Org config file in yaml format.
@@ -33,6 +35,7 @@ Options:
   --reenable                Recreate login profile, reactivate access keys.
   --opt-ttl HOURS           One-time-password time to live in hours [default: 24].
   --password PASSWORD       Supply password, do not require user to reset.
+                            Only allowed for a single user.
   -q, --quiet               Repress log output.
   -d, --debug               Increase log level to 'DEBUG'.
   -dd                       Include botocore and boto3 logs in log stream.
@@ -47,10 +50,11 @@ import logging
 from string import Template
 import datetime
 import smtplib
+import threading
+import traceback
 from email.message import EmailMessage
 
 
-import boto3
 from botocore.exceptions import ClientError
 from docopt import docopt
 from passwordgenerator import pwgenerator
@@ -74,56 +78,72 @@ def get_user_name():
     """
     Returns the IAM user_name of the calling identidy (i.e. you)
     """
-    sts = boto3.client('sts')
-    return sts.get_caller_identity()['Arn'].split('/')[-1]
+    return get_caller_identity()['Arn'].split('/')[-1]
 
 
-def list_delegations(log, user, deployed_accounts):
+def scan_delegations(iam_client):
+    """
+    Return a snapshot of the users and groups in the auth account, with
+    their group memberships and in-line group policies, gathered in one
+    get_account_authorization_details pass.  list_delegations() resolves
+    assume role delegations for any user from this snapshot.
+    """
+    details = get_account_authorization_details(iam_client,
+            filters=('User', 'Group'))
+    return dict(
+        users=details['UserDetailList'],
+        groups=details['GroupDetailList'],
+    )
+
+
+def list_delegations(log, user_name, deployed_accounts, snapshot):
     """
     Return list of assume role resource arns for user.  Obtain these by
-    parsing in-line group policies for each group the user is a member of.
+    parsing in-line group policies for each group the user is a member of
+    as recorded in 'snapshot' (see scan_delegations()).
 
     the policies we care about match one of two patterns:
         AllowAssumeRole-<rolename>
         DenyAssumeRole-<rolename>
 
-    we assemble a list of allowed role arns, then we remove any of the
-    denied arns.
+    we assemble a list of allowed role arns, then we remove any arns
+    whose account_id appears in one of the denied arns.
 
     if the account_id field of a AllowAssumeRole-<rolename> matches the
     glob ('*') char, we generate the list of allowed role arns - one for
     every 'ACTIVE' account.
     """
-    groups = list(user.groups.all())
+    user = snapshot['users'].find('UserName', user_name)
+    if not user:
+        log.debug("user '%s' not found in delegation snapshot" % user_name)
+        return []
+    active_ids = [a['Id'] for a in deployed_accounts if a['Status'] == 'ACTIVE']
     role_arns = []
-    for group in user.groups.all():
-
-        allow_policies = [
-            p for p in list(group.policies.all())
-            if p.policy_name.startswith('AllowAssumeRole')
-        ]
-        for allow_policy in allow_policies:
-            allow_arns = allow_policy.policy_document['Statement'][0]['Resource']
-            if isinstance(allow_arns, str) and '*' in allow_arns:
-                head, sep, tail = allow_arns.partition('*')
-                allow_arns = []
-                for account in deployed_accounts:
-                    if account['Status'] == 'ACTIVE':
-                        allow_arns.append(head + account['Id'] + tail)
-            role_arns += allow_arns
-
-        deny_policies = [
-            p for p in list(group.policies.all())
-            if p.name.startswith('DenyAssumeRole')
-        ]
-        for deny_policy in deny_policies:
-            deny_arns = deny_policy.policy_document['Statement'][0]['Resource']
-            deny_account_ids = [arn.split(':')[4] for arn in deny_arns]
-            for id in deny_account_ids:
-                for arn in role_arns:
-                    if id in arn:
-                        role_arns.remove(arn)
-    return role_arns
+    deny_account_ids = set()
+    for group_name in user[0]['GroupList']:
+        group = snapshot['groups'].find('GroupName', group_name)
+        if not group:
+            continue
+        for policy in group[0]['GroupPolicyList']:
+            resources = policy['PolicyDocument']['Statement'][0]['Resource']
+            if isinstance(resources, str):
+                resources = [resources]
+            if policy['PolicyName'].startswith('AllowAssumeRole'):
+                for arn in resources:
+                    if '*' in arn:
+                        head, sep, tail = arn.partition('*')
+                        role_arns += [head + i + tail for i in active_ids]
+                    else:
+                        role_arns.append(arn)
+            elif policy['PolicyName'].startswith('DenyAssumeRole'):
+                deny_account_ids.update(arn.split(':')[4] for arn in resources)
+    seen = set()
+    allowed = []
+    for arn in role_arns:
+        if arn not in seen and arn.split(':')[4] not in deny_account_ids:
+            seen.add(arn)
+            allowed.append(arn)
+    return allowed
 
 
 def format_delegation_table(delegation_arns, deployed_accounts):
@@ -141,7 +161,7 @@ def format_delegation_table(delegation_arns, deployed_accounts):
     return delegation_string
 
 
-def user_report(log, deployed_accounts, user, login_profile):
+def user_report(log, deployed_accounts, user, login_profile, snapshot):
     """Generate report of IAM user's login profile, password usage, and
     assume_role delegations for any groups user is member of.
     """
@@ -163,7 +183,7 @@ def user_report(log, deployed_accounts, user, login_profile):
             log.info(spacer.format('Password last used:', user.password_last_used))
     else:
         log.info(spacer.format('User login profile:', login_profile))
-    assume_role_arns = list_delegations(log, user, deployed_accounts)
+    assume_role_arns = list_delegations(log, user.name, deployed_accounts, snapshot)
     if assume_role_arns:
         log.info('Delegations:\n{}'.format(
             format_delegation_table(assume_role_arns, deployed_accounts)
@@ -173,9 +193,9 @@ def user_report(log, deployed_accounts, user, login_profile):
 def validate_user(user_name, credentials=None):
     """Return a valid IAM User object"""
     if credentials:
-        iam = boto3.resource('iam', **credentials)
+        iam = get_resource('iam', credentials)
     else:
-        iam = boto3.resource('iam')
+        iam = get_resource('iam')
     user = iam.User(user_name)
     try:
         user.load()
@@ -229,7 +249,7 @@ def reset_profile(log, user, login_profile, passwd, require_reset):
         )
     else:
         log.error("user '%s' has no login profile" % user.name)
-        sys.exit(1)
+        return None
 
 def delete_profile(log, user, login_profile):
     if login_profile:
@@ -252,25 +272,29 @@ def set_access_key_status(log, user, enable=True):
             key.deactivate()
 
 
-def onetime_passwd_expired(log, user, login_profile, hours):
-    """Test if initial one-time-only password is expired"""
-    if login_profile and login_profile.password_reset_required:
+def onetime_passwd_expired(log, user, login_profile, hours, last_changed):
+    """
+    Test if one-time-only password is expired.  'last_changed' is when the
+    password was set, from the credential report.  The login profile's
+    create_date is not used, as resetting a password does not change it.
+    """
+    if login_profile and login_profile.password_reset_required and last_changed:
         log.debug('now: %s' % utcnow().isoformat())
         log.debug('ttl: %s' % datetime.timedelta(hours=hours))
-        log.debug('delta: %s' % (utcnow() - login_profile.create_date))
-        return (utcnow() - login_profile.create_date) > datetime.timedelta(hours=hours)
+        log.debug('delta: %s' % (utcnow() - last_changed))
+        return (utcnow() - last_changed) > datetime.timedelta(hours=hours)
     return False
 
 
-def prep_email(log, aliases, deployed_accounts, user, passwd):
+def prep_email(log, aliases, deployed_accounts, snapshot, user, passwd):
     """Generate email body from template"""
     log.debug("loading file: '%s'" % EMAIL_TEMPLATE)
-    trusted_id=boto3.client('sts').get_caller_identity()['Account']
+    trusted_id = get_caller_identity()['Account']
     if aliases:
         trusted_account = aliases[trusted_id]
     else:
         trusted_account = trusted_id
-    assume_role_arns = list_delegations(log, user, deployed_accounts)
+    assume_role_arns = list_delegations(log, user.name, deployed_accounts, snapshot)
     log.debug('assume_role_arns: %s' % assume_role_arns)
     template = os.path.abspath(pkg_resources.resource_filename(__name__, EMAIL_TEMPLATE))
     mapping = dict(
@@ -299,13 +323,179 @@ def send_email(msg, smtp_server):
     s.quit()
 
 
-def handle_email(log, args, spec, aliases, deployed_accounts, user, passwd):
-    message_body = prep_email(log, aliases, deployed_accounts, user, passwd)
+class Mailer(object):
+    """
+    Send email over a single SMTP connection, opened on first use and
+    shared by all threads.
+    """
+
+    def __init__(self, smtp_server):
+        self.smtp_server = smtp_server
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def send(self, msg):
+        with self.lock:
+            if self.connection is None:
+                self.connection = smtplib.SMTP(self.smtp_server)
+            try:
+                self.connection.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self.connection = smtplib.SMTP(self.smtp_server)
+                self.connection.send_message(msg)
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.quit()
+                self.connection = None
+
+
+def handle_email(log, args, spec, aliases, deployed_accounts, snapshot,
+        user, passwd, mailer, output):
+    """
+    Email the new login profile to the user, or with --no-email append
+    the message body to 'output'.
+    """
+    message_body = prep_email(log, aliases, deployed_accounts, snapshot,
+            user, passwd)
     if args['--no-email']:
-        print(message_body)
+        output.append(message_body)
     else:
         msg = build_email_message(user, message_body, spec)
-        send_email(msg, spec['default_smtp_server'])
+        mailer.send(msg)
+
+
+def select_users(log, args, spec):
+    """
+    Return list of user names given as USER args plus those in the users
+    spec with Team matching --team.
+    """
+    user_names = list(args['USER'])
+    if args['--team']:
+        team_users = [u['Name'] for u in spec['users']
+                if u.get('Team') == args['--team']]
+        if not team_users:
+            log.critical("no users found in team '%s'" % args['--team'])
+            sys.exit(1)
+        user_names += team_users
+    if not user_names:
+        log.critical('no users selected. give USER or --team')
+        sys.exit(1)
+    return sorted(set(user_names), key=user_names.index)
+
+
+def select_expired_users(log, args, user_names):
+    """
+    Narrow 'user_names' for --disable-expired to the users whose one-time
+    password may have expired according to a freshly generated IAM
+    credential report.  Names not in the report are kept, so they are
+    reported as unknown.  Each candidate's 'password_last_changed' time
+    is kept in args['password_last_changed'] for onetime_passwd_expired()
+    to confirm against the login profile.
+    """
+    rows = get_credential_report(get_client('iam'), max_age=0)
+    ttl = datetime.timedelta(hours=int(args['--opt-ttl']))
+    candidates = find_expired_onetime_passwords(rows, ttl)
+    args['password_last_changed'] = candidates
+    report_users = set(row['user'] for row in rows)
+    selected = [name for name in user_names
+            if name in candidates or name not in report_users]
+    log.debug('users with unused password older than ttl: %s' % selected)
+    return selected
+
+
+def manage_user_login_profile(user_name, log, args, spec, aliases,
+        deployed_accounts, snapshot, mailer):
+    """
+    Worker for manage_login_profiles().  Run the selected operation for
+    one user.  Return tuple (ok, user_log, output): a success flag, a
+    LogBuffer holding this user's log messages, and a list of email bodies
+    not sent.  An exception is logged to user_log and fails only this user.
+    """
+    user_log = LogBuffer(log)
+    output = []
+    try:
+        ok = user_login_profile_operation(user_name, user_log, args, spec,
+                aliases, deployed_accounts, snapshot, mailer, output)
+    except Exception as e:
+        user_log.error("error processing user '%s': %s: %s" %
+                (user_name, type(e).__name__, e))
+        user_log.debug(traceback.format_exc())
+        ok = False
+    return (ok, user_log, output)
+
+
+def user_login_profile_operation(user_name, user_log, args, spec, aliases,
+        deployed_accounts, snapshot, mailer, output):
+    """
+    Run the login profile operation selected in args for one user.
+    Return False if it could not be done.
+    """
+    user = validate_user(user_name)
+    if not user:
+        user_log.error('no such user: %s' % user_name)
+        return False
+    login_profile = validate_login_profile(user)
+    passwd, require_reset = munge_passwd(args['--password'])
+
+    if args['--new']:
+        if not login_profile:
+            login_profile = create_profile(user_log, user, passwd, require_reset)
+            handle_email(user_log, args, spec, aliases, deployed_accounts,
+                    snapshot, user, passwd, mailer, output)
+        else:
+            user_log.warn("login profile for user '%s' already exists" % user.name)
+            user_report(user_log, deployed_accounts, user, login_profile, snapshot)
+
+    elif args['--reset']:
+        login_profile = reset_profile(user_log, user, login_profile, passwd, require_reset)
+        if not login_profile:
+            return False
+        handle_email(user_log, args, spec, aliases, deployed_accounts,
+                snapshot, user, passwd, mailer, output)
+
+    elif args['--disable']:
+        delete_profile(user_log, user, login_profile)
+        set_access_key_status(user_log, user, False)
+
+    elif args['--disable-expired']:
+        if onetime_passwd_expired(user_log, user, login_profile,
+                int(args['--opt-ttl']),
+                args['password_last_changed'].get(user.name)):
+            delete_profile(user_log, user, login_profile)
+
+    elif args['--reenable']:
+        if not login_profile:
+            login_profile = create_profile(user_log, user, passwd, require_reset)
+            handle_email(user_log, args, spec, aliases, deployed_accounts,
+                    snapshot, user, passwd, mailer, output)
+        else:
+            user_log.warn("login profile for user '%s' already exists" % user.name)
+        set_access_key_status(user_log, user, True)
+
+    else:
+        user_report(user_log, deployed_accounts, user, login_profile, snapshot)
+    return True
+
+
+def manage_login_profiles(log, args, spec, user_names, aliases,
+        deployed_accounts, snapshot, mailer):
+    """
+    Process users concurrently, replaying each user's log messages and
+    unsent email in user order.  A failure for one user does not stop
+    the others.  Return True if every user succeeded.
+    """
+    all_ok = True
+    for user_name, (ok, user_log, output) in iter_tasks_ordered(
+            log, user_names, manage_user_login_profile,
+            f_args=(log, args, spec, aliases, deployed_accounts, snapshot,
+                mailer)):
+        user_log.flush()
+        for message_body in output:
+            print(message_body)
+        all_ok = all_ok and ok
+    return all_ok
 
 
 def main():
@@ -325,55 +515,37 @@ def main():
     log.debug("%s: args:\n%s" % (__name__, args))
     args = load_config(log, args)
     spec = validate_spec(log, args)
-
-    user = validate_user(args['USER'])
-    if not user:
-        log.critical('no such user: %s' % args['USER'])
+    user_names = select_users(log, args, spec)
+    if args['--password'] and len(user_names) > 1:
+        log.critical("option '--password' can only be used with a single user")
         sys.exit(1)
-    login_profile = validate_login_profile(user)
-    passwd, require_reset = munge_passwd(args['--password'])
+    if args['--disable-expired']:
+        user_names = select_expired_users(log, args, user_names)
+
     org_credentials = get_assume_role_credentials(
             args['--master-account-id'],
             args['--org-access-role'])
     if isinstance(org_credentials, RuntimeError):
         log.critical(org_credentials)
         sys.exit(1)
-    org_client = boto3.client('organizations', **org_credentials)
+    org_client = get_client('organizations', org_credentials)
     deployed_accounts = scan_deployed_accounts(log, org_client)
     aliases = get_account_aliases(log, deployed_accounts, args['--org-access-role'])
     deployed_accounts = merge_aliases(log, deployed_accounts, aliases)
     log.debug(aliases)
+    # group memberships and policies for every user, fetched once
+    snapshot = scan_delegations(get_client('iam'))
 
-    if args['--new']:
-        if not login_profile:
-            login_profile = create_profile(log, user, passwd, require_reset)
-            handle_email(log, args, spec, aliases, deployed_accounts, user, passwd)
-        else:
-            log.warn("login profile for user '%s' already exists" % user.name)
-            user_report(log, deployed_accounts, user, login_profile)
-
-    elif args['--reset']:
-        login_profile = reset_profile(log, user, login_profile, passwd, require_reset)
-        handle_email(log, args, spec, aliases, deployed_accounts, user, passwd)
-
-    elif args['--disable']:
-        delete_profile(log, user, login_profile)
-        set_access_key_status(log, user, False)
-
-    elif args['--disable-expired']:
-        if onetime_passwd_expired(log, user, login_profile, int(args['--opt-ttl'])):
-            delete_profile(log, user, login_profile)
-
-    elif args['--reenable']:
-        if not login_profile:
-            login_profile = create_profile(log, user, passwd, require_reset)
-            handle_email(log, args, spec, aliases, deployed_accounts, user, passwd)
-        else:
-            log.warn("login profile for user '%s' already exists" % user.name)
-        set_access_key_status(log, user, True)
+    mailer = Mailer(spec['default_smtp_server'])
+    try:
+        ok = manage_login_profiles(log, args, spec, user_names, aliases,
+                deployed_accounts, snapshot, mailer)
+    finally:
+        mailer.close()
 
-    else:
-        user_report(log, deployed_accounts, user, login_profile)
+    log_run_stats(log)
+    if not ok:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
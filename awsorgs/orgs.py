@@ -36,7 +36,6 @@ import yaml
 import json
 import time
 
-import boto3
 from docopt import docopt
 
 import awsorgs
@@ -98,70 +97,131 @@ def get_parent_id(org_client, account_id):
                 % (account_id, parents))
 
 
-def list_policies_in_ou (org_client, ou_id):
+def list_policies_in_ou(deployed, ou_id):
     """
-    Query deployed AWS organanization.  Return a list (of type dict)
-    of policies attached to OrganizationalUnit referenced by 'ou_id'.
+    Return a sorted list of names of policies attached to OrganizationalUnit
+    referenced by 'ou_id', as recorded in deployed 'policy_targets'.
     """
-    policies_in_ou = org_client.list_policies_for_target(
-            TargetId=ou_id, Filter='SERVICE_CONTROL_POLICY',)['Policies']
-    return sorted([ou['Name'] for ou in policies_in_ou])
+    return sorted([p['Name'] for p in deployed['policies']
+            if ou_id in deployed['policy_targets'].get(p['Id'], ())])
+
+
+def list_policy_targets(org_client, policy_id):
+    """
+    Query deployed AWS organanization.  Return set of Ids of all targets
+    (root, OU or account) to which policy 'policy_id' is attached.
+    """
+    response = org_client.list_targets_for_policy(PolicyId=policy_id)
+    targets = response['Targets']
+    while 'NextToken' in response and response['NextToken']:
+        response = org_client.list_targets_for_policy(
+                PolicyId=policy_id, NextToken=response['NextToken'])
+        targets += response['Targets']
+    return set(t['TargetId'] for t in targets)
+
+
+def scan_policy_targets(log, org_client, deployed_policies):
+    """
+    Return dict mapping the Id of each deployed Service Control Policy to
+    the set of Ids of its targets.  Policies are queried concurrently.
+    """
+    policy_ids = [p['Id'] for p in deployed_policies]
+    targets = run_tasks(log, policy_ids,
+            lambda policy_id: list_policy_targets(org_client, policy_id))
+    policy_targets = dict(zip(policy_ids, targets))
+    log.debug('policy_targets: %s' % policy_targets)
+    return policy_targets
 
 
 def scan_deployed_policies(org_client):
     """
     Return list of Service Control Policies deployed in Organization
     """
-    return org_client.list_policies(Filter='SERVICE_CONTROL_POLICY')['Policies']
-
-
-def scan_deployed_ou(log, org_client, root_id):
-    """
-    Recursively traverse deployed AWS Organization.  Return list of
-    organizational unit dictionaries.  
-    """
-    def build_deployed_ou_table(org_client, parent_name, parent_id, deployed_ou):
-        # recusive sub function to build the 'deployed_ou' table
-        response = org_client.list_organizational_units_for_parent( ParentId=parent_id)
-        child_ou = response['OrganizationalUnits']
-        while 'NextToken' in response and response['NextToken']:
-            response = org_client.list_organizational_units_for_parent(
-                ParentId=parent_id, NextToken=response['NextToken'])
-            child_ou += response['OrganizationalUnits']
-
-        response = org_client.list_accounts_for_parent( ParentId=parent_id)
-        accounts = response['Accounts']
-        while 'NextToken' in response and response['NextToken']:
-            response = org_client.list_accounts_for_parent(
-                ParentId=parent_id, NextToken=response['NextToken'])
-            accounts += response['Accounts']
-        log.debug('parent_name: %s; ou: %s' % (parent_name, yamlfmt(child_ou)))
-        log.debug('parent_name: %s; accounts: %s' % (parent_name, yamlfmt(accounts)))
-
-        if not deployed_ou:
-            deployed_ou.append(dict(
-                    Name = parent_name,
-                    Id = parent_id,
-                    Child_OU = [ou['Name'] for ou in child_ou if 'Name' in ou],
-                    Accounts = [acc['Name'] for acc in accounts if 'Name' in acc]))
-        else:
-            for ou in deployed_ou:
-                if ou['Name'] == parent_name:
-                    ou['Child_OU'] = [d['Name'] for d in child_ou]
-                    ou['Accounts'] = [d['Name'] for d in accounts]
-        for ou in child_ou:
-            ou['ParentId'] = parent_id
-            deployed_ou.append(ou)
-            build_deployed_ou_table(org_client, ou['Name'], ou['Id'], deployed_ou)
-
-    # build the table 
-    deployed_ou = []
-    build_deployed_ou_table(org_client, 'root', root_id, deployed_ou)
+    return LookupTable(
+            org_client.list_policies(Filter='SERVICE_CONTROL_POLICY')['Policies'])
+
+
+def list_ou_children(org_client, parent_id):
+    """
+    Query deployed AWS Organization.  Return tuple of lists (child_ou,
+    accounts) directly under the root or OrganizationalUnit 'parent_id'.
+    """
+    response = org_client.list_organizational_units_for_parent(ParentId=parent_id)
+    child_ou = response['OrganizationalUnits']
+    while 'NextToken' in response and response['NextToken']:
+        response = org_client.list_organizational_units_for_parent(
+            ParentId=parent_id, NextToken=response['NextToken'])
+        child_ou += response['OrganizationalUnits']
+
+    response = org_client.list_accounts_for_parent(ParentId=parent_id)
+    accounts = response['Accounts']
+    while 'NextToken' in response and response['NextToken']:
+        response = org_client.list_accounts_for_parent(
+            ParentId=parent_id, NextToken=response['NextToken'])
+        accounts += response['Accounts']
+    return (child_ou, accounts)
+
+
+def get_policy_content(org_client, policy_id):
+    """Return the policy document of Service Control Policy 'policy_id'"""
+    return json.loads(org_client.describe_policy(
+            PolicyId=policy_id)['Policy']['Content'])
+
+
+def scan_policy_contents(log, org_client, deployed_policies):
+    """
+    Return dict mapping the Id of each deployed Service Control Policy to
+    its policy document.  Policies are queried concurrently.
+    """
+    policy_ids = [p['Id'] for p in deployed_policies]
+    contents = run_tasks(log, policy_ids,
+            lambda policy_id: get_policy_content(org_client, policy_id))
+    return dict(zip(policy_ids, contents))
+
+
+def scan_deployed_ou(log, org_client, root_id, account_parents=None):
+    """
+    Traverse deployed AWS Organization one level at a time, querying all
+    OUs in a level concurrently.  Return LookupTable of organizational
+    unit dictionaries, root first and children following their parent.
+    If 'account_parents' dict is given, map each account Id found to the
+    Id of its parent.
+    """
+    root = dict(Name='root', Id=root_id)
+    ou_by_id = {root_id: root}
+    children = dict()
+    level = [root_id]
+    while level:
+        results = run_tasks(log, level,
+                lambda parent_id: list_ou_children(org_client, parent_id))
+        next_level = []
+        for parent_id, (child_ou, accounts) in zip(level, results):
+            parent = ou_by_id[parent_id]
+            log.debug('parent_name: %s; ou: %s' % (parent['Name'], yamlfmt(child_ou)))
+            log.debug('parent_name: %s; accounts: %s' % (parent['Name'], yamlfmt(accounts)))
+            parent['Child_OU'] = [ou['Name'] for ou in child_ou if 'Name' in ou]
+            parent['Accounts'] = [acc['Name'] for acc in accounts if 'Name' in acc]
+            children[parent_id] = child_ou
+            if account_parents is not None:
+                account_parents.update((acc['Id'], parent_id) for acc in accounts)
+            for ou in child_ou:
+                ou['ParentId'] = parent_id
+                ou_by_id[ou['Id']] = ou
+                next_level.append(ou['Id'])
+        level = next_level
+
+    # flatten the tree with each OU followed by its subtree
+    deployed_ou = LookupTable()
+    stack = [root]
+    while stack:
+        ou = stack.pop()
+        deployed_ou.append(ou)
+        stack.extend(reversed(children[ou['Id']]))
     log.debug(yamlfmt(deployed_ou))
     return deployed_ou
 
 
-def display_provisioned_policies(org_client, log, deployed):
+def display_provisioned_policies(log, deployed):
     """
     Print report of currently deployed Service Control Policies in
     AWS Organization.
@@ -174,17 +234,16 @@ def display_provisioned_policies(org_client, log, deployed):
         log.info("Description:\t%s" % policy['Description'])
         log.info("Id:\t%s" % policy['Id'])
         log.info("Content:")
-        log.info(json.dumps(json.loads(org_client.describe_policy(
-                PolicyId=policy['Id'])['Policy']['Content']),
+        log.info(json.dumps(deployed['policy_contents'][policy['Id']],
                 indent=2,
                 separators=(',', ': ')))
 
 
-def display_provisioned_ou(org_client, log, deployed_ou, parent_name, indent=0):
+def display_provisioned_ou(log, deployed, parent_name, indent=0):
     """
     Recursive function to display the deployed AWS Organization structure.
     """
-    # query aws for child orgs
+    deployed_ou = deployed['ou']
     parent_id = lookup(deployed_ou, 'Name', parent_name, 'Id')
     child_ou_list = lookup(deployed_ou, 'Name', parent_name, 'Child_OU')
     child_accounts = lookup(deployed_ou, 'Name', parent_name, 'Accounts')
@@ -192,7 +251,7 @@ def display_provisioned_ou(org_client, log, deployed_ou, parent_name, indent=0):
     tab = '  '
     log.info(tab*indent + parent_name + ':')
     # look for policies
-    policy_names = list_policies_in_ou(org_client, parent_id)
+    policy_names = list_policies_in_ou(deployed, parent_id)
     if len(policy_names) > 0:
         log.info(tab*indent + tab + 'Policies: ' + ', '.join(policy_names))
     # look for accounts
@@ -205,7 +264,38 @@ def display_provisioned_ou(org_client, log, deployed_ou, parent_name, indent=0):
         indent+=2
         for ou_name in child_ou_list:
             # recurse
-            display_provisioned_ou(org_client, log, deployed_ou, ou_name, indent)
+            display_provisioned_ou(log, deployed, ou_name, indent)
+
+
+def get_account_parent_id(org_client, deployed, account_id):
+    """
+    Return the Id of the parent of 'account_id' from the map built by
+    scan_deployed_ou().  Query AWS only for accounts not seen by the scan.
+    """
+    parent_id = deployed['account_parents'].get(account_id)
+    if parent_id is None:
+        parent_id = get_parent_id(org_client, account_id)
+        deployed['account_parents'][account_id] = parent_id
+    return parent_id
+
+
+def move_account(org_client, deployed, account, account_id,
+        source_parent_id, dest_parent_id):
+    """
+    Move account to 'dest_parent_id' and record the move in deployed
+    'account_parents' and in the 'Accounts' of the deployed OUs.
+    """
+    org_client.move_account(
+            AccountId=account_id,
+            SourceParentId=source_parent_id,
+            DestinationParentId=dest_parent_id)
+    deployed['account_parents'][account_id] = dest_parent_id
+    source_ou = deployed['ou'].find('Id', source_parent_id)
+    if source_ou and account in source_ou[0]['Accounts']:
+        source_ou[0]['Accounts'].remove(account)
+    dest_ou = deployed['ou'].find('Id', dest_parent_id)
+    if dest_ou:
+        dest_ou[0]['Accounts'].append(account)
 
 
 def manage_account_moves(org_client, args, log, deployed, ou_spec, dest_parent_id):
@@ -219,41 +309,41 @@ def manage_account_moves(org_client, args, log, deployed, ou_spec, dest_parent_i
             if not account_id:
                 log.warn("Account '%s' not yet in Organization" % account)
             else:
-                source_parent_id = get_parent_id(org_client, account_id)
+                source_parent_id = get_account_parent_id(
+                        org_client, deployed, account_id)
                 if dest_parent_id != source_parent_id:
                     log.info("Moving account '%s' to OU '%s'" %
                             (account, ou_spec['Name']))
                     if args['--exec']:
-                        org_client.move_account(
-                                AccountId=account_id,
-                                SourceParentId=source_parent_id,
-                                DestinationParentId=dest_parent_id)
+                        move_account(org_client, deployed, account,
+                                account_id, source_parent_id, dest_parent_id)
 
 
 def place_unmanged_accounts(org_client, args, log, deployed, account_list, dest_parent):
     """
     Move any unmanaged accounts into the default OU.
     """
+    dest_parent_id = lookup(deployed['ou'], 'Name', dest_parent, 'Id')
     for account in account_list:
         account_id = lookup(deployed['accounts'], 'Name', account, 'Id')
-        dest_parent_id   = lookup(deployed['ou'], 'Name', dest_parent, 'Id')
-        source_parent_id = get_parent_id(org_client, account_id)
+        source_parent_id = get_account_parent_id(org_client, deployed, account_id)
         if dest_parent_id and dest_parent_id != source_parent_id:
             log.info("Moving unmanged account '%s' to default OU '%s'" %
                     (account, dest_parent))
             if args['--exec']:
-                org_client.move_account(
-                        AccountId=account_id,
-                        SourceParentId=source_parent_id,
-                        DestinationParentId=dest_parent_id)
+                move_account(org_client, deployed, account,
+                        account_id, source_parent_id, dest_parent_id)
 
 
 def manage_policies(org_client, args, log, deployed, org_spec):
     """
     Manage Service Control Policies in the AWS Organization.  Make updates
     according to the sc_policies specification.  Do not touch
-    the default policy.  Do not delete an attached policy.
+    the default policy.  Do not delete an attached policy.  Policy
+    documents are compared in canonical form, so differences only in
+    formatting or ordering do not cause an update.
     """
+    skipped = 0
     for p_spec in org_spec['sc_policies']:
         policy_name = p_spec['PolicyName']
         log.debug("considering sc_policy: %s" % policy_name)
@@ -266,7 +356,7 @@ def manage_policies(org_client, args, log, deployed, org_spec):
             if policy:
                 log.info("Deleting policy '%s'" % (policy_name))
                 # dont delete attached policy
-                if org_client.list_targets_for_policy(PolicyId=policy['Id'])['Targets']:
+                if deployed['policy_targets'].get(policy['Id']):
                     log.error("Cannot delete policy '%s'. Still attached to OU" %
                             policy_name)
                 elif args['--exec']:
@@ -286,17 +376,21 @@ def manage_policies(org_client, args, log, deployed, org_spec):
                         Type='SERVICE_CONTROL_POLICY')
         # check for policy updates
         else:
-            deployed_policy_doc = json.dumps(json.loads(org_client.describe_policy(
-                    PolicyId=policy['Id'])['Policy']['Content']))
+            deployed_policy_doc = deployed['policy_contents'][policy['Id']]
             log.debug("real sc_policy_doc: %s" % yamlfmt(deployed_policy_doc))
             if (p_spec['Description'] != policy['Description']
-                or policy_doc != deployed_policy_doc):
+                or canonical_policy(policy_doc) != canonical_policy(deployed_policy_doc)):
                 log.info("Updating policy '%s'" % policy_name)
                 if args['--exec']:
                     org_client.update_policy(
                             PolicyId=policy['Id'],
                             Content=policy_doc,
                             Description=p_spec['Description'],)
+            elif policy_doc != json.dumps(deployed_policy_doc):
+                log.debug("policy '%s' differs only in formatting" % policy_name)
+                skipped += 1
+    if skipped:
+        log.info("Skipped update of %s policies with unchanged content" % skipped)
 
 
 def manage_policy_attachments(org_client, args, log, deployed, org_spec, ou_spec, ou_id):
@@ -305,7 +399,7 @@ def manage_policy_attachments(org_client, args, log, deployed, org_spec, ou_spec
     OrganizatinalUnit.  Do not detach the default policy ever.
     """
     # create lists policies_to_attach and policies_to_detach
-    attached_policy_list = list_policies_in_ou(org_client, ou_id)
+    attached_policy_list = list_policies_in_ou(deployed, ou_id)
     if 'SC_Policies' in ou_spec and isinstance(ou_spec['SC_Policies'], list):
         spec_policy_list = ou_spec['SC_Policies']
     else:
@@ -324,68 +418,160 @@ def manage_policy_attachments(org_client, args, log, deployed, org_spec, ou_spec
         if not ensure_absent(ou_spec):
             log.info("Attaching policy '%s' to OU '%s'" % (policy_name, ou_spec['Name']))
             if args['--exec']:
-                org_client.attach_policy(
-                        PolicyId=lookup(deployed['policies'], 'Name', policy_name, 'Id'),
-                        TargetId=ou_id)
+                policy_id = lookup(deployed['policies'], 'Name', policy_name, 'Id')
+                org_client.attach_policy(PolicyId=policy_id, TargetId=ou_id)
+                deployed['policy_targets'].setdefault(policy_id, set()).add(ou_id)
     # detach policies
     for policy_name in policies_to_detach:
         log.info("Detaching policy '%s' from OU '%s'" % (policy_name, ou_spec['Name']))
         if args['--exec']:
-            org_client.detach_policy(
-                    PolicyId=lookup(deployed['policies'], 'Name', policy_name, 'Id'),
-                    TargetId=ou_id)
+            policy_id = lookup(deployed['policies'], 'Name', policy_name, 'Id')
+            org_client.detach_policy(PolicyId=policy_id, TargetId=ou_id)
+            deployed['policy_targets'].get(policy_id, set()).discard(ou_id)
 
 
-def manage_ou(org_client, args, log, deployed, org_spec, ou_spec_list, parent_name):
+def flatten_ou_spec(ou_spec_list, parent_name, parent=None, depth=0, nodes=None):
     """
-    Recursive function to manage OrganizationalUnits in the AWS
-    Organization.
+    Return list of dicts describing each OU in a tree of OU specifications,
+    each OU followed by its subtree.  'parent' is the list index of the
+    parent OU or None for top level OUs.
     """
+    if nodes is None:
+        nodes = []
     for ou_spec in ou_spec_list:
-        # ou exists
-        ou = lookup(deployed['ou'], 'Name', ou_spec['Name'])
-        if ou:
-            # check for child_ou. recurse before other tasks.
-            if 'Child_OU' in ou_spec:
-                manage_ou(org_client, args, log, deployed, org_spec,
-                        ou_spec['Child_OU'], ou_spec['Name'])
-            # check if ou 'absent'
-            if ensure_absent(ou_spec):
-                log.info("Deleting OU %s" % ou_spec['Name'])
-                # error if ou contains anything
-                error_flag = False
-                for key in ['Accounts', 'SC_Policies', 'Child_OU']:
-                    if key in ou and ou[key]:
-                        log.error("Can not delete OU '%s'. deployed '%s' exists." %
-                                (ou_spec['Name'], key))
-                        error_flag = True
-                if error_flag:
-                    continue
-                elif args['--exec']:
-                    org_client.delete_organizational_unit(
-                            OrganizationalUnitId=ou['Id'])
-            # manage account and sc_policy placement in OU
-            else:
-                manage_policy_attachments(org_client, args, log,
-                        deployed, org_spec, ou_spec, ou['Id'])
-                manage_account_moves(org_client, args, log, deployed, ou_spec, ou['Id'])
-        # create new OU
-        elif not ensure_absent(ou_spec):
-            log.info("Creating new OU '%s' under parent '%s'" %
-                    (ou_spec['Name'], parent_name))
-            if args['--exec']:
-                new_ou = org_client.create_organizational_unit(
-                        ParentId=lookup(deployed['ou'],'Name',parent_name,'Id'),
-                        Name=ou_spec['Name'])['OrganizationalUnit']
-                # account and sc_policy placement
-                manage_policy_attachments(org_client, args, log,
-                        deployed, org_spec, ou_spec, new_ou['Id'])
-                manage_account_moves(org_client, args, log, deployed, ou_spec, new_ou['Id'])
-                # recurse if child OU
-                if ('Child_OU' in ou_spec and isinstance(new_ou, dict)
-                        and 'Id' in new_ou):
-                    manage_ou(org_client, args, log, deployed, org_spec,
-                            ou_spec['Child_OU'], new_ou['Name'])
+        nodes.append(dict(spec=ou_spec, parent_name=parent_name,
+                parent=parent, depth=depth))
+        if 'Child_OU' in ou_spec and ou_spec['Child_OU']:
+            flatten_ou_spec(ou_spec['Child_OU'], ou_spec['Name'],
+                    len(nodes) - 1, depth + 1, nodes)
+    return nodes
+
+
+def reconcile_ou(org_client, args, log, deployed, org_spec, ou_spec, parent_name):
+    """
+    Create an OU if it does not yet exist, then manage its policy
+    attachments and account placement.  Return the deployed OU dict, or
+    None if the OU does not exist.
+    """
+    ou = lookup(deployed['ou'], 'Name', ou_spec['Name'])
+    if ou:
+        if not ensure_absent(ou_spec):
+            manage_policy_attachments(org_client, args, log,
+                    deployed, org_spec, ou_spec, ou['Id'])
+            manage_account_moves(org_client, args, log, deployed, ou_spec, ou['Id'])
+        return ou
+    if ensure_absent(ou_spec):
+        return None
+    log.info("Creating new OU '%s' under parent '%s'" %
+            (ou_spec['Name'], parent_name))
+    if args['--exec']:
+        parent_id = lookup(deployed['ou'], 'Name', parent_name, 'Id')
+        new_ou = org_client.create_organizational_unit(
+                ParentId=parent_id,
+                Name=ou_spec['Name'])['OrganizationalUnit']
+        new_ou.update(ParentId=parent_id, Child_OU=[], Accounts=[])
+        # record the OU before moving accounts into it
+        deployed['ou'].append(new_ou)
+        # account and sc_policy placement
+        manage_policy_attachments(org_client, args, log,
+                deployed, org_spec, ou_spec, new_ou['Id'])
+        manage_account_moves(org_client, args, log, deployed, ou_spec, new_ou['Id'])
+        return new_ou
+    return None
+
+
+def delete_ou(org_client, args, log, ou_spec, ou):
+    """
+    Delete an empty OU.  Return True if the OU was deleted.
+    """
+    log.info("Deleting OU %s" % ou_spec['Name'])
+    # error if ou contains anything
+    error_flag = False
+    for key in ['Accounts', 'SC_Policies', 'Child_OU']:
+        if key in ou and ou[key]:
+            log.error("Can not delete OU '%s'. deployed '%s' exists." %
+                    (ou_spec['Name'], key))
+            error_flag = True
+    if error_flag:
+        return False
+    if args['--exec']:
+        org_client.delete_organizational_unit(OrganizationalUnitId=ou['Id'])
+        return True
+    return False
+
+
+def manage_ou(org_client, args, log, deployed, org_spec, ou_spec_list, parent_name):
+    """
+    Manage OrganizationalUnits in the AWS Organization.
+
+    OUs are handled one tree level at a time, with all OUs in a level run
+    concurrently, so parents exist before their children are created and
+    before accounts are moved into them.  Children of an OU which does not
+    exist are skipped.  OUs set 'absent' are deleted afterwards from the
+    bottom of the tree up.  Log messages are buffered per OU and replayed
+    in spec order.
+    """
+    nodes = flatten_ou_spec(ou_spec_list, parent_name)
+    depths = sorted(set(n['depth'] for n in nodes))
+    deployed_ou = dict()
+
+    def run_levels(order, levels, func, on_done):
+        # run each level concurrently, replaying logs in 'order'
+        buffers = dict((i, LogBuffer(log)) for i in order)
+        done = set()
+        position = 0
+        try:
+            for level in levels:
+                for i, result in iter_tasks(log, level,
+                        lambda i: func(i, buffers[i])):
+                    on_done(i, result)
+                    done.add(i)
+                    while position < len(order) and order[position] in done:
+                        buffers[order[position]].flush()
+                        position += 1
+        finally:
+            for i in order[position:]:
+                buffers[i].flush()
+
+    def reconcile(i, node_log):
+        node = nodes[i]
+        if node['parent'] is not None and deployed_ou[node['parent']] is None:
+            return None
+        return reconcile_ou(org_client, args, node_log, deployed, org_spec,
+                node['spec'], node['parent_name'])
+
+    def reconciled(i, ou):
+        deployed_ou[i] = ou
+        if ou is None:
+            return
+        parent = deployed['ou'].find('Id', ou.get('ParentId'))
+        if parent and ou['Name'] not in parent[0]['Child_OU']:
+            parent[0]['Child_OU'].append(ou['Name'])
+
+    order = list(range(len(nodes)))
+    levels = [[i for i in order if nodes[i]['depth'] == d] for d in depths]
+    run_levels(order, levels, reconcile, reconciled)
+
+    # delete absent OUs, deepest first
+    absent = [i for i in order
+            if ensure_absent(nodes[i]['spec']) and deployed_ou[i] is not None]
+    absent.sort(key=lambda i: -nodes[i]['depth'])
+    levels = [[i for i in absent if nodes[i]['depth'] == d]
+            for d in reversed(depths)]
+
+    def delete(i, node_log):
+        return delete_ou(org_client, args, node_log, nodes[i]['spec'],
+                deployed_ou[i])
+
+    def deleted(i, result):
+        if result:
+            ou = deployed_ou[i]
+            deployed['ou'].remove(ou)
+            parent = deployed['ou'].find('Id', ou.get('ParentId'))
+            if parent and ou['Name'] in parent[0]['Child_OU']:
+                parent[0]['Child_OU'].remove(ou['Name'])
+
+    run_levels(absent, levels, delete, deleted)
 
 
 def main():
@@ -399,19 +585,25 @@ def main():
     if isinstance(credentials, RuntimeError):
         log.critical(credentials)
         sys.exit(1)
-    org_client = boto3.client('organizations', **credentials)
+    org_client = get_client('organizations', credentials)
     root_id = get_root_id(org_client)
     deployed = dict(
             policies = scan_deployed_policies(org_client),
             accounts = scan_deployed_accounts(log, org_client),
-            ou = scan_deployed_ou(log, org_client, root_id))
+            account_parents = dict())
+    deployed['ou'] = scan_deployed_ou(log, org_client, root_id,
+            deployed['account_parents'])
+    deployed['policy_targets'] = scan_policy_targets(log, org_client,
+            deployed['policies'])
+    deployed['policy_contents'] = scan_policy_contents(log, org_client,
+            deployed['policies'])
 
     if args['report']:
         header = 'Provisioned Organizational Units in Org:'
         overbar = '_' * len(header)
         log.info("\n%s\n%s" % (overbar, header))
-        display_provisioned_ou(org_client, log, deployed['ou'], 'root')
-        display_provisioned_policies(org_client, log, deployed)
+        display_provisioned_ou(log, deployed, 'root')
+        display_provisioned_policies(log, deployed)
 
     if args['organization']:
         org_spec = validate_spec(log, args)
@@ -444,6 +636,8 @@ def main():
                     place_unmanged_accounts(org_client, args, log, deployed,
                             unmanaged, org_spec['default_ou'])
 
+    log_run_stats(log)
+
 
 if __name__ == "__main__":
     main()
@@ -9,9 +9,27 @@ Todo:
 
 import io
 import csv
+import time
+import datetime
+import collections
+from botocore.exceptions import ClientError
 from awsorgs.utils import *
 
 
+# Accounts whose reports may be in progress or waiting to be written
+REPORT_WINDOW = 20
+
+# Seconds to wait for IAM to finish generating a credential report
+CREDENTIAL_REPORT_TIMEOUT = 300
+
+# Hours a credential report is reused before a new one is generated.  IAM
+# does not generate a new report within 4 hours of the previous one.
+CREDENTIAL_REPORT_MAX_AGE = 4
+
+# Credential report values left out of report output
+CREDENTIAL_REPORT_EMPTY_VALUES = ('N/A', 'not_supported', 'no_information', 'false')
+
+
 # Report_maker utilities
 
 def overbar(string):
@@ -24,13 +42,21 @@ def overbar(string):
     return "%s\n%s" % ('_' * len(string), string)
 
 
-def report_maker(log, accounts, role, query_func, report_header=None, **qf_args):
+def report_maker(log, accounts, role, query_func, report_header=None,
+        ordered=True, sink=None, **qf_args):
     """
     Generate a report by running a arbitrary query function in each account.
     The query function must return a list of strings.
+
+    Each account's messages are passed to 'sink' (default log.info) as
+    soon as that account is done, so memory use does not grow with the
+    number of accounts.  If 'ordered', accounts are reported sorted by
+    name through a reorder buffer of at most REPORT_WINDOW accounts.
+    Otherwise they are reported as they complete.  An account whose query
+    fails is logged as an error and left out of the report.
     """
     # Thread worker function to gather report for each account
-    def make_account_report(account, report, role):
+    def make_account_report(account, role):
         messages = []
         messages.append(overbar("Account:    %s" % account['Name']))
         credentials = get_assume_role_credentials(account['Id'], role)
@@ -38,20 +64,23 @@ def report_maker(log, accounts, role, query_func, report_header=None, **qf_args)
             messages.append(credentials)
         else:
             messages += query_func(credentials, **qf_args)
-        report[account['Name']] = messages
-    # gather report data from accounts
-    report = {}
-    queue_threads(
-            log, accounts,
-            make_account_report,
-            f_args=(report, role),
-            thread_count=10)
-    # process the reports
+        return messages
+
+    if sink is None:
+        sink = log.info
     if report_header:
-        log.info("\n\n%s" % overbar(report_header))
-    for account, messages in sorted(report.items()):
-        for msg in messages:
-            log.info(msg)
+        sink("\n\n%s" % overbar(report_header))
+    if ordered:
+        results = iter_tasks_ordered(log,
+                sorted(accounts, key=lambda a: a['Name']),
+                make_account_report, f_args=(role,), window=REPORT_WINDOW,
+                log_errors=True)
+    else:
+        results = iter_tasks(log, accounts, make_account_report,
+                f_args=(role,), limit=REPORT_WINDOW, log_errors=True)
+    for account, messages in results:
+        for msg in messages or []:
+            sink(msg)
 
     
 # report_maker query functions
@@ -65,7 +94,7 @@ def user_group_report(credentials, verbose=False):
 
     """
     messages = []
-    iam_client = boto3.client('iam', **credentials)
+    iam_client = get_client('iam', credentials)
 
     user_info = []
     users = get_iam_objects(iam_client.list_users, 'Users')
@@ -95,38 +124,151 @@ def user_group_report(credentials, verbose=False):
     return messages
 
 
-def credentials_report(credentials):
+def generate_credential_report(iam_client, timeout=CREDENTIAL_REPORT_TIMEOUT):
     """
-    A report_maker query function.
-    IAM Credential report in an account
+    Ask IAM to generate a credential report and poll with exponential
+    backoff until it is complete.
+    """
+    deadline = time.time() + timeout
+    delay = 1
+    while iam_client.generate_credential_report()['State'] != 'COMPLETE':
+        if time.time() > deadline:
+            raise RuntimeError('timed out waiting for IAM credential report')
+        time.sleep(delay)
+        delay = min(delay * 2, 16)
 
-    ISSUES:
-      Clean up exception handling:
-      botocore.errorfactory.CredentialReportNotPresentException: An error occurred (ReportNotPresent) when calling the GetCredentialReport operation: Unknown
+
+def parse_credential_report(content):
+    """
+    Return iterator of dicts, one per user, keyed by csv column name, from
+    the csv 'content' (bytes) of an IAM credential report.  Rows are
+    decoded as they are read.
     """
+    return csv.DictReader(io.TextIOWrapper(io.BytesIO(content), encoding='utf-8'))
 
-    messages = []
-    iam_client = boto3.client('iam', **credentials)
+
+def fetch_fresh_credential_report(iam_client, max_age=CREDENTIAL_REPORT_MAX_AGE):
+    """
+    Return the csv content of the current credential report of an account
+    if it was generated less than 'max_age' hours ago, else None.
+    """
     try:
         response = iam_client.get_credential_report()
-    except Exception as e:
-        response = iam_client.generate_credential_report()
-        messages.append(yamlfmt(response))
-        return messages
+    except ClientError as e:
+        if e.response['Error']['Code'] in (
+                'ReportNotPresent', 'ReportExpired', 'ReportInProgress'):
+            return None
+        raise
+    age = datetime.datetime.now(datetime.timezone.utc) - response['GeneratedTime']
+    if age < datetime.timedelta(hours=max_age):
+        return response['Content']
+    return None
+
+
+def format_credential_report_row(row, account_name=None):
+    """
+    Return dict of user name, arn and the informative fields of one
+    credential report row.  Include 'account_name' if given.
+    """
+    user = dict(UserName=row['user'], Arn=row['arn'])
+    if account_name:
+        user['Account'] = account_name
+    for key, value in row.items():
+        if key not in ['user', 'arn'] and value not in CREDENTIAL_REPORT_EMPTY_VALUES:
+            user[key] = value
+    return user
 
-    report_file_object = io.StringIO(response['Content'].decode())
-    reader = csv.DictReader(report_file_object)
-    user_info = []
-    for row in reader:
-        user = dict()
-        for key in reader.fieldnames:
-            user['UserName'] = row['user']
-            user['Arn'] = row['arn']
-            if (key not in ['user', 'arn'] and 
-                    row[key] not in ['N/A', 'not_supported', 'no_information', 'false']):
-                user[key] = row[key]
-        user_info.append(user)
 
+def parse_report_time(value):
+    """
+    Return datetime for an ISO 8601 credential report field, or None for
+    values such as 'N/A' or 'no_information'.  Report times are UTC.
+    """
+    try:
+        return datetime.datetime.strptime(value[:19],
+                '%Y-%m-%dT%H:%M:%S').replace(tzinfo=datetime.timezone.utc)
+    except (ValueError, TypeError):
+        return None
+
+
+def find_expired_onetime_passwords(rows, ttl):
+    """
+    Return dict mapping user name to 'password_last_changed' time for
+    users in credential report 'rows' whose password was set more than
+    'ttl' (timedelta) ago and not used since it was set.  These may be
+    expired one-time passwords.  Confirm each with the user's login
+    profile before acting on it.
+    """
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - ttl
+    user_names = collections.OrderedDict()
+    for row in rows:
+        if row['password_enabled'] != 'true':
+            continue
+        last_changed = parse_report_time(row['password_last_changed'])
+        last_used = parse_report_time(row['password_last_used'])
+        if (last_changed is not None and last_changed < cutoff
+                and (last_used is None or last_used < last_changed)):
+            user_names[row['user']] = last_changed
+    return user_names
+
+
+def get_credential_report(iam_client, max_age=CREDENTIAL_REPORT_MAX_AGE):
+    """
+    Return the IAM credential report of an account as a list of dicts, one
+    per user, keyed by csv column name.  The current report is reused if
+    younger than 'max_age' hours, otherwise a new one is generated.
+    """
+    content = fetch_fresh_credential_report(iam_client, max_age)
+    if content is None:
+        generate_credential_report(iam_client)
+        content = iam_client.get_credential_report()['Content']
+    return list(parse_credential_report(content))
+
+
+def org_credentials_report(log, accounts, role, report_header=None,
+        max_age=CREDENTIAL_REPORT_MAX_AGE, sink=None):
+    """
+    Write the IAM credential reports of all accounts as one merged list
+    of users, sorted by account name, to 'sink' (default log.info).
+
+    Accounts are queried concurrently.  Each reuses its current report if
+    it is younger than 'max_age' hours, or else generates a new one.  An
+    account's users are written as soon as it and every account before it
+    are done, through a reorder buffer of at most REPORT_WINDOW accounts,
+    so only that many reports are held in memory at once.  Accounts which
+    fail are logged as errors and left out of the report.
+    """
+    def account_users(account):
+        credentials = get_assume_role_credentials(account['Id'], role)
+        if isinstance(credentials, RuntimeError):
+            log.error(credentials)
+            return None
+        iam_client = get_client('iam', credentials)
+        return [format_credential_report_row(row, account['Name'])
+                for row in get_credential_report(iam_client, max_age)]
+
+    if sink is None:
+        sink = log.info
+    if report_header:
+        sink("\n\n%s" % overbar(report_header))
+    sink('Users:')
+    for account, users in iter_tasks_ordered(log,
+            sorted(accounts, key=lambda a: a['Name']), account_users,
+            window=REPORT_WINDOW, log_errors=True):
+        if users:
+            sink(yamlfmt(users).rstrip())
+
+
+def credentials_report(credentials):
+    """
+    A report_maker query function.
+    IAM Credential report in an account.  A current report is reused if
+    fresh, otherwise a new one is generated.
+    """
+    messages = []
+    iam_client = get_client('iam', credentials)
+    user_info = [format_credential_report_row(row)
+            for row in get_credential_report(iam_client)]
     if user_info:
         messages.append(yamlfmt(dict(Users=user_info)))
     return messages
@@ -138,8 +280,8 @@ def role_report(credentials, verbose=False):
     Reports IAM custom policies and roles in an account.
     """
     messages = []
-    iam_client = boto3.client('iam', **credentials)
-    iam_resource = boto3.resource('iam', **credentials)
+    iam_client = get_client('iam', credentials)
+    iam_resource = get_resource('iam', credentials)
 
     policy_info = []
     custom_policies = get_iam_objects(iam_client.list_policies, 'Policies', 
@@ -181,63 +323,25 @@ def account_authorization_report(credentials, verbose=False):
     A report_maker query function.
     IAM Account Authorization Reporting
 
+    All users, groups, roles and custom policies are fetched in a single
+    paginated get_account_authorization_details pass.
     """
     messages = []
-    iam_client = boto3.client('iam', **credentials)
-
-    user_info = []
-    users = get_iam_objects(
-            iam_client.get_account_authorization_details, 
-            'UserDetailList',
-            dict(Filter=['User']))
-    for u in users:
-        if verbose:
-            user_info.append(u)
-        else:
-            user_info.append(u['Arn'])
-    if user_info:
-        messages.append(yamlfmt(dict(Users=user_info)))
-
-    group_info = []
-    groups = get_iam_objects(
-            iam_client.get_account_authorization_details, 
-            'GroupDetailList',
-            dict(Filter=['Group']))
-    for u in groups:
-        if verbose:
-            group_info.append(u)
-        else:
-            group_info.append(u['Arn'])
-    if group_info:
-        messages.append(yamlfmt(dict(Groups=group_info)))
-
-    role_info = []
-    roles = get_iam_objects(
-            iam_client.get_account_authorization_details, 
-            'RoleDetailList',
-            dict(Filter=['Role']))
-    for u in roles:
-        if verbose:
-            role_info.append(u)
-        else:
-            role_info.append(u['Arn'])
-    if role_info:
-        messages.append(yamlfmt(dict(Roles=role_info)))
-
-    policy_info = []
-    policies = get_iam_objects(
-            iam_client.get_account_authorization_details, 
-            'Policies',
-            dict(Filter=['LocalManagedPolicy']))
-    for u in policies:
-        if verbose:
-            policy_info.append(u)
-        else:
-            policy_info.append(u['Arn'])
-    if policy_info:
-        messages.append(yamlfmt(dict(CustomPolicies=policy_info)))
-
-
+    iam_client = get_client('iam', credentials)
+    details = get_account_authorization_details(iam_client)
+    for detail_key, label in (
+            ('UserDetailList', 'Users'),
+            ('GroupDetailList', 'Groups'),
+            ('RoleDetailList', 'Roles'),
+            ('Policies', 'CustomPolicies')):
+        info = []
+        for u in details[detail_key]:
+            if verbose:
+                info.append(u)
+            else:
+                info.append(u['Arn'])
+        if info:
+            messages.append(yamlfmt({label: info}))
     return messages
 
 
@@ -279,8 +383,9 @@ def display_provisioned_groups(log, args, deployed, credentials):
     profiles.
     """
     # Thread worker function to assemble lines of a group report
-    def display_group(group_name, report, iam_resource):
+    def display_group(group_name, report, credentials):
         log.debug('group_name: %s' % group_name)
+        iam_resource = get_resource('iam', credentials)
         messages = []
         group = iam_resource.Group(group_name)
         members = list(group.users.all())
@@ -321,9 +426,8 @@ def display_provisioned_groups(log, args, deployed, credentials):
     if args['--full']:
         # gather report data from groups
         report = {}
-        iam_resource = boto3.resource('iam', **credentials)
-        queue_threads(log, group_names, display_group, f_args=(report, iam_resource),
-                thread_count=10)
+        run_tasks(log, group_names, display_group, f_args=(report, credentials),
+                limit=10)
         for group_name, messages in sorted(report.items()):
             for msg in messages:
                 log.info(msg)
@@ -354,8 +458,8 @@ def display_roles_in_accounts(log, args, deployed, auth_spec):
         if isinstance(credentials, RuntimeError):
             messages.append(credentials)
         else:
-            iam_client = boto3.client('iam', **credentials)
-            iam_resource = boto3.resource('iam', **credentials)
+            iam_client = get_client('iam', credentials)
+            iam_resource = get_resource('iam', credentials)
             roles = [r for r in iam_client.list_roles()['Roles']]
             custom_policies = iam_client.list_policies(Scope='Local')['Policies']
             if custom_policies:
@@ -383,8 +487,8 @@ def display_roles_in_accounts(log, args, deployed, auth_spec):
 
     # gather report data from accounts
     report = {}
-    queue_threads(log, deployed['accounts'], display_role, f_args=(report, auth_spec),
-            thread_count=10)
+    run_tasks(log, deployed['accounts'], display_role, f_args=(report, auth_spec),
+            limit=10, log_errors=True)
     # process the reports
     header = "Provisioned IAM Roles in all Org Accounts:"
     overbar = '_' * len(header)
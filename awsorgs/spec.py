@@ -2,7 +2,6 @@ import sys
 import os
 import yaml
 
-import boto3
 from botocore.exceptions import ClientError
 from cerberus import Validator, schema_registry
 
@@ -54,7 +53,7 @@ def get_master_account_id(log, args, config):
     else:
         log.debug("'master_account_id' not set in config_file or as cli option")
         try:
-            master_account_id = boto3.client('organizations'
+            master_account_id = get_client('organizations'
                     ).describe_organization()['Organization']['MasterAccountId']
         except ClientError as e:
             log.critical("can not determine master_account_id: {}".format(e))
@@ -89,6 +88,17 @@ def load_config(log, args):
     org_access_role
     spec_dir (except when handling reports)
     auth_account_id (except when called by awsorgs)
+    cache_dir
+
+    If config param 'credential_cache' is true, assume role credentials
+    are persisted under cache_dir for reuse by later invocations.  If
+    'policy_catalog_cache' is true, the AWS managed policy catalog is kept
+    in cache_dir for 'policy_catalog_ttl' hours.  If 'alias_cache' is
+    true, account aliases are kept there for 'alias_cache_ttl' hours.
+    Config param 'max_threads' caps the number of concurrent
+    worker threads.  Params 'max_attempts' and 'api_rates' tune retries
+    and per service request rates.  Param 'endpoint_urls' maps service
+    names to alternate api endpoints.
     """
     config = scan_config_file(log, args)
     args['--master-account-id'] = get_master_account_id(log, args, config)
@@ -97,6 +107,22 @@ def load_config(log, args):
         args['--org-access-role'] =  config.get('org_access_role')
     if not args['--auth-account-id']:
         args['--auth-account-id'] =  config.get('auth_account_id')
+    args['--cache-dir'] = os.path.expanduser(
+            config.get('cache_dir') or DEFAULT_CACHE_DIR)
+    if config.get('credential_cache'):
+        log.debug("credential cache enabled in: %s" % args['--cache-dir'])
+        enable_credential_cache_file(args['--cache-dir'])
+    set_max_threads(config.get('max_threads'))
+    set_retry_config(config.get('max_attempts'), config.get('api_rates'))
+    set_endpoint_urls(config.get('endpoint_urls'))
+    if config.get('policy_catalog_cache'):
+        log.debug("policy catalog cache enabled in: %s" % args['--cache-dir'])
+        enable_policy_catalog_file(args['--cache-dir'],
+                config.get('policy_catalog_ttl', DEFAULT_POLICY_CATALOG_TTL))
+    if config.get('alias_cache'):
+        log.debug("account alias cache enabled in: %s" % args['--cache-dir'])
+        enable_alias_store(args['--cache-dir'],
+                config.get('alias_cache_ttl', DEFAULT_ALIAS_STORE_TTL))
     return args
 
 
@@ -169,6 +195,10 @@ def validate_spec(log, args):
         log.critical("spec_object validation failed:\n{}".format(
                 yamlfmt(validator.errors)))
         sys.exit(1)
+    # index top level spec lists for lookup()
+    for key, value in spec_object.items():
+        if isinstance(value, list):
+            spec_object[key] = LookupTable(value)
     validate_teams_in_spec(log, spec_object)
     log.debug("spec_object validation succeeded")
     return spec_object
@@ -6,23 +6,25 @@ Creates role 'OrganizationAccountAccessRole' allowing users in
 Org Master account 'AdministratorAccess' in invited account.
 
 Usage:
-  awsorgs-accessrole --master_id ID [--exec]
+  awsorgs-accessrole --master_id ID [--exec] [--cache-dir DIR]
   awsorgs-accessrole --help
   awsorgs-accessrole --version
 
 Options:
   -m, --master_id ID    Master Account ID
+  --cache-dir DIR       Reuse the AWS managed policy catalog cached in DIR.
   -h, --help            Show this help message and exit.
   -V, --version         Display version info and exit.
 """
 
+import os
 import json
 
-import boto3
 from docopt import docopt
 
 import awsorgs
-from awsorgs.utils import lookup
+from awsorgs.utils import (enable_policy_catalog_file, get_aws_managed_policies,
+        get_client, get_resource)
 
 ROLENAME = 'OrganizationAccountAccessRole'
 DESCRIPTION = 'Organization Access Role'
@@ -31,7 +33,7 @@ POLICYNAME = 'AdministratorAccess'
 
 def main():
     args = docopt(__doc__, version=awsorgs.__version__)
-    iam_client = boto3.client('iam')
+    iam_client = get_client('iam')
     # assemble assume-role policy statement
     principal = "arn:aws:iam::%s:root" % args['--master_id']
     statement = dict(
@@ -48,10 +50,10 @@ def main():
                 RoleName=ROLENAME,
                 AssumeRolePolicyDocument=policy_doc)
     # attach policy to new role
-    iam_resource = boto3.resource('iam')
-    aws_policies = iam_client.list_policies(
-            Scope='AWS', MaxItems=500)['Policies']
-    policy_arn = lookup(aws_policies, 'PolicyName', POLICYNAME, 'Arn')
+    iam_resource = get_resource('iam')
+    if args['--cache-dir']:
+        enable_policy_catalog_file(os.path.expanduser(args['--cache-dir']))
+    policy_arn = get_aws_managed_policies(iam_client).get(POLICYNAME)
     role = iam_resource.Role(ROLENAME)
     try:
         role.load()
@@ -5,13 +5,25 @@ import sys
 import re
 import pkg_resources
 import difflib
+import datetime
+import time
+import random
+import json
+import tempfile
 import threading
+import functools
+import traceback
+import collections
+from contextlib import contextmanager
+from concurrent import futures
 try:
-    import queue
+    import fcntl
 except ImportError:
-    import Queue as queue
+    fcntl = None
 
 import boto3
+import botocore.exceptions
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import yaml
 import logging
@@ -20,31 +32,224 @@ import logging
 S3_BUCKET_PREFIX = 'awsorgs'
 S3_OBJECT_KEY = 'deployed_accounts.yaml'
 
+# Default location for on-disk caches shared across cli invocations
+DEFAULT_CACHE_DIR = '~/.awsorgs/cache'
+CREDENTIAL_CACHE_FILE = 'credentials.json'
+POLICY_CATALOG_FILE = 'aws_managed_policies.json'
+PENDING_ACCOUNTS_FILE = 'pending_accounts.json'
+ALIAS_STORE_FILE = 'account_aliases.json'
+
+# Hours before the on-disk AWS managed policy catalog is refreshed
+DEFAULT_POLICY_CATALOG_TTL = 24
+
+# Hours before a cached account alias is queried again
+DEFAULT_ALIAS_STORE_TTL = 24
+
+# Upper bound on worker threads shared by all task pools in the process
+DEFAULT_MAX_THREADS = 20
+
+# Attempts per api call before giving up on throttling or transient errors
+DEFAULT_MAX_ATTEMPTS = 8
+
+# Initial requests per second allowed for each service
+DEFAULT_API_RATES = dict(organizations=10, iam=15, sts=50)
+DEFAULT_API_RATE = 50
+
+# Error codes returned when AWS rate limits a caller
+THROTTLE_ERROR_CODES = frozenset([
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'SlowDown',
+    'BandwidthLimitExceeded',
+    'PriorRequestNotComplete',
+])
+
+# Transient errors retried without backing off the request rate
+TRANSIENT_ERROR_CODES = frozenset([
+    'ConcurrentModificationException',
+    'ServiceException',
+    'ServiceFailure',
+    'ServiceUnavailable',
+    'InternalFailure',
+    'InternalError',
+    'RequestTimeout',
+    'RequestTimeoutException',
+])
+
+# Policy statement elements given as either a string or list of strings
+POLICY_LIST_ELEMENTS = ('Action', 'NotAction', 'Resource', 'NotResource')
+
+# Refresh cached assume_role credentials this long before they expire
+CREDENTIAL_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+# Process-wide bounded executor used by run_tasks()
+_executor = dict(pool=None, max_threads=DEFAULT_MAX_THREADS)
+_executor_lock = threading.Lock()
+_worker_state = threading.local()
+
+# Reusable boto3 clients and resources keyed by client_cache_key().  Each
+# entry holds (access key, client), and is replaced when the credentials
+# for its account are refreshed.  Clients are thread safe and are shared
+# by all threads.  Resources are not, so are per thread.  All are built
+# from one boto3 Session, which is only used under _session_lock.
+_client_cache = dict()
+_client_cache_lock = threading.Lock()
+_client_config = dict(max_pool_connections=None)
+_endpoint_urls = dict()
+_session = dict(session=None)
+_session_lock = threading.Lock()
+_resource_state = threading.local()
+
+# Process-wide cache of assume_role credentials keyed by (account_id, role_name)
+_credential_cache = dict()
+_credential_locks = dict()
+_credential_cache_lock = threading.Lock()
+_credential_cache_stats = dict(hits=0, misses=0, disk_hits=0)
+_credential_cache_file = dict(path=None)
+_caller_identity = dict()
+
+# Catalog of AWS managed policies shared by all accounts
+_aws_policy_catalog = dict()
+_aws_policy_catalog_lock = threading.Lock()
+_aws_policy_catalog_file = dict(path=None, ttl=DEFAULT_POLICY_CATALOG_TTL)
+
+# Account aliases cached on disk, keyed by account Id
+_alias_store_file = dict(path=None, ttl=DEFAULT_ALIAS_STORE_TTL)
+
 
 def get_s3_bucket_name(prefix=S3_BUCKET_PREFIX):
     """
     Generate an s3 bucket name based on a name prefix and the aws account ig
     """
-    sts_client = boto3.client('sts')
-    account_id = sts_client.get_caller_identity()['Account']
+    account_id = get_caller_identity()['Account']
     return '-'.join([prefix, account_id])
 
 
+class LookupTable(list):
+    """
+    A list of dictionaries which maintains hash indexes for lookup().
+
+    An index for a given key is built on the first lookup by that key and
+    reused until the table is modified.  Modifications through list methods
+    discard all indexes.  Changing the indexed value of a dictionary which
+    is already in the table is not detected, so index keys should be
+    attributes which do not change (e.g. 'Name', 'Id', 'UserName').
+    """
+
+    def __init__(self, iterable=()):
+        super(LookupTable, self).__init__(iterable)
+        self._indexes = dict()
+        self._index_lock = threading.Lock()
+
+    def __reduce__(self):
+        return (self.__class__, (list(self),))
+
+    def _invalidate(self):
+        # rebind rather than clear, so an index being built concurrently
+        # from the old contents is stored in the discarded dict
+        self._indexes = dict()
+
+    def get_index(self, lkey):
+        """
+        Return dict mapping values of 'lkey' to the list of dictionaries
+        in the table with that value.  Dictionaries without 'lkey' or with
+        an unhashable value are not indexed.
+        """
+        indexes = self._indexes
+        index = indexes.get(lkey)
+        if index is None:
+            with self._index_lock:
+                index = indexes.get(lkey)
+                if index is None:
+                    index = dict()
+                    for d in self:
+                        if lkey in d:
+                            try:
+                                index.setdefault(d[lkey], []).append(d)
+                            except TypeError:
+                                continue
+                    indexes[lkey] = index
+        return index
+
+    def find(self, lkey, lvalue):
+        """Return list of dictionaries where d[lkey] == lvalue"""
+        try:
+            return self.get_index(lkey).get(lvalue, [])
+        except TypeError:
+            return [d for d in self if lkey in d and d[lkey] == lvalue]
+
+    def append(self, item):
+        super(LookupTable, self).append(item)
+        self._invalidate()
+
+    def extend(self, iterable):
+        super(LookupTable, self).extend(iterable)
+        self._invalidate()
+
+    def insert(self, i, item):
+        super(LookupTable, self).insert(i, item)
+        self._invalidate()
+
+    def remove(self, item):
+        super(LookupTable, self).remove(item)
+        self._invalidate()
+
+    def pop(self, *args):
+        item = super(LookupTable, self).pop(*args)
+        self._invalidate()
+        return item
+
+    def clear(self):
+        super(LookupTable, self).clear()
+        self._invalidate()
+
+    def __setitem__(self, i, item):
+        super(LookupTable, self).__setitem__(i, item)
+        self._invalidate()
+
+    def __delitem__(self, i):
+        super(LookupTable, self).__delitem__(i)
+        self._invalidate()
+
+    def __iadd__(self, iterable):
+        self.extend(iterable)
+        return self
+
+    def __imul__(self, n):
+        result = super(LookupTable, self).__imul__(n)
+        self._invalidate()
+        return result
+
+
+# dump LookupTable as a plain yaml sequence
+yaml.add_representer(LookupTable,
+        lambda dumper, data: dumper.represent_list(data))
+
+
 def lookup(dlist, lkey, lvalue, rkey=None):
     """
     Use a known key:value pair to lookup a dictionary in a list of
     dictionaries.  Return the dictonary or None.  If rkey is provided,
     return the value referenced by rkey or None.  If more than one
-    dict matches, raise an error.
+    dict matches, raise an error.  When dlist is a LookupTable the
+    search uses its hash index for lkey instead of a linear scan.
     args:
         dlist:   lookup table -  a list of dictionaries
         lkey:    name of key to use as lookup criteria
         lvalue:  value to use as lookup criteria
         rkey:    (optional) name of key referencing a value to return
     """
-    items = [d for d in dlist
-             if lkey in d
-             and d[lkey] == lvalue]
+    if isinstance(dlist, LookupTable):
+        items = dlist.find(lkey, lvalue)
+    else:
+        items = [d for d in dlist
+                 if lkey in d
+                 and d[lkey] == lvalue]
     if not items:
         return None
     if len(items) > 1:
@@ -125,6 +330,50 @@ def get_logger(args):
     return log
 
 
+class LogBuffer(object):
+    """
+    Stand in for a logging.Logger which holds messages until flush().
+    Lets concurrent tasks log to their own buffer so output can be
+    replayed in a deterministic order.  Records are created when logged,
+    so timestamps and caller info are those of the original call.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.records = []
+
+    def _log(self, level, msg, *args):
+        if self.log.isEnabledFor(level):
+            # the frame which called debug(), info(), etc.
+            frame = sys._getframe(2)
+            self.records.append(self.log.makeRecord(
+                    self.log.name, level, frame.f_code.co_filename,
+                    frame.f_lineno, msg, args, None, frame.f_code.co_name))
+
+    def debug(self, msg, *args):
+        self._log(logging.DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        self._log(logging.INFO, msg, *args)
+
+    def warning(self, msg, *args):
+        self._log(logging.WARNING, msg, *args)
+
+    warn = warning
+
+    def error(self, msg, *args):
+        self._log(logging.ERROR, msg, *args)
+
+    def critical(self, msg, *args):
+        self._log(logging.CRITICAL, msg, *args)
+
+    def flush(self):
+        """Pass buffered records on to the wrapped logger"""
+        records, self.records = self.records, []
+        for record in records:
+            self.log.handle(record)
+
+
 def valid_account_id(log, account_id):
     """Validate account Id is a 12 digit string"""
     if not isinstance(account_id, str):
@@ -160,60 +409,808 @@ def validate_master_id(org_client, spec):
     return
 
 
-def queue_threads(log, sequence, func, f_args=(), thread_count=20):
-    """generalized abstraction for running queued tasks in a thread pool"""
+def set_max_threads(max_threads):
+    """
+    Set the global cap on concurrent worker threads.  Must be called
+    before the first call to run_tasks() to take effect.
+    """
+    with _executor_lock:
+        if _executor['pool'] is None and max_threads:
+            _executor['max_threads'] = int(max_threads)
+
+
+def get_executor():
+    """
+    Return the process-wide bounded ThreadPoolExecutor.  All task pools
+    share its workers, so the number of concurrent api calls never
+    exceeds the max_threads cap no matter how tasks are batched.
+    """
+    with _executor_lock:
+        if _executor['pool'] is None:
+            _executor['pool'] = futures.ThreadPoolExecutor(
+                    max_workers=_executor['max_threads'],
+                    thread_name_prefix='awsorgs')
+        return _executor['pool']
 
-    def worker(*args):
-        log.debug('%s: q.empty: %s' % (threading.current_thread().name, q.empty()))
-        while not q.empty():
-            log.debug('%s: task: %s' % (threading.current_thread().name, func))
-            item = q.get()
-            log.debug('%s: processing item: %s' % (threading.current_thread().name, item))
-            func(item, *args)
-            q.task_done()
 
-    q = queue.Queue()
-    for item in sequence:
-        log.debug('queuing item: %s' % item)
-        q.put(item)
-    log.debug('queue length: %s' % q.qsize())
-    for i in range(thread_count):
-        t = threading.Thread(target=worker, args=f_args)
-        t.setDaemon(True)
-        t.start()
-    q.join()
+def max_threads():
+    """Return the global cap on concurrent worker threads."""
+    return _executor['max_threads']
 
 
-def get_assume_role_credentials(account_id, role_name, region_name=None):
+def task_label(item):
+    """Return a short name for a task item in log messages"""
+    if isinstance(item, dict):
+        return item.get('Name') or item.get('Id') or item
+    return item
+
+
+def _call_task(log, item, func, f_args, log_errors):
+    if not log_errors:
+        return func(item, *f_args)
+    try:
+        return func(item, *f_args)
+    except Exception as e:
+        log.error("error processing '%s': %s: %s" %
+                (task_label(item), type(e).__name__, e))
+        log.debug(traceback.format_exc())
+        return None
+
+
+def _run_task(log, item, func, f_args, log_errors=False):
+    # executed in a worker thread
+    _worker_state.active = True
+    try:
+        log.debug('%s: processing item: %s' %
+                (threading.current_thread().name, item))
+        return _call_task(log, item, func, f_args, log_errors)
+    finally:
+        _worker_state.active = False
+
+
+def _steal_task(futures_list):
     """
-    Get temporary sts assume_role credentials for account.
+    Called from inside a worker waiting on its own batch.  Cancel the
+    first task the pool has not started yet and return its future, so the
+    caller can run it in its own thread.  Return None if every task is
+    already running.  A worker therefore only ever blocks on tasks which
+    are running, and nested batches can not deadlock the pool.
+    """
+    for future in futures_list:
+        if future.cancel():
+            return future
+    return None
+
+
+def _run_task_window(log, sequence, func, f_args, limit, log_errors):
+    """
+    Generator behind run_tasks() and iter_tasks().  Keeps at most 'limit'
+    tasks from 'sequence' submitted to the shared executor and yields
+    tuples (index, item, result) as tasks complete.  If a task raises,
+    tasks not yet started are cancelled, running tasks are waited for,
+    and the exception is re-raised.  With 'log_errors' the exception is
+    logged instead and the task's result is None.
+    """
+    def run(item):
+        return _run_task(log, item, func, f_args, log_errors)
+
+    # a batch started from inside a worker shares the pool too.  while it
+    # waits, the worker runs its own unstarted tasks rather than block.
+    nested = getattr(_worker_state, 'active', False)
+    pool = get_executor()
+    limit = min(limit or max_threads(), max_threads())
+    items = enumerate(sequence)
+    pending = dict()
+
+    def submit_next():
+        for index, item in items:
+            log.debug('queuing item: %s' % item)
+            pending[pool.submit(run, item)] = (index, item)
+            return True
+        return False
+
+    try:
+        for i in range(limit):
+            if not submit_next():
+                break
+        while pending:
+            done = [future for future in pending if future.done()]
+            if not done and nested:
+                stolen = _steal_task(list(pending))
+                done = [stolen] if stolen else []
+            if not done:
+                done, not_done = futures.wait(
+                        list(pending), return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                index, item = pending.pop(future)
+                if future.cancelled():
+                    result = _call_task(log, item, func, f_args, log_errors)
+                else:
+                    result = future.result()
+                submit_next()
+                yield index, item, result
+    finally:
+        for future in pending:
+            future.cancel()
+        futures.wait(list(pending))
+
+
+def iter_tasks(log, sequence, func, f_args=(), limit=None, log_errors=False):
+    """
+    Run func(item, *f_args) for each item in sequence on the shared
+    bounded executor.  Yield tuples (item, result) in completion order.
+
+    limit:      max tasks from this sequence in flight at once.  Capped by
+                the global max_threads.
+    log_errors: log an exception raised by a task and carry on with the
+                rest.  The failed task's result is None.
+
+    Closing the generator early cancels tasks not yet started.
+    """
+    for index, item, result in _run_task_window(
+            log, sequence, func, f_args, limit, log_errors):
+        yield item, result
+
+
+def iter_tasks_ordered(log, sequence, func, f_args=(), window=None,
+        log_errors=False):
+    """
+    Like iter_tasks(), but yield tuples (item, result) in sequence order.
+    At most 'window' tasks are running or holding a result not yet
+    yielded, so memory stays bounded however long the sequence.  A slow
+    task holds back output, and once the window fills, new tasks.
+    """
+    nested = getattr(_worker_state, 'active', False)
+    pool = get_executor()
+    window = min(window or max_threads(), max_threads())
+    items = iter(sequence)
+    queue = collections.deque()
+
+    def submit_next():
+        for item in items:
+            log.debug('queuing item: %s' % item)
+            queue.append((item, pool.submit(_run_task, log, item, func, f_args,
+                    log_errors)))
+            return True
+        return False
+
+    try:
+        for i in range(window):
+            if not submit_next():
+                break
+        while queue:
+            item, future = queue[0]
+            if nested and _steal_task([future]):
+                result = _call_task(log, item, func, f_args, log_errors)
+            else:
+                result = future.result()
+            queue.popleft()
+            submit_next()
+            yield item, result
+    finally:
+        for item, future in queue:
+            future.cancel()
+        futures.wait([future for item, future in queue])
+
+
+def run_tasks(log, sequence, func, f_args=(), limit=None, log_errors=False):
+    """
+    Run func(item, *f_args) for each item in sequence on the shared
+    bounded executor.  Return list of results in sequence order.  Unless
+    'log_errors' is set, the first exception raised by a task cancels the
+    remaining tasks and is re-raised.  See iter_tasks() for args.
+    """
+    results = dict()
+    for index, item, result in _run_task_window(
+            log, sequence, func, f_args, limit, log_errors):
+        results[index] = result
+    return [results[i] for i in sorted(results)]
+
+
+class ServiceThrottle(object):
+    """
+    Client side rate and concurrency limits for one AWS service in one
+    account.  Requests are not paced until the service throttles us.
+    From then on a token bucket paces requests to at most 'rate' per
+    second.  Both the rate and the number of requests in flight are
+    halved on each throttling error and grow back gradually as requests
+    succeed.
+    """
+
+    def __init__(self, rate):
+        self.max_rate = float(rate)
+        self.rate = None
+        self.tokens = 0
+        self.last_fill = time.monotonic()
+        self.last_throttle = 0
+        self.concurrency = None
+        self.in_flight = 0
+        self.successes = 0
+        self.cond = threading.Condition()
+        self.stats = dict(calls=0, retries=0, throttles=0, errors=0,
+                max_in_flight=0, wait_seconds=0.0)
+
+    def limit(self):
+        return self.concurrency or max_threads()
+
+    def acquire(self):
+        """Wait for a free slot and, once pacing, a token.  Per attempt."""
+        start = time.monotonic()
+        with self.cond:
+            while self.in_flight >= self.limit():
+                self.cond.wait()
+            while self.rate is not None:
+                now = time.monotonic()
+                self.tokens = min(max(self.rate, 1),
+                        self.tokens + (now - self.last_fill) * self.rate)
+                self.last_fill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                self.cond.wait((1 - self.tokens) / self.rate)
+            self.in_flight += 1
+            self.stats['calls'] += 1
+            self.stats['max_in_flight'] = max(
+                    self.stats['max_in_flight'], self.in_flight)
+            self.stats['wait_seconds'] += time.monotonic() - start
+
+    def release(self, success):
+        with self.cond:
+            self.in_flight -= 1
+            if success:
+                if self.rate is not None:
+                    self.rate = min(self.max_rate,
+                            self.rate + self.max_rate / 20)
+                self.successes += 1
+                if self.concurrency and self.successes >= self.concurrency:
+                    self.successes = 0
+                    self.concurrency += 1
+                    if self.concurrency >= max_threads():
+                        self.concurrency = None
+            else:
+                self.stats['errors'] += 1
+            self.cond.notify_all()
+
+    def throttled(self):
+        """
+        Back off after a throttling error.  The first one turns on pacing
+        at 'max_rate'.  Concurrent callers are all throttled at once, so
+        shrink at most once per second.
+        """
+        with self.cond:
+            self.stats['throttles'] += 1
+            now = time.monotonic()
+            if now - self.last_throttle < 1:
+                return
+            self.last_throttle = now
+            if self.rate is None:
+                self.rate = self.max_rate
+                self.last_fill = now
+            else:
+                self.rate = max(self.max_rate / 50, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+            self.concurrency = max(1, min(self.limit(), self.in_flight) // 2)
+            self.successes = 0
+
+    def retried(self):
+        with self.cond:
+            self.stats['retries'] += 1
+
+    def get_stats(self):
+        with self.cond:
+            stats = dict(self.stats)
+            stats['rate'] = self.rate
+            stats['concurrency'] = self.limit()
+        return stats
+
+
+class RetryController(object):
+    """
+    Retry policy shared by every client created by get_client() and
+    get_resource().  botocore's own retries are turned off for these
+    clients.  Instead each (account, service) pair gets a ServiceThrottle
+    and failed attempts are retried with capped exponential backoff and
+    full jitter.  A throttle slot is held only while an attempt is on the
+    wire, never during backoff sleeps.
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS,
+            base_delay=0.5, max_delay=30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rates = dict(DEFAULT_API_RATES)
+        self.throttles = dict()
+        self.lock = threading.Lock()
+
+    def throttle(self, account, event_name):
+        key = (account, event_name.split('.')[1])
+        throttle = self.throttles.get(key)
+        if throttle is None:
+            with self.lock:
+                throttle = self.throttles.get(key)
+                if throttle is None:
+                    throttle = ServiceThrottle(
+                            self.rates.get(key[1], DEFAULT_API_RATE))
+                    self.throttles[key] = throttle
+        return throttle
+
+    def register(self, client, account=None):
+        """
+        Attach retry handlers to a botocore client.  'account' is any key
+        identifying the account the client's credentials belong to.
+        """
+        events = client.meta.events
+        events.register('before-send',
+                functools.partial(self.before_send, account))
+        events.register('response-received', self.response_received)
+        events.register('needs-retry',
+                functools.partial(self.needs_retry, account))
+
+    def before_send(self, account, event_name, request=None, **kwargs):
+        throttle = self.throttle(account, event_name)
+        throttle.acquire()
+        request.context['awsorgs_throttle'] = throttle
+
+    def response_received(self, context=None, response_dict=None,
+            exception=None, **kwargs):
+        throttle = context.pop('awsorgs_throttle', None)
+        if throttle is not None:
+            throttle.release(exception is None
+                    and response_dict['status_code'] < 300)
+
+    def needs_retry(self, account, event_name, response=None, attempts=1,
+            caught_exception=None, **kwargs):
+        """
+        Return seconds to sleep before the next attempt, or None to give up.
+        """
+        throttle = self.throttle(account, event_name)
+        if response is not None:
+            http_response, parsed = response
+            status = http_response.status_code
+            if status < 300:
+                return None
+            code = parsed.get('Error', dict()).get('Code')
+            throttled = code in THROTTLE_ERROR_CODES or status == 429
+            retryable = (throttled or code in TRANSIENT_ERROR_CODES
+                    or status >= 500)
+        else:
+            throttled = False
+            retryable = isinstance(caught_exception, (
+                    botocore.exceptions.ConnectionError,
+                    botocore.exceptions.HTTPClientError))
+        if throttled:
+            throttle.throttled()
+        if not retryable or attempts >= self.max_attempts:
+            return None
+        throttle.retried()
+        return random.uniform(0,
+                min(self.max_delay, self.base_delay * 2 ** attempts))
+
+    def get_stats(self):
+        """
+        Return counters summed per service over all accounts.  'rate' is
+        the lowest paced rate of any account, or None if never throttled.
+        """
+        with self.lock:
+            throttles = list(self.throttles.items())
+        services = dict()
+        for (account, service), throttle in throttles:
+            stats = throttle.get_stats()
+            total = services.setdefault(service, dict(calls=0, retries=0,
+                    throttles=0, errors=0, max_in_flight=0, wait_seconds=0.0,
+                    accounts=0, paced_accounts=0, rate=None))
+            for name in ('calls', 'retries', 'throttles', 'errors',
+                    'wait_seconds'):
+                total[name] += stats[name]
+            total['max_in_flight'] = max(total['max_in_flight'],
+                    stats['max_in_flight'])
+            total['accounts'] += 1
+            if stats['rate'] is not None:
+                total['paced_accounts'] += 1
+                total['rate'] = round(min(stats['rate'],
+                        total['rate'] or stats['rate']), 2)
+        for total in services.values():
+            total['wait_seconds'] = round(total['wait_seconds'], 3)
+        return dict(sorted(services.items()))
+
+
+retry_controller = RetryController()
+
+
+def set_retry_config(max_attempts=None, api_rates=None):
+    """
+    Set max attempts per api call and the requests per second allowed
+    for each service in an account once AWS has throttled it, e.g.
+    api_rates=dict(organizations=5, iam=10).  Rates apply to services
+    not yet called.
+    """
+    if max_attempts:
+        retry_controller.max_attempts = int(max_attempts)
+    if api_rates:
+        with retry_controller.lock:
+            retry_controller.rates.update(
+                    (k, float(v)) for k, v in api_rates.items())
+
+
+def retry_stats():
+    """
+    Return dict of per service counters summed over accounts: requests
+    sent, retries, throttling errors, failed requests, peak requests in
+    flight to one account, seconds spent waiting on rate and concurrency
+    limits, and the number of accounts called and of those being paced.
+    """
+    return retry_controller.get_stats()
+
+
+def log_run_stats(log):
+    """Log cache and api call counters collected during this run"""
+    log.debug('credential cache: %s' % credential_cache_stats())
+    for service, stats in retry_stats().items():
+        log.debug('api calls %s: %s' % (service, stats))
+
+
+def set_client_config(max_pool_connections=None):
+    """
+    Set connection pool size for clients created by get_client() and
+    get_resource().  The pool size defaults to the global max_threads cap.
+    Affects only clients created after the call.
+    """
+    with _client_cache_lock:
+        if max_pool_connections:
+            _client_config['max_pool_connections'] = int(max_pool_connections)
+
+
+def get_client_config():
+    """
+    Return botocore Config for new clients.  Retries are left to
+    retry_controller.
+    """
+    return Config(
+            max_pool_connections=(_client_config['max_pool_connections']
+                    or max_threads()),
+            retries=dict(total_max_attempts=1, mode='standard'))
+
+
+def get_session():
+    """
+    Return the process-wide boto3 Session.  One session means service
+    models are loaded only once per process.  Sessions are not thread
+    safe, so callers must hold _session_lock while using it.
+    """
+    if _session['session'] is None:
+        _session['session'] = boto3.session.Session()
+    return _session['session']
+
+
+def client_cache_key(service_name, credentials, region_name):
+    """
+    Clients are cached by (account_id, role_name, service, region), as set
+    in the credentials by get_assume_role_credentials().  None means the
+    default credentials.  The number of cached clients is therefore bound
+    by the accounts, roles and services used, however often credentials
+    are refreshed.
+    """
+    credentials = credentials or dict()
+    return (
+        credentials.get('account_id'),
+        credentials.get('role_name'),
+        service_name,
+        region_name or credentials.get('region_name'),
+    )
+
+
+def set_endpoint_urls(endpoint_urls):
+    """
+    Send api calls for some services to alternate endpoints, e.g. a local
+    S3 stand-in: set_endpoint_urls(dict(s3='http://localhost:9000')).
+    Affects only clients created after the call.
+    """
+    if endpoint_urls:
+        with _client_cache_lock:
+            _endpoint_urls.update(endpoint_urls)
+
+
+def client_args(service_name, credentials, region_name):
+    kwargs = dict((k, v) for k, v in (credentials or dict()).items()
+            if k.startswith('aws_') or k == 'region_name')
+    if region_name:
+        kwargs['region_name'] = region_name
+    if service_name in _endpoint_urls:
+        kwargs['endpoint_url'] = _endpoint_urls[service_name]
+    kwargs['config'] = get_client_config()
+    return kwargs
+
+
+def get_client(service_name, credentials=None, region_name=None):
+    """
+    Return a boto3 client for service_name.  'credentials' is a dict as
+    returned by get_assume_role_credentials() or None for the default
+    credentials.  Clients are reused by all threads, and replaced when
+    the account's credentials are refreshed.
+
+    iam_client = get_client('iam', credentials)
+    """
+    key = client_cache_key(service_name, credentials, region_name)
+    access_key = (credentials or dict()).get('aws_access_key_id')
+    cached_key, client = _client_cache.get(key, (None, None))
+    if client is None or cached_key != access_key:
+        with _session_lock:
+            client = get_session().client(service_name,
+                    **client_args(service_name, credentials, region_name))
+        retry_controller.register(client, key[0])
+        with _client_cache_lock:
+            cached_key, cached = _client_cache.get(key, (None, None))
+            if cached is not None and cached_key == access_key:
+                client = cached
+            else:
+                _client_cache[key] = (access_key, client)
+    return client
+
+
+def get_resource(service_name, credentials=None, region_name=None):
+    """
+    Return a boto3 resource for service_name.  Resources are not thread
+    safe, so they are reused only within the thread which created them.
+
+    iam_resource = get_resource('iam', credentials)
+    """
+    resources = getattr(_resource_state, 'resources', None)
+    if resources is None:
+        resources = _resource_state.resources = dict()
+    key = client_cache_key(service_name, credentials, region_name)
+    access_key = (credentials or dict()).get('aws_access_key_id')
+    cached_key, resource = resources.get(key, (None, None))
+    if resource is None or cached_key != access_key:
+        with _session_lock:
+            resource = get_session().resource(service_name,
+                    **client_args(service_name, credentials, region_name))
+        retry_controller.register(resource.meta.client, key[0])
+        resources[key] = (access_key, resource)
+    return resource
+
+
+def get_caller_identity():
+    """
+    Return the sts caller identity of the default session.  The identity
+    is queried once and cached for the life of the process.
+    """
+    with _credential_cache_lock:
+        if not _caller_identity:
+            response = get_client('sts').get_caller_identity()
+            _caller_identity.update(
+                    Account=response['Account'],
+                    Arn=response['Arn'],
+                    UserId=response['UserId'])
+        return dict(_caller_identity)
+
+
+def credential_cache_stats():
+    """
+    Return dict of hit/miss counters for the assume_role credential cache.
+    """
+    with _credential_cache_lock:
+        stats = dict(_credential_cache_stats)
+        stats['cached'] = len(_credential_cache)
+    return stats
+
+
+def clear_credential_cache():
+    """Discard all cached assume_role credentials and counters."""
+    with _credential_cache_lock:
+        _credential_cache.clear()
+        _credential_locks.clear()
+        _caller_identity.clear()
+        _credential_cache_stats.update(hits=0, misses=0, disk_hits=0)
+
+
+def ensure_cache_dir(cache_dir):
+    """
+    Create cache_dir if needed and restrict it to owner-only access.
+    Return the expanded path.
+    """
+    cache_dir = os.path.expanduser(cache_dir)
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    os.chmod(cache_dir, 0o700)
+    return cache_dir
+
+
+def read_cache_file(path):
+    """
+    Return the json contents of cache file 'path' as a dict.  A missing or
+    unreadable cache file is treated as empty.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return dict()
+    if not isinstance(data, dict):
+        return dict()
+    return data
+
+
+def write_cache_file(path, data):
+    """
+    Atomically replace cache file 'path' with json encoded 'data'.  The
+    file is created with owner-only permissions.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path),
+            prefix='.' + os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def locked_cache_file(path):
+    """
+    Context manager for read-modify-write of a json cache file shared by
+    concurrent processes.  Holds an exclusive lock on 'path.lock' while
+    active and yields the current contents as a dict.  Changes made to the
+    dict are written back with an atomic replace on exit.
+
+    with locked_cache_file(path) as data:
+        data['key'] = value
+    """
+    ensure_cache_dir(os.path.dirname(path))
+    lock_fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        data = read_cache_file(path)
+        yield data
+        write_cache_file(path, data)
+    finally:
+        if fcntl is not None:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        os.close(lock_fd)
+
+
+def enable_credential_cache_file(cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Persist assume_role credentials under cache_dir so they can be reused
+    by later cli invocations until they expire.
+    """
+    cache_dir = ensure_cache_dir(cache_dir)
+    _credential_cache_file['path'] = os.path.join(cache_dir, CREDENTIAL_CACHE_FILE)
+
+
+def credential_file_key(account_id, role_name):
+    """
+    Key for credentials in the on-disk cache.  Includes the caller
+    identity so different base credentials never share entries.
+    """
+    return ':'.join([get_caller_identity()['Arn'], account_id, role_name])
+
+
+def load_cached_credentials(account_id, role_name):
+    """
+    Return unexpired credentials for (account_id, role_name) from the
+    on-disk cache, or None.
+    """
+    path = _credential_cache_file['path']
+    if path is None:
+        return None
+    entry = read_cache_file(path).get(credential_file_key(account_id, role_name))
+    if not entry:
+        return None
+    credentials = dict(entry)
+    credentials['Expiration'] = datetime.datetime.fromtimestamp(
+            entry['Expiration'], datetime.timezone.utc)
+    if credentials_expired(credentials['Expiration']):
+        return None
+    return credentials
+
+
+def save_cached_credentials(account_id, role_name, credentials):
+    """
+    Store credentials for (account_id, role_name) in the on-disk cache and
+    evict any entries which have expired.
+    """
+    path = _credential_cache_file['path']
+    if path is None:
+        return
+    now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+    with locked_cache_file(path) as data:
+        for key in [k for k, v in data.items() if v.get('Expiration', 0) <= now]:
+            del data[key]
+        data[credential_file_key(account_id, role_name)] = dict(
+                AccessKeyId=credentials['AccessKeyId'],
+                SecretAccessKey=credentials['SecretAccessKey'],
+                SessionToken=credentials['SessionToken'],
+                Expiration=credentials['Expiration'].timestamp())
+
+
+def credentials_expired(expiration, margin=CREDENTIAL_REFRESH_MARGIN):
+    """
+    Test if credentials with 'Expiration' timestamp fall within 'margin'
+    of expiring.  Credentials without an expiration never expire.
+    """
+    if expiration is None:
+        return False
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return expiration - margin <= now
+
+
+def assume_role(account_id, role_name):
+    """
+    Call sts assume_role for role_name in account_id.  Return the
+    'Credentials' dict from the response, or RuntimeError if access
+    to the role is denied.
     """
     role_arn = "arn:aws:iam::%s:role/%s" % (account_id, role_name)
     role_session_name = account_id + '-' + role_name.split('/')[-1]
-    sts_client = boto3.client('sts')
+    sts_client = get_client('sts')
+    try:
+        return sts_client.assume_role(
+                RoleArn=role_arn,
+                RoleSessionName=role_session_name
+                )['Credentials']
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'AccessDenied':
+            errmsg = ('cannot assume role %s in account %s' %
+                    (role_name, account_id))
+            return RuntimeError(errmsg)
+        raise
+
+
+def get_assume_role_credentials(account_id, role_name, region_name=None):
+    """
+    Get temporary sts assume_role credentials for account.
 
-    if account_id == sts_client.get_caller_identity()['Account']:
+    Credentials are cached process-wide by (account_id, role_name) and
+    reused until they come within CREDENTIAL_REFRESH_MARGIN of their
+    'Expiration'.  Concurrent callers for the same key wait on a per-key
+    lock so that only one of them calls sts.  Failures are not cached.
+    When enable_credential_cache_file() has been called, credentials are
+    also shared with other processes through the on-disk cache.
+    """
+    if account_id == get_caller_identity()['Account']:
         return dict(
                 aws_access_key_id=None,
                 aws_secret_access_key=None,
                 aws_session_token=None,
                 region_name=None)
-    else:
-        try:
-            credentials = sts_client.assume_role(
-                    RoleArn=role_arn,
-                    RoleSessionName=role_session_name
-                    )['Credentials']
-        except ClientError as e:
-            if e.response['Error']['Code'] == 'AccessDenied':
-                errmsg = ('cannot assume role %s in account %s' %
-                        (role_name, account_id))
-                return RuntimeError(errmsg)
-        return dict(
-                aws_access_key_id=credentials['AccessKeyId'],
-                aws_secret_access_key=credentials['SecretAccessKey'],
-                aws_session_token=credentials['SessionToken'],
-                region_name=region_name)
+
+    key = (account_id, role_name)
+    with _credential_cache_lock:
+        key_lock = _credential_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        with _credential_cache_lock:
+            credentials = _credential_cache.get(key)
+            if credentials and not credentials_expired(credentials['Expiration']):
+                _credential_cache_stats['hits'] += 1
+            else:
+                credentials = None
+                _credential_cache_stats['misses'] += 1
+        if credentials is None:
+            credentials = load_cached_credentials(account_id, role_name)
+            if credentials is not None:
+                with _credential_cache_lock:
+                    _credential_cache_stats['disk_hits'] += 1
+            else:
+                credentials = assume_role(account_id, role_name)
+                if isinstance(credentials, RuntimeError):
+                    return credentials
+                save_cached_credentials(account_id, role_name, credentials)
+            with _credential_cache_lock:
+                _credential_cache[key] = credentials
+    return dict(
+            aws_access_key_id=credentials['AccessKeyId'],
+            aws_secret_access_key=credentials['SecretAccessKey'],
+            aws_session_token=credentials['SessionToken'],
+            region_name=region_name,
+            account_id=account_id,
+            role_name=role_name)
 
 
 def scan_deployed_accounts(log, org_client):
@@ -228,46 +1225,102 @@ def scan_deployed_accounts(log, org_client):
         accounts = org_client.list_accounts(NextToken=accounts['NextToken'])
         deployed_accounts += accounts['Accounts']
     # only return accounts that have an 'Name' key
-    return [d for d in deployed_accounts if 'Name' in d ]
+    return LookupTable(d for d in deployed_accounts if 'Name' in d)
 
 
-def scan_created_accounts(log, org_client):
+def scan_created_accounts(log, org_client, states=('SUCCEEDED',)):
     """
-    Query AWS Organization for accounts with creation status of 'SUCCEEDED'.
+    Query AWS Organization for accounts with creation status in 'states'.
     Returns a list of dictionary.
     """
     log.debug('running')
-    status = org_client.list_create_account_status(States=['SUCCEEDED'])
+    status = org_client.list_create_account_status(States=list(states))
     created_accounts = status['CreateAccountStatuses']
     while 'NextToken' in status and status['NextToken']:
         status = org_client.list_create_account_status(
-                States=['SUCCEEDED'],
+                States=list(states),
                 NextToken=status['NextToken'])
         created_accounts += status['CreateAccountStatuses']
-    return created_accounts
+    return LookupTable(created_accounts)
         
 
+def enable_alias_store(cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_ALIAS_STORE_TTL):
+    """
+    Keep account aliases under cache_dir and trust them for 'ttl' hours
+    before querying the account again.  A ttl of 0 disables the store.
+    """
+    if not ttl:
+        _alias_store_file['path'] = None
+        return
+    cache_dir = ensure_cache_dir(cache_dir)
+    _alias_store_file['path'] = os.path.join(cache_dir, ALIAS_STORE_FILE)
+    _alias_store_file['ttl'] = float(ttl)
+
+
+def load_alias_store():
+    """
+    Return dict of {Id:Alias} for accounts whose alias in the store is
+    younger than its ttl.  Accounts with no alias map to ''.
+    """
+    path = _alias_store_file['path']
+    if path is None:
+        return dict()
+    oldest = time.time() - _alias_store_file['ttl'] * 3600
+    return dict((account_id, entry['Alias'])
+            for account_id, entry in read_cache_file(path).items()
+            if entry.get('Timestamp', 0) > oldest)
+
+
+def update_alias_store(aliases):
+    """
+    Record current aliases, a dict of {Id:Alias}, in the alias store.
+    Use '' for an account known to have no alias.
+    """
+    path = _alias_store_file['path']
+    if path is None or not aliases:
+        return
+    now = time.time()
+    with locked_cache_file(path) as data:
+        for account_id, alias in aliases.items():
+            data[account_id] = dict(Alias=alias, Timestamp=now)
+
+
+def query_account_alias(account, log, role):
+    """
+    Assume role in account and return its alias, '' if it has none, or
+    None if the account can not be queried.
+    """
+    credentials = get_assume_role_credentials(account['Id'], role)
+    if isinstance(credentials, RuntimeError):
+        log.error(credentials)
+        return None
+    iam_client = get_client('iam', credentials)
+    response = iam_client.list_account_aliases()['AccountAliases']
+    if response:
+        return response[0]
+    return ''
+
+
 def get_account_aliases(log, deployed_accounts, role):
     """
-    Return dict of {Id:Alias} for all deployed accounts.
+    Return dict of {Id:Alias} for all active accounts.  Aliases are read
+    from the alias store.  Only active accounts missing from the store or
+    whose entry has expired are queried, and the store is updated.
 
     role::  name of IAM role to assume to query all deployed accounts.
     """
-    # worker function for threading
-    def get_account_alias(account, log, role, aliases):
-        if account['Status'] == 'ACTIVE':
-            credentials = get_assume_role_credentials(account['Id'], role)
-            if isinstance(credentials, RuntimeError):
-                log.error(credentials)
-                return
-            iam_client = boto3.client('iam', **credentials)
-            response = iam_client.list_account_aliases()['AccountAliases']
-            if response:
-                aliases[account['Id']] = response[0]
-    # call workers
-    aliases = {}
-    queue_threads(log, deployed_accounts, get_account_alias,
-            f_args=(log, role, aliases), thread_count=10)
+    active = [a for a in deployed_accounts if a['Status'] == 'ACTIVE']
+    cached = load_alias_store()
+    stale = [a for a in active if a['Id'] not in cached]
+    results = run_tasks(log, stale, query_account_alias,
+            f_args=(log, role), limit=10, log_errors=True)
+    queried = dict((account['Id'], alias)
+            for account, alias in zip(stale, results) if alias is not None)
+    update_alias_store(queried)
+    log.debug('aliases cached: %s; queried: %s' % (len(cached), len(queried)))
+    aliases = dict((a['Id'], cached.get(a['Id'], queried.get(a['Id'])))
+            for a in active)
+    aliases = dict((k, v) for k, v in aliases.items() if v)
     log.debug(yamlfmt(aliases))
     return aliases
 
@@ -291,6 +1344,33 @@ def string_differ(string1, string2):
     return ''.join(list(diff))
 
 
+def canonical_policy(policy_doc):
+    """
+    Return a canonical json string for an IAM or SCP policy document given
+    as a dict or json string.  Key order, whitespace, statement order, the
+    order of actions and resources, and a single value vs a one item list
+    do not change the result.  Documents with the same effect compare equal.
+    """
+    if isinstance(policy_doc, str):
+        policy_doc = json.loads(policy_doc)
+    policy_doc = dict(policy_doc)
+    statements = policy_doc.get('Statement', [])
+    if isinstance(statements, dict):
+        statements = [statements]
+    canonical_statements = []
+    for statement in statements:
+        statement = dict(statement)
+        for key in POLICY_LIST_ELEMENTS:
+            if isinstance(statement.get(key), str):
+                statement[key] = [statement[key]]
+            if isinstance(statement.get(key), list):
+                statement[key] = sorted(set(statement[key]))
+        canonical_statements.append(statement)
+    policy_doc['Statement'] = sorted(canonical_statements,
+            key=lambda s: json.dumps(s, sort_keys=True))
+    return json.dumps(policy_doc, sort_keys=True, separators=(',', ':'))
+
+
 def yamlfmt(dict_obj):
     """Convert a dictionary object into a yaml formated string"""
     return yaml.dump(dict_obj, default_flow_style=False)
@@ -306,36 +1386,6 @@ def overbar(string):
     return "%s\n%s" % ('_' * len(string), string)
 
 
-def report_maker(log, accounts, role, query_func, report_header=None, **qf_args):
-    """
-    Generate a report by running a arbitrary query function in each account.
-    The query function must return a list of strings.
-    """
-    # Thread worker function to gather report for each account
-    def make_account_report(account, report, role):
-        messages = []
-        messages.append(overbar("Account:    %s" % account['Name']))
-        credentials = get_assume_role_credentials(account['Id'], role)
-        if isinstance(credentials, RuntimeError):
-            messages.append(credentials)
-        else:
-            messages += query_func(credentials, **qf_args)
-        report[account['Name']] = messages
-    # gather report data from accounts
-    report = {}
-    queue_threads(
-            log, accounts,
-            make_account_report,
-            f_args=(report, role),
-            thread_count=10)
-    # process the reports
-    if report_header:
-        log.info("\n\n%s" % overbar(report_header))
-    for account, messages in sorted(report.items()):
-        for msg in messages:
-            log.info(msg)
-
-
 def get_iam_objects(iam_client_function, object_key, f_args=dict()):
     """
     users = get_iam_objects(iam_client.list_users, 'Users')
@@ -347,7 +1397,178 @@ def get_iam_objects(iam_client_function, object_key, f_args=dict()):
         while response['IsTruncated']:
             response = iam_client_function(Marker=response['Marker'],**f_args)
             iam_objects += response[object_key]
-    return iam_objects
+    return LookupTable(iam_objects)
 
     
 
+
+def get_account_authorization_details(iam_client,
+            filters=('User', 'Group', 'Role', 'LocalManagedPolicy')):
+    """
+    Query iam get_account_authorization_details for all entity types in
+    'filters' in a single paginated pass.  Returns a dict of LookupTable
+    keyed by response list name:  UserDetailList, GroupDetailList,
+    RoleDetailList and Policies.
+    """
+    details = dict(
+            UserDetailList=LookupTable(),
+            GroupDetailList=LookupTable(),
+            RoleDetailList=LookupTable(),
+            Policies=LookupTable())
+    f_args = dict(Filter=list(filters), MaxItems=1000)
+    response = iam_client.get_account_authorization_details(**f_args)
+    while True:
+        for key in details:
+            details[key] += response.get(key, [])
+        if not response.get('IsTruncated'):
+            break
+        response = iam_client.get_account_authorization_details(
+                Marker=response['Marker'], **f_args)
+    return details
+
+
+def scan_account_authorization(iam_client):
+    """
+    Return an in-memory snapshot of IAM state in an account as a dict of
+    LookupTable:  users, groups, roles and (local managed) policies.
+
+    Built from a single paginated get_account_authorization_details call.
+    Entries carry inline and attached policies, group membership and tags.
+    Each policy also gets a 'Document' key holding its default version
+    document.  Role Description and MaxSessionDuration are not part of
+    authorization details, so these are merged in from list_roles.
+    """
+    details = get_account_authorization_details(iam_client)
+    for policy in details['Policies']:
+        policy['Document'] = None
+        for version in policy.get('PolicyVersionList', []):
+            if version['IsDefaultVersion']:
+                policy['Document'] = version['Document']
+    roles = get_iam_objects(iam_client.list_roles, 'Roles', dict(MaxItems=1000))
+    for role in details['RoleDetailList']:
+        listed = lookup(roles, 'RoleName', role['RoleName'])
+        if listed:
+            role['Description'] = listed.get('Description')
+            role['MaxSessionDuration'] = listed.get('MaxSessionDuration')
+    return dict(
+            users=details['UserDetailList'],
+            groups=details['GroupDetailList'],
+            roles=details['RoleDetailList'],
+            policies=details['Policies'])
+
+
+def attached_policy_arns(iam_entity):
+    """
+    Return dict {PolicyName: PolicyArn} of managed policies attached to a
+    user, group or role entry from an account snapshot.
+    """
+    return dict((p['PolicyName'], p['PolicyArn'])
+            for p in iam_entity.get('AttachedManagedPolicies', []))
+
+
+def enable_policy_catalog_file(cache_dir=DEFAULT_CACHE_DIR,
+            ttl=DEFAULT_POLICY_CATALOG_TTL):
+    """
+    Persist the AWS managed policy catalog under cache_dir and reuse it
+    across invocations for 'ttl' hours.  A ttl of 0 disables the file.
+    """
+    if not ttl:
+        _aws_policy_catalog_file['path'] = None
+        return
+    cache_dir = ensure_cache_dir(cache_dir)
+    _aws_policy_catalog_file['path'] = os.path.join(cache_dir, POLICY_CATALOG_FILE)
+    _aws_policy_catalog_file['ttl'] = float(ttl)
+
+
+def load_policy_catalog_file():
+    """
+    Return the AWS managed policy catalog from the on-disk cache if it
+    exists and is younger than its ttl, or None.
+    """
+    path = _aws_policy_catalog_file['path']
+    if path is None:
+        return None
+    catalog = read_cache_file(path)
+    if not catalog.get('Policies'):
+        return None
+    age = time.time() - catalog.get('Timestamp', 0)
+    if age > _aws_policy_catalog_file['ttl'] * 3600:
+        return None
+    return catalog
+
+
+def save_policy_catalog_file(catalog):
+    path = _aws_policy_catalog_file['path']
+    if path is None:
+        return
+    with locked_cache_file(path) as data:
+        data.clear()
+        data.update(catalog)
+
+
+def get_aws_policy_catalog(iam_client):
+    """
+    Return the catalog of AWS managed IAM policies as a dict:
+
+        Timestamp:  when the catalog was fetched (epoch seconds)
+        Policies:   {PolicyName: Arn}
+        Versions:   {PolicyName: DefaultVersionId}
+        Documents:  {PolicyName: default version document}
+
+    Policies and Versions come from list_policies(Scope='AWS'), which
+    returns every AWS managed policy whether or not it is attached in the
+    calling account.  Documents are filled in on demand by
+    get_aws_policy_document().  AWS managed policies are the same in every
+    account, so the catalog is fetched once, held in memory for the rest
+    of the process, and shared with later invocations through the on-disk
+    cache (see enable_policy_catalog_file).
+    """
+    with _aws_policy_catalog_lock:
+        catalog = _aws_policy_catalog
+        if not catalog.get('Policies'):
+            cached = load_policy_catalog_file()
+            catalog.clear()
+            if cached and 'Versions' in cached:
+                catalog.update(cached)
+                catalog.setdefault('Documents', dict())
+            else:
+                policies = get_iam_objects(iam_client.list_policies, 'Policies',
+                        dict(Scope='AWS', MaxItems=1000))
+                catalog['Timestamp'] = time.time()
+                catalog['Policies'] = dict(
+                        (p['PolicyName'], p['Arn']) for p in policies)
+                catalog['Versions'] = dict(
+                        (p['PolicyName'], p['DefaultVersionId']) for p in policies)
+                catalog['Documents'] = dict()
+                save_policy_catalog_file(catalog)
+        return catalog
+
+
+def get_aws_policy_document(iam_client, policy_name):
+    """
+    Return the default version document of an AWS managed policy, or None
+    if there is no such policy.  Documents are fetched with
+    get_policy_version the first time they are needed and kept in the
+    policy catalog.
+    """
+    catalog = get_aws_policy_catalog(iam_client)
+    with _aws_policy_catalog_lock:
+        document = catalog['Documents'].get(policy_name)
+    if document is not None or policy_name not in catalog['Policies']:
+        return document
+    document = iam_client.get_policy_version(
+            PolicyArn=catalog['Policies'][policy_name],
+            VersionId=catalog['Versions'][policy_name],
+            )['PolicyVersion']['Document']
+    with _aws_policy_catalog_lock:
+        catalog['Documents'][policy_name] = document
+        save_policy_catalog_file(catalog)
+    return document
+
+
+def get_aws_managed_policies(iam_client):
+    """
+    Return dict {PolicyName: Arn} of all AWS managed IAM policies from the
+    shared AWS managed policy catalog.
+    """
+    return get_aws_policy_catalog(iam_client)['Policies']
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""Micro-benchmark: awsorgs.utils.lookup() over a list vs a LookupTable.
+
+Simulates the per-account lookup loops in manage_account_moves and
+display_provisioned_accounts against an Organization of 10,000 accounts.
+
+Usage:
+  python benchmarks/bench_lookup.py [ACCOUNTS] [LOOKUPS]
+"""
+
+import sys
+import timeit
+
+from awsorgs.utils import lookup, LookupTable
+
+
+def make_accounts(count):
+    return [dict(
+            Name='account-%05d' % i,
+            Id='%012d' % i,
+            Email='account-%05d@example.com' % i,
+            Status='ACTIVE') for i in range(count)]
+
+
+def run(accounts, names):
+    for name in names:
+        lookup(accounts, 'Name', name, 'Id')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    accounts = make_accounts(count)
+    names = [a['Name'] for a in accounts[::max(1, count // lookups)]][:lookups]
+
+    plain = min(timeit.repeat(lambda: run(accounts, names), number=1, repeat=3))
+    table = LookupTable(accounts)
+    indexed = min(timeit.repeat(lambda: run(table, names), number=1, repeat=3))
+    # include the cost of building the index once
+    cold = timeit.timeit(lambda: run(LookupTable(accounts), names), number=1)
+
+    print('accounts: %d, lookups: %d' % (count, lookups))
+    print('list:              %8.4fs' % plain)
+    print('LookupTable (cold):%8.4fs' % cold)
+    print('LookupTable (warm):%8.4fs' % indexed)
+    print('speedup (cold):    %8.1fx' % (plain / cold))
+
+
+if __name__ == '__main__':
+    main()
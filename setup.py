@@ -27,7 +27,7 @@ setup(
         'Programming Language :: Python :: 3.7',
     ],
     keywords='aws organizations',
-    packages=find_packages(exclude=['scratch', 'notes']),
+    packages=find_packages(exclude=['scratch', 'notes', 'tests']),
     install_requires=[
         'boto3', 
         'docopt', 
@@ -35,6 +35,9 @@ setup(
         'passwordgenerator',
         'cerberus',
     ],
+    extras_require={
+        'test': ['pytest', 'moto'],
+    },
     package_data={
         'awsorgs': [
             'data/*',
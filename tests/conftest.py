@@ -0,0 +1,39 @@
+"""Shared fixtures for awsorgs tests"""
+
+import logging
+
+import pytest
+from moto import mock_aws
+
+from awsorgs import utils
+
+
+@pytest.fixture
+def log():
+    return logging.getLogger('awsorgs.tests')
+
+
+def reset_clients():
+    # drop clients cached by get_client() and get_resource()
+    with utils._client_cache_lock:
+        utils._client_cache.clear()
+    utils._resource_state.resources = dict()
+    utils._session['session'] = None
+    with utils.retry_controller.lock:
+        utils.retry_controller.throttles.clear()
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    """Run the test against moto with fake credentials and fresh clients"""
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.delenv('AWS_SESSION_TOKEN', raising=False)
+    monkeypatch.delenv('AWS_PROFILE', raising=False)
+    reset_clients()
+    try:
+        with mock_aws():
+            yield
+    finally:
+        reset_clients()
@@ -0,0 +1,79 @@
+"""Tests for publishing the deployed accounts list to s3 (awsorgs.accounts)"""
+
+import gzip
+import json
+
+import boto3
+import pytest
+import yaml
+
+from awsorgs.accounts import s3_object_for_accounts, S3_HASH_METADATA, s3_content_hash
+
+
+BUCKET = 'test-accounts-bucket'
+KEY = 'deployed_accounts.yaml'
+GZIP_KEY = 'deployed_accounts.json.gz'
+ACCOUNTS = [
+    dict(Name='master', Id='111111111111', Email='master@example.com', Status='ACTIVE'),
+    dict(Name='dev', Id='222222222222', Email='dev@example.com', Status='ACTIVE'),
+]
+
+
+@pytest.fixture
+def s3(aws):
+    return boto3.client('s3', region_name='us-east-1')
+
+
+def put_count(s3, key):
+    return len([v for v in s3.list_object_versions(Bucket=BUCKET).get('Versions', [])
+            if v['Key'] == key])
+
+
+def test_missing_bucket_is_created(log, s3):
+    assert s3_object_for_accounts(log, BUCKET, KEY, ACCOUNTS)
+    assert BUCKET in [b['Name'] for b in s3.list_buckets()['Buckets']]
+    body = s3.get_object(Bucket=BUCKET, Key=KEY)['Body'].read()
+    assert yaml.safe_load(body) == ACCOUNTS
+    head = s3.head_object(Bucket=BUCKET, Key=KEY)
+    assert head['Metadata'][S3_HASH_METADATA] == s3_content_hash(body)
+
+
+def test_gzip_copy(log, s3):
+    s3_object_for_accounts(log, BUCKET, KEY, ACCOUNTS)
+    response = s3.get_object(Bucket=BUCKET, Key=GZIP_KEY)
+    assert response['ContentEncoding'] == 'gzip'
+    assert response['ContentType'] == 'application/json'
+    assert json.loads(gzip.decompress(response['Body'].read())) == ACCOUNTS
+
+
+def test_unchanged_content_is_not_written(log, s3):
+    s3.create_bucket(Bucket=BUCKET)
+    s3.put_bucket_versioning(Bucket=BUCKET,
+            VersioningConfiguration=dict(Status='Enabled'))
+    assert s3_object_for_accounts(log, BUCKET, KEY, ACCOUNTS)
+    assert not s3_object_for_accounts(log, BUCKET, KEY, list(ACCOUNTS))
+    assert put_count(s3, KEY) == 1
+    assert put_count(s3, GZIP_KEY) == 1
+
+
+def test_changed_content_is_written(log, s3):
+    s3.create_bucket(Bucket=BUCKET)
+    s3.put_bucket_versioning(Bucket=BUCKET,
+            VersioningConfiguration=dict(Status='Enabled'))
+    s3_object_for_accounts(log, BUCKET, KEY, ACCOUNTS)
+    changed = ACCOUNTS + [dict(Name='prod', Id='333333333333',
+            Email='prod@example.com', Status='ACTIVE')]
+    assert s3_object_for_accounts(log, BUCKET, KEY, changed)
+    assert put_count(s3, KEY) == 2
+    assert put_count(s3, GZIP_KEY) == 2
+    body = s3.get_object(Bucket=BUCKET, Key=KEY)['Body'].read()
+    assert yaml.safe_load(body) == changed
+
+
+def test_plain_upload_compared_by_etag(log, s3):
+    # an object written without the hash metadata, e.g. by an older release
+    s3.create_bucket(Bucket=BUCKET)
+    s3_object_for_accounts(log, BUCKET, KEY, ACCOUNTS)
+    body = s3.get_object(Bucket=BUCKET, Key=KEY)['Body'].read()
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=body)
+    assert not s3_object_for_accounts(log, BUCKET, KEY, ACCOUNTS)
@@ -0,0 +1,66 @@
+"""Tests for auth account group reconciliation (awsorgs.auth)"""
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from awsorgs import auth, utils
+from awsorgs.utils import LookupTable
+
+
+AUTH_ACCOUNT = '123456789012'
+ARGS = {'--exec': True, '--auth-account-id': AUTH_ACCOUNT,
+        '--org-access-role': 'OrgRole'}
+
+
+def custom_policy(name):
+    return dict(PolicyName=name, Description=name,
+            Statement=[dict(Effect='Allow', Action='s3:List*', Resource='*')])
+
+
+@pytest.fixture
+def iam(aws, monkeypatch):
+    monkeypatch.setattr(utils, '_aws_policy_catalog', dict())
+    with mock_aws(config={'iam': {'load_aws_managed_policies': True}}):
+        client = boto3.client('iam')
+        client.create_group(GroupName='readers', Path='/awsauth/')
+        client.attach_group_policy(GroupName='readers',
+                PolicyArn='arn:aws:iam::aws:policy/ReadOnlyAccess')
+        yield client
+
+
+def test_only_needed_policies_are_resolved(log, iam, monkeypatch):
+    resolved = dict(custom=[], arn=[])
+    manage_custom_policy = auth.manage_custom_policy
+    get_policy_arn = auth.get_policy_arn
+
+    def custom(iam_client, account_name, policy_name, *args):
+        resolved['custom'].append(policy_name)
+        return manage_custom_policy(iam_client, account_name, policy_name, *args)
+
+    def arn(iam_client, policy_name, snapshot):
+        resolved['arn'].append(policy_name)
+        return get_policy_arn(iam_client, policy_name, snapshot)
+
+    monkeypatch.setattr(auth, 'manage_custom_policy', custom)
+    monkeypatch.setattr(auth, 'get_policy_arn', arn)
+
+    snapshot = utils.scan_account_authorization(iam)
+    deployed = dict(auth=snapshot, groups=snapshot['groups'],
+            accounts=LookupTable([dict(Name='auth', Id=AUTH_ACCOUNT,
+                    Status='ACTIVE')]))
+    auth_spec = dict(auth_account_id=AUTH_ACCOUNT, default_path='awsauth',
+            groups=LookupTable([dict(Name='readers', Policies=[
+                    'ReadOnlyAccess', 'ViewOnlyAccess', 'listing'])]),
+            custom_policies=LookupTable([custom_policy('listing'),
+                    custom_policy('unused')]))
+    auth.manage_group_policies(None, ARGS, log, deployed, auth_spec)
+
+    # already attached managed policies are not looked up, and custom
+    # policies no group names are not created
+    assert resolved == dict(custom=['listing'], arn=['ViewOnlyAccess'])
+    attached = iam.list_attached_group_policies(GroupName='readers')
+    assert sorted(p['PolicyName'] for p in attached['AttachedPolicies']) == [
+            'ReadOnlyAccess', 'ViewOnlyAccess', 'listing']
+    policies = iam.list_policies(Scope='Local')['Policies']
+    assert [p['PolicyName'] for p in policies] == ['listing']
@@ -0,0 +1,44 @@
+"""Tests for the shared boto3 client cache (awsorgs.utils)"""
+
+from awsorgs import utils
+
+
+def role_credentials(access_key, account_id='222222222222', role_name='OrgRole'):
+    return dict(aws_access_key_id=access_key, aws_secret_access_key='secret',
+            aws_session_token='token', region_name=None,
+            account_id=account_id, role_name=role_name)
+
+
+def test_default_clients_are_shared(aws):
+    client = utils.get_client('iam')
+    assert utils.get_client('iam') is client
+    assert utils.get_client('iam', region_name='us-west-2') is not client
+    assert utils.get_client('sts') is not client
+
+
+def test_clients_keyed_by_account_and_role(aws):
+    client = utils.get_client('iam', role_credentials('AKIA1'))
+    assert utils.get_client('iam', role_credentials('AKIA1')) is client
+    other_account = role_credentials('AKIA2', account_id='333333333333')
+    assert utils.get_client('iam', other_account) is not client
+    other_role = role_credentials('AKIA3', role_name='OtherRole')
+    assert utils.get_client('iam', other_role) is not client
+    assert len(utils._client_cache) == 3
+
+
+def test_refreshed_credentials_replace_the_client(aws):
+    client = utils.get_client('iam', role_credentials('AKIA1'))
+    refreshed = utils.get_client('iam', role_credentials('AKIA2'))
+    assert refreshed is not client
+    assert utils.get_client('iam', role_credentials('AKIA2')) is refreshed
+    assert len(utils._client_cache) == 1
+    credentials = refreshed._request_signer._credentials
+    assert credentials.access_key == 'AKIA2'
+
+
+def test_resources_follow_the_same_keys(aws):
+    resource = utils.get_resource('iam', role_credentials('AKIA1'))
+    assert utils.get_resource('iam', role_credentials('AKIA1')) is resource
+    refreshed = utils.get_resource('iam', role_credentials('AKIA2'))
+    assert refreshed is not resource
+    assert len(utils._resource_state.resources) == 1
@@ -0,0 +1,122 @@
+"""Tests for pipelined account creation (awsorgs.accounts)"""
+
+import logging
+
+import pytest
+
+from awsorgs import accounts
+from awsorgs.accounts import (create_accounts, load_pending_accounts,
+        save_pending_account, pending_accounts_path)
+from awsorgs.utils import LookupTable, read_cache_file
+
+
+MASTER = '111111111111'
+ACCOUNT_SPEC = dict(default_domain='example.com',
+        accounts=[dict(Name='master'), dict(Name='new')])
+DEPLOYED = LookupTable([dict(Name='master', Id=MASTER, Status='ACTIVE')])
+
+
+class FakeOrg(object):
+    """Organizations client with scripted account creation states"""
+
+    def __init__(self, final_state='IN_PROGRESS'):
+        self.final_state = final_state
+        self.requests = dict()
+        self.created = []
+
+    def add_request(self, name, state):
+        request_id = 'car-%d' % (len(self.requests) + 1)
+        self.requests[request_id] = dict(Id=request_id, AccountName=name,
+                State=state)
+        return request_id
+
+    def create_account(self, AccountName, Email):
+        self.created.append(AccountName)
+        request_id = self.add_request(AccountName, 'IN_PROGRESS')
+        return dict(CreateAccountStatus=dict(self.requests[request_id]))
+
+    def describe_create_account_status(self, CreateAccountRequestId):
+        status = self.requests[CreateAccountRequestId]
+        if status['State'] == 'IN_PROGRESS':
+            status['State'] = self.final_state
+            if self.final_state == 'FAILED':
+                status['FailureReason'] = 'EMAIL_ALREADY_EXISTS'
+        return dict(CreateAccountStatus=dict(status))
+
+    def list_create_account_status(self, States):
+        return dict(CreateAccountStatuses=[dict(s)
+                for s in self.requests.values() if s['State'] in States])
+
+
+@pytest.fixture
+def args(tmp_path, monkeypatch):
+    monkeypatch.setattr(accounts.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(accounts, 'ACCOUNT_CREATION_TIMEOUT', 0)
+    return {'--cache-dir': str(tmp_path), '--master-account-id': MASTER,
+            '--exec': True}
+
+
+def messages(caplog):
+    return [r.getMessage() for r in caplog.records]
+
+
+def test_pending_file_round_trip(args):
+    assert load_pending_accounts(args) == dict()
+    save_pending_account(args, 'new', 'car-1')
+    save_pending_account(args, 'other', 'car-2')
+    assert load_pending_accounts(args) == dict(new='car-1', other='car-2')
+    save_pending_account(args, 'new')
+    save_pending_account(args, 'other')
+    assert load_pending_accounts(args) == dict()
+    assert read_cache_file(pending_accounts_path(args)) == dict()
+
+
+def test_timeout_keeps_request_pending(log, args, caplog):
+    org = FakeOrg('IN_PROGRESS')
+    create_accounts(org, args, log, DEPLOYED, ACCOUNT_SPEC)
+    assert org.created == ['new']
+    assert load_pending_accounts(args) == dict(new='car-1')
+    assert "Account creation still pending for new. Moving on!" in messages(caplog)
+    # the next run waits on the same request rather than creating again
+    create_accounts(org, args, log, DEPLOYED, ACCOUNT_SPEC)
+    assert org.created == ['new']
+    assert load_pending_accounts(args) == dict(new='car-1')
+
+
+def test_failed_request_is_forgotten(log, args, caplog):
+    org = FakeOrg('FAILED')
+    create_accounts(org, args, log, DEPLOYED, ACCOUNT_SPEC)
+    assert org.created == ['new']
+    assert load_pending_accounts(args) == dict()
+    assert ("Account creation failed for 'new': EMAIL_ALREADY_EXISTS"
+            in messages(caplog))
+
+
+def test_succeeded_request_is_forgotten(log, args, caplog):
+    caplog.set_level(logging.INFO)
+    org = FakeOrg('SUCCEEDED')
+    create_accounts(org, args, log, DEPLOYED, ACCOUNT_SPEC)
+    assert load_pending_accounts(args) == dict()
+    assert "Account creation succeeded for 'new'" in messages(caplog)
+
+
+def test_stale_succeeded_entry_is_pruned(log, args, caplog):
+    # created by an earlier run, then removed from the org
+    caplog.set_level(logging.INFO)
+    org = FakeOrg()
+    request_id = org.add_request('new', 'SUCCEEDED')
+    save_pending_account(args, 'new', request_id)
+    create_accounts(org, args, log, DEPLOYED, ACCOUNT_SPEC)
+    assert org.created == []
+    assert load_pending_accounts(args) == dict()
+    assert not [m for m in messages(caplog) if 'succeeded' in m]
+    assert ("Account 'new' was created but is not in the Organization.  "
+            "Not creating it again." in messages(caplog))
+
+
+def test_entries_for_deployed_accounts_are_pruned(log, args):
+    save_pending_account(args, 'master', 'car-9')
+    save_pending_account(args, 'gone', 'car-8')
+    spec = dict(ACCOUNT_SPEC, accounts=[dict(Name='master')])
+    create_accounts(None, args, log, DEPLOYED, spec)
+    assert load_pending_accounts(args) == dict()
@@ -0,0 +1,108 @@
+"""Tests for the on-disk assume_role credential cache (awsorgs.utils)"""
+
+import os
+import json
+import datetime
+import multiprocessing
+
+import pytest
+
+from awsorgs import utils
+
+
+CALLER_ARN = 'arn:aws:iam::111111111111:user/tester'
+
+
+def utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def make_credentials(expiration):
+    return dict(AccessKeyId='AKIA', SecretAccessKey='secret',
+            SessionToken='token', Expiration=expiration)
+
+
+@pytest.fixture
+def cache_file(tmp_path, monkeypatch):
+    monkeypatch.setitem(utils._credential_cache_file, 'path', None)
+    monkeypatch.setitem(utils._caller_identity, 'Arn', CALLER_ARN)
+    monkeypatch.setitem(utils._caller_identity, 'Account', '111111111111')
+    utils.enable_credential_cache_file(str(tmp_path / 'cache'))
+    return utils._credential_cache_file['path']
+
+
+def add_key(path, key):
+    with utils.locked_cache_file(path) as data:
+        data[key] = dict(n=len(data))
+
+
+def test_credentials_expired():
+    assert not utils.credentials_expired(None)
+    assert not utils.credentials_expired(utcnow() + datetime.timedelta(hours=1))
+    assert utils.credentials_expired(utcnow() + datetime.timedelta(minutes=1))
+    assert utils.credentials_expired(utcnow() - datetime.timedelta(hours=1))
+
+
+def test_round_trip(cache_file):
+    expiration = (utcnow() + datetime.timedelta(hours=1)).replace(microsecond=0)
+    utils.save_cached_credentials('222222222222', 'OrgRole',
+            make_credentials(expiration))
+    credentials = utils.load_cached_credentials('222222222222', 'OrgRole')
+    assert credentials['AccessKeyId'] == 'AKIA'
+    assert credentials['Expiration'] == expiration
+    assert utils.load_cached_credentials('333333333333', 'OrgRole') is None
+    assert oct(os.stat(cache_file).st_mode & 0o777) == oct(0o600)
+
+
+def test_expiring_credentials_are_not_loaded(cache_file):
+    utils.save_cached_credentials('222222222222', 'OrgRole',
+            make_credentials(utcnow() + datetime.timedelta(minutes=2)))
+    assert utils.load_cached_credentials('222222222222', 'OrgRole') is None
+
+
+def test_expired_entries_are_evicted_on_save(cache_file):
+    utils.save_cached_credentials('222222222222', 'OrgRole',
+            make_credentials(utcnow() - datetime.timedelta(hours=1)))
+    utils.save_cached_credentials('333333333333', 'OrgRole',
+            make_credentials(utcnow() + datetime.timedelta(hours=1)))
+    keys = list(utils.read_cache_file(cache_file))
+    assert keys == [utils.credential_file_key('333333333333', 'OrgRole')]
+
+
+@pytest.mark.parametrize('content', [
+    '',
+    '{"arn:aws:iam::111111111111:user/tester:222222222222:OrgRole": {"Acc',
+    'not json',
+    '["a", "list"]',
+])
+def test_corrupt_or_partial_file_is_empty(cache_file, content):
+    with open(cache_file, 'w') as f:
+        f.write(content)
+    assert utils.read_cache_file(cache_file) == dict()
+    assert utils.load_cached_credentials('222222222222', 'OrgRole') is None
+    # a later save replaces the bad file
+    utils.save_cached_credentials('222222222222', 'OrgRole',
+            make_credentials(utcnow() + datetime.timedelta(hours=1)))
+    assert utils.load_cached_credentials('222222222222', 'OrgRole') is not None
+
+
+def test_missing_file_is_empty(tmp_path):
+    assert utils.read_cache_file(str(tmp_path / 'nothing.json')) == dict()
+
+
+def test_concurrent_writers_keep_all_entries(tmp_path):
+    path = str(tmp_path / 'cache' / 'shared.json')
+    keys = ['key%d' % i for i in range(24)]
+    ctx = multiprocessing.get_context('fork')
+    processes = [ctx.Process(target=add_key, args=(path, key)) for key in keys]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+    with open(path) as f:
+        data = json.load(f)
+    assert sorted(data) == sorted(keys)
+    assert sorted(v['n'] for v in data.values()) == list(range(len(keys)))
+    # no temp files left behind
+    assert sorted(os.listdir(os.path.dirname(path))) == ['shared.json', 'shared.json.lock']
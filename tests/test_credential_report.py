@@ -0,0 +1,133 @@
+"""Tests for credential report parsing and one-time password expiry
+(awsorgs.reports)"""
+
+import datetime
+
+import pytest
+import yaml
+
+from awsorgs import reports, utils
+from awsorgs.reports import (parse_credential_report, parse_report_time,
+        find_expired_onetime_passwords, get_credential_report)
+
+
+HEADER = ('user,arn,user_creation_time,password_enabled,password_last_used,'
+        'password_last_changed,password_next_rotation,mfa_active\n')
+TTL = datetime.timedelta(hours=24)
+
+
+def utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def report_time(hours_ago):
+    return (utcnow() - datetime.timedelta(hours=hours_ago)).strftime(
+            '%Y-%m-%dT%H:%M:%S+00:00')
+
+
+def make_report(*rows):
+    lines = [HEADER]
+    for user, enabled, last_used, last_changed in rows:
+        lines.append('%s,arn:aws:iam::111111111111:user/%s,%s,%s,%s,%s,N/A,false\n'
+                % (user, user, report_time(100), enabled, last_used, last_changed))
+    return ''.join(lines).encode('utf-8')
+
+
+def test_parse_credential_report():
+    content = make_report(('alice', 'true', 'no_information', report_time(1)))
+    rows = list(parse_credential_report(content))
+    assert len(rows) == 1
+    assert rows[0]['user'] == 'alice'
+    assert rows[0]['arn'] == 'arn:aws:iam::111111111111:user/alice'
+    assert rows[0]['password_last_used'] == 'no_information'
+    assert list(parse_credential_report(HEADER.encode('utf-8'))) == []
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2020-01-02T03:04:05+00:00', datetime.datetime(2020, 1, 2, 3, 4, 5,
+            tzinfo=datetime.timezone.utc)),
+    ('2020-01-02T03:04:05Z', datetime.datetime(2020, 1, 2, 3, 4, 5,
+            tzinfo=datetime.timezone.utc)),
+    ('N/A', None),
+    ('no_information', None),
+    ('not_supported', None),
+    ('', None),
+    (None, None),
+])
+def test_parse_report_time(value, expected):
+    assert parse_report_time(value) == expected
+
+
+def test_candidate_selection():
+    content = make_report(
+        ('never_used', 'true', 'no_information', report_time(48)),
+        ('used_before_reset', 'true', report_time(72), report_time(48)),
+        ('used_after_reset', 'true', report_time(30), report_time(48)),
+        ('too_new', 'true', 'no_information', report_time(2)),
+        ('no_password', 'false', 'N/A', 'N/A'),
+    )
+    candidates = find_expired_onetime_passwords(
+            parse_credential_report(content), TTL)
+    assert list(candidates) == ['never_used', 'used_before_reset']
+    # the timestamp returned is the one the age was measured from
+    age = utcnow() - candidates['never_used']
+    assert datetime.timedelta(hours=47) < age < datetime.timedelta(hours=49)
+
+
+class FakeIAM(object):
+
+    def __init__(self, generated_hours_ago):
+        self.generated = utcnow() - datetime.timedelta(hours=generated_hours_ago)
+        self.generate_calls = 0
+
+    def get_credential_report(self):
+        return dict(Content=make_report(), GeneratedTime=self.generated)
+
+    def generate_credential_report(self):
+        self.generate_calls += 1
+        self.generated = utcnow()
+        return dict(State='COMPLETE')
+
+
+def test_recent_report_is_reused():
+    iam = FakeIAM(generated_hours_ago=1)
+    assert get_credential_report(iam) == []
+    assert iam.generate_calls == 0
+
+
+def test_max_age_zero_forces_a_new_report():
+    iam = FakeIAM(generated_hours_ago=1)
+    get_credential_report(iam, max_age=0)
+    assert iam.generate_calls == 1
+
+
+@pytest.fixture
+def org_accounts(aws, log):
+    org = utils.get_client('organizations')
+    org.create_organization(FeatureSet='ALL')
+    for name in ('bravo', 'alpha', 'charlie'):
+        org.create_account(AccountName=name, Email='%s@example.com' % name)
+    accounts = utils.scan_deployed_accounts(log, org)
+    for account in accounts:
+        credentials = utils.get_assume_role_credentials(account['Id'], 'OrgRole')
+        utils.get_client('iam', credentials).create_user(
+                UserName='user-%s' % account['Name'])
+    return accounts
+
+
+def test_org_credentials_report_streams_accounts_in_order(log, org_accounts,
+        monkeypatch):
+    get_credentials = reports.get_assume_role_credentials
+    def fail_for_bravo(account_id, role):
+        if account_id == utils.lookup(org_accounts, 'Name', 'bravo', 'Id'):
+            return RuntimeError('can not assume role in bravo')
+        return get_credentials(account_id, role)
+    monkeypatch.setattr(reports, 'get_assume_role_credentials', fail_for_bravo)
+
+    out = []
+    reports.org_credentials_report(log, org_accounts, 'OrgRole', sink=out.append)
+    assert out[0] == 'Users:'
+    sections = [yaml.safe_load(section) for section in out[1:]]
+    assert [s[0]['Account'] for s in sections] == ['alpha', 'charlie', 'master']
+    assert [s[0]['UserName'] for s in sections] == [
+            'user-alpha', 'user-charlie', 'user-master']
@@ -0,0 +1,106 @@
+"""Tests for awsloginprofile user processing (awsorgs.loginprofile)"""
+
+import logging
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+
+from awsorgs import auth, loginprofile, utils
+from awsorgs.utils import LookupTable
+
+
+ARGS = {'--new': False, '--reset': False, '--disable': False,
+        '--disable-expired': False, '--reenable': False, '--password': None}
+
+
+@pytest.fixture
+def iam(aws):
+    client = boto3.client('iam')
+    for name in ('bad', 'good'):
+        client.create_user(UserName=name)
+    return client
+
+
+def run_users(log, iam, user_names):
+    snapshot = loginprofile.scan_delegations(iam)
+    return loginprofile.manage_login_profiles(log, ARGS, dict(), user_names,
+            dict(), LookupTable(), snapshot, None)
+
+
+def test_all_users_reported(log, iam, caplog):
+    caplog.set_level(logging.INFO)
+    assert run_users(log, iam, ['bad', 'good'])
+    users = [r.getMessage().split()[-1] for r in caplog.records
+            if r.getMessage().startswith('User:')]
+    assert users == ['bad', 'good']
+
+
+def test_one_failed_user_does_not_stop_the_rest(log, iam, caplog, monkeypatch):
+    validate_login_profile = loginprofile.validate_login_profile
+
+    def fail_for_bad(user):
+        if user.name == 'bad':
+            raise ClientError(dict(Error=dict(Code='AccessDenied',
+                    Message='not allowed')), 'GetLoginProfile')
+        return validate_login_profile(user)
+
+    monkeypatch.setattr(loginprofile, 'validate_login_profile', fail_for_bad)
+    caplog.set_level(logging.INFO)
+    assert not run_users(log, iam, ['bad', 'good'])
+    messages = [r.getMessage() for r in caplog.records]
+    errors = [r.getMessage() for r in caplog.records if r.levelno == logging.ERROR]
+    assert len(errors) == 1
+    assert errors[0].startswith("error processing user 'bad': ClientError:")
+    assert 'AccessDenied' in errors[0]
+    # the second user is still processed and its log replayed after the first
+    good = [m for m in messages if m.startswith('User:') and m.endswith('good')]
+    assert len(good) == 1
+    assert messages.index(errors[0]) < messages.index(good[0])
+
+
+def test_missing_user_fails(log, iam, caplog):
+    assert not run_users(log, iam, ['nobody', 'good'])
+    assert 'no such user: nobody' in [r.getMessage() for r in caplog.records]
+
+
+AUTH_ACCOUNT = '123456789012'
+OTHER_ACCOUNT = '111111111111'
+THIRD_ACCOUNT = '222222222222'
+
+
+@pytest.fixture
+def delegations(log, iam):
+    iam.create_group(GroupName='admins', Path='/awsauth/')
+    iam.add_user_to_group(GroupName='admins', UserName='good')
+    snapshot = utils.scan_account_authorization(iam)
+    accounts = LookupTable([
+        dict(Name='master', Id=AUTH_ACCOUNT, Status='ACTIVE'),
+        dict(Name='other', Id=OTHER_ACCOUNT, Status='ACTIVE'),
+        dict(Name='third', Id=THIRD_ACCOUNT, Status='ACTIVE'),
+        dict(Name='closed', Id='333333333333', Status='SUSPENDED'),
+    ])
+    deployed = dict(accounts=accounts, groups=snapshot['groups'])
+    auth_spec = dict(default_path='awsauth', auth_account_id=AUTH_ACCOUNT)
+    args = {'--exec': True, '--auth-account-id': AUTH_ACCOUNT,
+            '--org-access-role': 'OrgRole'}
+    for d_spec in (
+            dict(RoleName='Admin', TrustingAccount='ALL',
+                ExcludeAccounts=['other'], TrustedGroup='admins'),
+            dict(RoleName='Auditor', TrustingAccount=['third'],
+                TrustedGroup='admins')):
+        auth.set_group_assume_role_policies(args, log, deployed, auth_spec, d_spec)
+    return accounts
+
+
+def test_list_delegations(log, iam, delegations):
+    snapshot = loginprofile.scan_delegations(iam)
+    arns = loginprofile.list_delegations(log, 'good', delegations, snapshot)
+    # the deny for the excluded account removes every role in it
+    assert arns == [
+        'arn:aws:iam::%s:role/awsauth/Admin' % AUTH_ACCOUNT,
+        'arn:aws:iam::%s:role/awsauth/Admin' % THIRD_ACCOUNT,
+        'arn:aws:iam::%s:role/awsauth/Auditor' % THIRD_ACCOUNT,
+    ]
+    assert loginprofile.list_delegations(log, 'bad', delegations, snapshot) == []
+    assert loginprofile.list_delegations(log, 'nobody', delegations, snapshot) == []
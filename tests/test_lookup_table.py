@@ -0,0 +1,138 @@
+"""Tests for LookupTable and lookup() (awsorgs.utils)"""
+
+import copy
+import pickle
+import threading
+
+import pytest
+
+from awsorgs.utils import LookupTable, lookup
+
+
+def make_table():
+    return LookupTable([
+        dict(Name='dev', Id='1', Team='blue'),
+        dict(Name='prod', Id='2', Team='blue'),
+        dict(Name='test', Id='3', Team='red'),
+    ])
+
+
+def names(items):
+    return sorted(d['Name'] for d in items)
+
+
+def test_lookup_matches_list_lookup():
+    table = make_table()
+    for name in ('dev', 'prod', 'test', 'missing'):
+        assert lookup(table, 'Name', name) == lookup(list(table), 'Name', name)
+    assert lookup(table, 'Name', 'prod', 'Id') == '2'
+    assert lookup(table, 'Name', 'prod', 'Nope') is None
+
+
+def test_non_unique_key():
+    table = make_table()
+    assert names(table.find('Team', 'blue')) == ['dev', 'prod']
+    with pytest.raises(RuntimeError):
+        lookup(table, 'Team', 'blue')
+    assert lookup(table, 'Team', 'red', 'Name') == 'test'
+
+
+def test_missing_and_unhashable_values():
+    table = make_table()
+    table.append(dict(Name='tagged', Tags=['a', 'b']))
+    assert table.find('Tags', ['a', 'b'])[0]['Name'] == 'tagged'
+    assert lookup(table, 'Tags', ['a', 'b'], 'Name') == 'tagged'
+    assert table.find('Team', 'green') == []
+    assert lookup(table, 'Nokey', 'x') is None
+
+
+def prime(table):
+    # build the indexes under test
+    table.find('Name', 'dev')
+    table.find('Team', 'blue')
+
+
+def test_append_invalidates():
+    table = make_table()
+    prime(table)
+    table.append(dict(Name='stage', Id='4', Team='blue'))
+    assert lookup(table, 'Name', 'stage', 'Id') == '4'
+    assert names(table.find('Team', 'blue')) == ['dev', 'prod', 'stage']
+
+
+def test_extend_and_iadd_invalidate():
+    table = make_table()
+    prime(table)
+    table.extend([dict(Name='a', Team='red')])
+    assert names(table.find('Team', 'red')) == ['a', 'test']
+    table += [dict(Name='b', Team='red')]
+    assert names(table.find('Team', 'red')) == ['a', 'b', 'test']
+    assert isinstance(table, LookupTable)
+
+
+def test_insert_invalidates():
+    table = make_table()
+    prime(table)
+    table.insert(0, dict(Name='first', Team='red'))
+    assert lookup(table, 'Name', 'first', 'Team') == 'red'
+
+
+def test_setitem_invalidates():
+    table = make_table()
+    prime(table)
+    table[0] = dict(Name='renamed', Id='1', Team='red')
+    assert lookup(table, 'Name', 'dev') is None
+    assert lookup(table, 'Name', 'renamed', 'Id') == '1'
+    assert names(table.find('Team', 'blue')) == ['prod']
+
+
+def test_delete_invalidates():
+    table = make_table()
+    prime(table)
+    del table[0]
+    assert lookup(table, 'Name', 'dev') is None
+    table.remove(lookup(table, 'Name', 'prod'))
+    assert table.find('Team', 'blue') == []
+    table.pop()
+    assert lookup(table, 'Name', 'test') is None
+    table.append(dict(Name='x'))
+    table.clear()
+    assert lookup(table, 'Name', 'x') is None
+
+
+def test_imul_invalidates():
+    table = LookupTable([dict(Name='dev')])
+    prime(table)
+    table *= 2
+    assert len(table.find('Name', 'dev')) == 2
+
+
+def test_copies_and_pickles_keep_working():
+    table = make_table()
+    prime(table)
+    for other in (copy.copy(table), copy.deepcopy(table),
+            pickle.loads(pickle.dumps(table))):
+        assert isinstance(other, LookupTable)
+        other.append(dict(Name='new'))
+        assert lookup(other, 'Name', 'new') is not None
+        assert lookup(table, 'Name', 'new') is None
+
+
+def test_concurrent_lookups_and_appends():
+    table = LookupTable()
+    errors = []
+
+    def writer(start):
+        for i in range(start, start + 200):
+            table.append(dict(Name='n%d' % i, Team='t%d' % (i % 3)))
+            if lookup(table, 'Name', 'n%d' % i) is None:
+                errors.append(i)
+
+    threads = [threading.Thread(target=writer, args=(n * 1000,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(table.find('Team', 't0')) + len(table.find('Team', 't1')) \
+            + len(table.find('Team', 't2')) == 800
@@ -0,0 +1,104 @@
+"""Tests for OU reconciliation (awsorgs.orgs)"""
+
+import copy
+import logging
+
+import pytest
+
+from awsorgs import orgs, utils
+
+
+ARGS = {'--exec': True}
+ORG_SPEC = dict(default_sc_policy='FullAWSAccess', sc_policies=[])
+SPEC = [dict(Name='root', Accounts=[], Child_OU=[
+    dict(Name='A', Child_OU=[
+        dict(Name='B', Accounts=['acct1']),
+        dict(Name='C', Child_OU=[dict(Name='D')]),
+    ]),
+    dict(Name='E', Ensure='absent', Child_OU=[dict(Name='F')]),
+])]
+
+
+@pytest.fixture
+def org(aws):
+    org_client = utils.get_client('organizations')
+    org_client.create_organization(FeatureSet='ALL')
+    org_client.create_account(AccountName='acct1', Email='acct1@example.com')
+    return org_client
+
+
+def scan(log, org_client):
+    deployed = dict(
+            policies=orgs.scan_deployed_policies(org_client),
+            accounts=utils.scan_deployed_accounts(log, org_client),
+            account_parents=dict())
+    deployed['ou'] = orgs.scan_deployed_ou(log, org_client,
+            utils.get_root_id(org_client), deployed['account_parents'])
+    deployed['policy_targets'] = orgs.scan_policy_targets(log, org_client,
+            deployed['policies'])
+    deployed['policy_contents'] = orgs.scan_policy_contents(log, org_client,
+            deployed['policies'])
+    return deployed
+
+
+def run(log, org_client, spec):
+    deployed = scan(log, org_client)
+    orgs.manage_ou(org_client, ARGS, log, deployed, ORG_SPEC, spec, 'root')
+    return deployed
+
+
+def tree(deployed):
+    return sorted((ou['Name'], sorted(ou['Child_OU']), sorted(ou['Accounts']))
+            for ou in deployed['ou'])
+
+
+EXPECTED = [
+    ('A', ['B', 'C'], []),
+    ('B', [], ['acct1']),
+    ('C', ['D'], []),
+    ('D', [], []),
+    ('root', ['A'], ['master']),
+]
+
+
+def messages(caplog):
+    return [r.getMessage() for r in caplog.records if r.levelno >= logging.INFO]
+
+
+def test_nested_ous_created_and_account_moved(log, org, caplog):
+    caplog.set_level(logging.INFO)
+    deployed = run(log, org, SPEC)
+    assert tree(deployed) == EXPECTED
+    assert tree(scan(log, org)) == EXPECTED
+    assert "Moving account 'acct1' to OU 'B'" in messages(caplog)
+    # parents are created before children, and the absent OU is ignored
+    created = [m for m in messages(caplog) if m.startswith('Creating')]
+    assert created == [
+        "Creating new OU 'A' under parent 'root'",
+        "Creating new OU 'B' under parent 'A'",
+        "Creating new OU 'C' under parent 'A'",
+        "Creating new OU 'D' under parent 'C'",
+    ]
+    assert not [m for m in messages(caplog) if 'E' in m.split("'")]
+
+
+def test_rerun_is_idempotent(log, org, caplog):
+    run(log, org, SPEC)
+    caplog.clear()
+    caplog.set_level(logging.INFO)
+    deployed = run(log, org, SPEC)
+    assert messages(caplog) == []
+    assert tree(deployed) == EXPECTED
+
+
+def test_absent_ou_is_deleted(log, org, caplog):
+    run(log, org, SPEC)
+    spec = copy.deepcopy(SPEC)
+    spec[0]['Child_OU'][0]['Child_OU'][1]['Child_OU'][0]['Ensure'] = 'absent'
+    caplog.set_level(logging.INFO)
+    deployed = run(log, org, spec)
+    assert "Deleting OU D" in messages(caplog)
+    expected = [t for t in EXPECTED if t[0] != 'D']
+    expected[expected.index(('C', ['D'], []))] = ('C', [], [])
+    assert tree(deployed) == expected
+    assert tree(scan(log, org)) == expected
@@ -0,0 +1,46 @@
+"""Tests for the AWS managed policy catalog (awsorgs.utils)"""
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from awsorgs import utils
+
+
+@pytest.fixture
+def iam(aws, monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, '_aws_policy_catalog', dict())
+    monkeypatch.setitem(utils._aws_policy_catalog_file, 'path', None)
+    utils.enable_policy_catalog_file(str(tmp_path))
+    with mock_aws(config={'iam': {'load_aws_managed_policies': True}}):
+        yield boto3.client('iam')
+
+
+def test_catalog_lists_unattached_policies(iam):
+    policies = utils.get_aws_managed_policies(iam)
+    listed = utils.get_iam_objects(iam.list_policies, 'Policies', dict(Scope='AWS'))
+    assert len(policies) == len(listed)
+    assert policies['ReadOnlyAccess'] == 'arn:aws:iam::aws:policy/ReadOnlyAccess'
+
+
+def test_documents_fetched_on_demand(iam, monkeypatch):
+    catalog = utils.get_aws_policy_catalog(iam)
+    assert catalog['Documents'] == dict()
+    calls = []
+    fetch = iam.get_policy_version
+    monkeypatch.setattr(iam, 'get_policy_version',
+            lambda **kwargs: calls.append(kwargs) or fetch(**kwargs))
+    document = utils.get_aws_policy_document(iam, 'ReadOnlyAccess')
+    assert document['Statement']
+    assert utils.get_aws_policy_document(iam, 'ReadOnlyAccess') == document
+    assert len(calls) == 1
+    assert utils.get_aws_policy_document(iam, 'NoSuchPolicy') is None
+
+
+def test_catalog_reloaded_from_file(iam, monkeypatch):
+    utils.get_aws_policy_document(iam, 'ReadOnlyAccess')
+    monkeypatch.setattr(utils, '_aws_policy_catalog', dict())
+    monkeypatch.setattr(iam, 'list_policies', None)
+    catalog = utils.get_aws_policy_catalog(iam)
+    assert 'ReadOnlyAccess' in catalog['Documents']
+    assert catalog['Versions']['ReadOnlyAccess'].startswith('v')
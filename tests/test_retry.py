@@ -0,0 +1,108 @@
+"""Tests for client side retries and pacing (awsorgs.utils)"""
+
+import time
+
+import pytest
+from botocore.awsrequest import AWSResponse
+
+from awsorgs import utils
+
+
+OK_BODY = (b'<ListUsersResponse xmlns="https://iam.amazonaws.com/doc/2010-05-08/">'
+        b'<ListUsersResult><Users/><IsTruncated>false</IsTruncated>'
+        b'</ListUsersResult></ListUsersResponse>')
+THROTTLE_BODY = (b'<ErrorResponse><Error><Type>Sender</Type><Code>Throttling</Code>'
+        b'<Message>Rate exceeded</Message></Error></ErrorResponse>')
+
+
+class RawBody(object):
+
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class StubSend(object):
+    """before-send handler which answers each request from a script"""
+
+    def __init__(self, throttles=0):
+        self.throttles = throttles
+        self.sent = []
+
+    def __call__(self, request=None, **kwargs):
+        self.sent.append(time.monotonic())
+        if self.throttles:
+            self.throttles -= 1
+            return AWSResponse(request.url, 400, dict(), RawBody(THROTTLE_BODY))
+        return AWSResponse(request.url, 200, dict(), RawBody(OK_BODY))
+
+
+@pytest.fixture
+def iam(aws, monkeypatch):
+    monkeypatch.setattr(utils.retry_controller, 'base_delay', 0.01)
+    monkeypatch.setitem(utils.retry_controller.rates, 'iam', 10.0)
+    monkeypatch.setattr(utils, '_executor', dict(pool=None, max_threads=3))
+    client = utils.get_client('iam')
+    stub = StubSend()
+    client.meta.events.register('before-send.iam', stub)
+    client.stub = stub
+    return client
+
+
+def iam_throttle():
+    return utils.retry_controller.throttle(None, 'before-send.iam.ListUsers')
+
+
+def test_throttled_twice_then_succeeds(iam):
+    iam.stub.throttles = 2
+    assert iam.list_users()['Users'] == []
+    assert len(iam.stub.sent) == 3
+    stats = utils.retry_stats()['iam']
+    assert stats['calls'] == 3
+    assert stats['retries'] == 2
+    assert stats['throttles'] == 2
+    assert stats['errors'] == 2
+    assert stats['paced_accounts'] == 1
+    assert stats['rate'] == 10.0
+    # throttles within a second back off once, to one request in flight,
+    # and the successful retry lets the next one through
+    assert iam_throttle().get_stats()['concurrency'] == 2
+
+
+def test_no_pacing_until_throttled(iam):
+    for i in range(5):
+        iam.list_users()
+    stats = utils.retry_stats()['iam']
+    assert stats['rate'] is None
+    assert stats['wait_seconds'] < 0.1
+
+
+def test_pacing_delay_is_applied(iam):
+    iam.stub.throttles = 1
+    iam.list_users()
+    start = time.monotonic()
+    for i in range(5):
+        iam.list_users()
+    # the token bucket is emptied on a throttle and refills at 10/s
+    assert time.monotonic() - start >= 0.4
+    assert utils.retry_stats()['iam']['wait_seconds'] >= 0.4
+
+
+def test_pacing_relaxes_after_successes(iam):
+    iam.stub.throttles = 1
+    iam.list_users()
+    throttle = iam_throttle()
+    # a second throttle more than a second later halves the rate
+    throttle.last_throttle -= 2
+    iam.stub.throttles = 1
+    iam.list_users()
+    # halved to 5/s, plus one step back up for the successful retry
+    assert throttle.get_stats()['rate'] == 5.5
+    assert throttle.get_stats()['concurrency'] == 2
+    for i in range(10):
+        iam.list_users()
+    stats = throttle.get_stats()
+    assert stats['rate'] == 10.0
+    assert stats['concurrency'] == utils.max_threads()
@@ -0,0 +1,77 @@
+"""Tests for the shared bounded task executor (awsorgs.utils)"""
+
+import threading
+import time
+
+import pytest
+
+from awsorgs import utils
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(utils, '_executor', dict(pool=None, max_threads=3))
+    yield utils.get_executor()
+    utils._executor['pool'].shutdown()
+
+
+class Tracker(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.threads = set()
+
+    def __call__(self, item):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(0.01)
+        with self.lock:
+            self.running -= 1
+        return item * 2
+
+
+def test_results_in_sequence_order(log, pool):
+    assert utils.run_tasks(log, range(10), Tracker()) == list(range(0, 20, 2))
+    ordered = utils.iter_tasks_ordered(log, range(10), Tracker())
+    assert list(ordered) == [(i, i * 2) for i in range(10)]
+
+
+def test_first_error_is_raised(log, pool):
+    def fail(item):
+        if item == 3:
+            raise ValueError('boom')
+        return item
+    with pytest.raises(ValueError):
+        utils.run_tasks(log, range(10), fail)
+    assert utils.run_tasks(log, range(5), fail, log_errors=True) == [0, 1, 2, None, 4]
+
+
+def run_nested(log, runner, sequence, func):
+    if runner == 'run_tasks':
+        return utils.run_tasks(log, sequence, func)
+    return [result for item, result in
+            utils.iter_tasks_ordered(log, sequence, func)]
+
+
+@pytest.mark.parametrize('runner', ['run_tasks', 'iter_tasks_ordered'])
+def test_nested_batch_uses_idle_workers(log, pool, runner):
+    tracker = Tracker()
+    results = utils.run_tasks(log, [0], lambda item:
+            run_nested(log, runner, range(12), tracker))
+    assert results == [list(range(0, 24, 2))]
+    assert len(tracker.threads) > 1
+
+
+@pytest.mark.parametrize('runner', ['run_tasks', 'iter_tasks_ordered'])
+def test_nested_batches_do_not_deadlock(log, pool, runner):
+    tracker = Tracker()
+    # every worker is busy with an outer task which waits on a nested batch
+    results = utils.run_tasks(log, range(6), lambda item:
+            sum(run_nested(log, runner, range(4), tracker)))
+    assert results == [12] * 6
+    assert tracker.peak <= utils.max_threads()
+    assert all(name.startswith('awsorgs') for name in tracker.threads)